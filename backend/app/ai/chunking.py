@@ -0,0 +1,36 @@
+import math
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English with OpenAI tokenizers; good
+    # enough to stay clear of the context limit, not for billing
+    return math.ceil(len(text) / 4)
+
+
+def chunk_segments(texts: list, max_tokens: int) -> list:
+    """
+    Groups consecutive transcript segments into chunks of at most
+    max_tokens, never cutting inside a segment. Chunks are evened out (ten
+    segments over budget make two halves, not one full chunk and a sliver)
+    so parallel calls finish together. A segment longer than the budget
+    becomes a chunk of its own. Returns the chunks' joined text.
+    """
+    sizes = [estimate_tokens(text) + 1 for text in texts]
+    total = sum(sizes)
+    if total <= max_tokens:
+        return [" ".join(texts)] if texts else []
+    target = math.ceil(total / math.ceil(total / max_tokens))
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    for text, tokens in zip(texts, sizes):
+        if current and (current_tokens >= target or current_tokens + tokens > max_tokens):
+            chunks.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens
+
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
@@ -0,0 +1,232 @@
+import asyncio
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from app.core.config import settings
+from app.ai.repository import AISummaryRepository, SummaryJobRepository
+from app.ai.service import generate_ai_summary
+from app.core.metrics import metrics
+from app.voice.repository import TranscriptRepository
+
+# Workers of this process, started with the app
+_workers = None
+
+
+def _now(offset: float = 0.0) -> str:
+    return (datetime.utcnow() + timedelta(seconds=offset)).isoformat()
+
+
+async def submit_summary_job(db, interaction_id: str, tenant_id: str, doctor_id: str):
+    # Queues a summary of the interaction's transcript and returns the job,
+    # or the one already queued or running for it; None without a transcript
+    repo = SummaryJobRepository(db)
+
+    if not await TranscriptRepository(db).find_by_interaction(interaction_id):
+        return None
+
+    existing = await repo.find_open(tenant_id, interaction_id)
+    if existing is not None:
+        metrics.inc("ai.jobs.deduplicated")
+        return existing
+
+    job = await repo.create_open({
+        "tenant_id": tenant_id,
+        "interaction_id": interaction_id,
+        "doctor_id": doctor_id,
+        "status": "queued",
+        "attempts": 0,
+        "worker_id": None,
+        "lease_until": None,
+        "started_at": None,
+        "finished_at": None,
+        "summary_id": None,
+        "error": None
+    })
+    if job is None:
+        # Submitted concurrently; the other request's job won
+        metrics.inc("ai.jobs.deduplicated")
+        return await repo.find_open(tenant_id, interaction_id)
+    metrics.inc("ai.jobs.submitted")
+
+    if _workers is not None:
+        _workers.wake()
+    return job
+
+
+async def get_job_status(db, job_id: str, tenant_id: str):
+    repo = SummaryJobRepository(db)
+
+    job = await repo.find_one({"_id": job_id, "tenant_id": tenant_id})
+    if job is None:
+        return None
+
+    status = {
+        "job_id": job["_id"],
+        "interaction_id": job["interaction_id"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "error": job["error"]
+    }
+    if job["status"] == "queued":
+        status["queued_ahead"] = await repo.count_ahead(job)
+    if job["status"] == "done":
+        status["summary"] = await AISummaryRepository(db).find_one({"_id": job["summary_id"]})
+    return status
+
+
+class SummaryWorkers:
+    """
+    SUMMARY_WORKERS async workers processing ai_summary_jobs. Tenants with
+    claimable jobs are served round robin, and a job only starts once its
+    tenant has one of its SUMMARY_JOBS_PER_TENANT slots free (slots are
+    shared by all processes; see SummaryJobRepository), so one tenant's
+    backlog does not hold up the others. Idle workers poll every
+    SUMMARY_JOB_POLL_SECONDS, or wake up on a submission in this process.
+    A job is attempted at most SUMMARY_JOB_MAX_ATTEMPTS times, counting
+    attempts whose worker died; jobs cut short by stop() go back to the
+    queue.
+    """
+
+    def __init__(self, db, workers: int = None):
+        self.db = db
+        self.repo = SummaryJobRepository(db)
+        self.workers = workers or settings.SUMMARY_WORKERS
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._last_tenant = None
+        # Round-robin turns are taken one worker at a time
+        self._claim_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._tasks = []
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def wake(self):
+        self._wakeup.set()
+
+    async def _work(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                job = await self._claim_next()
+            except Exception as e:
+                print(f"Summary job claim failed: {e}")
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), settings.SUMMARY_JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self._run(job)
+            except Exception as e:
+                # Keeps the worker alive; the job's lease runs out and it is
+                # claimed again
+                print(f"Summary job {job['_id']} could not be recorded: {e}")
+
+    async def _claim_next(self):
+        async with self._claim_lock:
+            now = _now()
+            lease_until = _now(settings.SUMMARY_JOB_LEASE_SECONDS)
+            max_attempts = settings.SUMMARY_JOB_MAX_ATTEMPTS
+            abandoned = await self.repo.fail_abandoned(now, max_attempts)
+            if abandoned:
+                metrics.inc("ai.jobs.failed", abandoned)
+            tenants = await self.repo.claimable_tenants(now, max_attempts)
+
+            # Start after the tenant served last
+            turn = [tenant for tenant in tenants if self._last_tenant is None or tenant > self._last_tenant]
+            turn += [tenant for tenant in tenants if tenant not in turn]
+
+            for tenant_id in turn:
+                token = uuid.uuid4().hex
+                slot_id = await self.repo.acquire_slot(
+                    tenant_id, settings.SUMMARY_JOBS_PER_TENANT, token, now, lease_until
+                )
+                if slot_id is None:
+                    continue
+                slot = {"id": slot_id, "token": token}
+                job = await self.repo.claim(tenant_id, self.worker_id, slot, now, lease_until, max_attempts)
+                if job is not None:
+                    self._last_tenant = tenant_id
+                    return job
+                await self.repo.release_slot(slot_id, token)
+            return None
+
+    async def _run(self, job: dict):
+        job_id = job["_id"]
+        started = datetime.utcnow()
+        metrics.observe("ai.jobs.wait_seconds", (started - datetime.fromisoformat(job["created_at"])).total_seconds())
+        heartbeat = asyncio.create_task(self._renew(job))
+
+        try:
+            summary = await generate_ai_summary(self.db, job["interaction_id"], job["tenant_id"], job["doctor_id"])
+        except asyncio.CancelledError:
+            await self.repo.finish(job_id, self.worker_id, {"status": "queued", "lease_until": None})
+            raise
+        except Exception as e:
+            retry = job["attempts"] < settings.SUMMARY_JOB_MAX_ATTEMPTS
+            print(f"Summary job {job_id} failed (attempt {job['attempts']}): {e}")
+            metrics.inc("ai.jobs.retried" if retry else "ai.jobs.failed")
+            await self.repo.finish(job_id, self.worker_id, {
+                "status": "queued" if retry else "failed",
+                "lease_until": None,
+                "finished_at": None if retry else _now(),
+                "error": str(e)
+            })
+            return
+        finally:
+            heartbeat.cancel()
+            await self.repo.release_slot(job["slot"]["id"], job["slot"]["token"])
+
+        metrics.observe("ai.jobs.run_seconds", (datetime.utcnow() - started).total_seconds())
+        if summary is None:
+            metrics.inc("ai.jobs.failed")
+            await self.repo.finish(job_id, self.worker_id, {
+                "status": "failed", "lease_until": None, "finished_at": _now(), "error": "No transcript found"
+            })
+            return
+
+        metrics.inc("ai.jobs.done")
+        await self.repo.finish(job_id, self.worker_id, {
+            "status": "done", "lease_until": None, "finished_at": _now(), "summary_id": summary["_id"], "error": None
+        })
+
+    async def _renew(self, job: dict):
+        # Keeps the job's and its slot's lease while the job runs; stops if
+        # the job was handed over
+        while True:
+            await asyncio.sleep(settings.SUMMARY_JOB_LEASE_SECONDS / 3)
+            try:
+                if not await self.repo.renew(job, self.worker_id, _now(settings.SUMMARY_JOB_LEASE_SECONDS)):
+                    return
+            except Exception as e:
+                print(f"Summary job {job['_id']} lease renewal failed: {e}")
+
+
+def start_summary_workers(db):
+    global _workers
+    if _workers is None and settings.SUMMARY_WORKERS > 0:
+        _workers = SummaryWorkers(db)
+        _workers.start()
+
+
+async def stop_summary_workers():
+    global _workers
+    if _workers is not None:
+        await _workers.stop()
+        _workers = None
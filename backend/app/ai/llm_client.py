@@ -1,21 +1,115 @@
-from openai import OpenAI
+import asyncio
+import json
+import time
+import httpx
+from openai import AsyncOpenAI
 from app.core.config import settings
-
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+from app.core.metrics import metrics
 
 SYSTEM_PROMPT = "You are a medical transcription summarization assistant."
 SUMMARY_PROMPT = "Please summarize the following medical transcript:\n\n{transcript}"
+MERGE_PROMPT = (
+    "The following JSON summaries cover consecutive parts of one medical transcript, in order. "
+    "Merge them into a single JSON object with the keys summary, complaints and action_points, "
+    "without repeating items:\n\n{partials}"
+)
+UPDATE_PROMPT = (
+    "The following JSON object summarizes a medical transcript so far. Update it with the next part "
+    "of the transcript and return a single JSON object with the keys summary, complaints and "
+    "action_points:\n\n{previous}\n\nNext part of the transcript:\n\n{transcript}"
+)
+# Bump whenever the prompts or the chunking change: cached summaries are keyed by it
+PROMPT_VERSION = "v3"
+
+# One AsyncOpenAI client per event loop: its pooled keep-alive connections
+# and the in-flight limit belong to the loop they were created on
+_client = None
+_slots = None
+_loop = None
+_in_flight = 0
+
+
+def get_client() -> AsyncOpenAI:
+    global _client, _slots, _loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _loop is not loop:
+        timeout = httpx.Timeout(settings.LLM_TIMEOUT_SECONDS, connect=settings.LLM_CONNECT_TIMEOUT_SECONDS)
+        http_client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_MAX_CONNECTIONS
+            )
+        )
+        _client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.LLM_BASE_URL,
+            timeout=timeout,
+            max_retries=settings.LLM_MAX_RETRIES,
+            http_client=http_client
+        )
+        _slots = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+        _loop = loop
+    return _client
+
+
+async def close_client():
+    global _client, _slots, _loop
+    if _client is not None:
+        await _client.close()
+        _client = _slots = _loop = None
+
+
+async def complete(messages: list, model: str = None, temperature: float = 0.2) -> str:
+    global _in_flight
+    client = get_client()
+
+    # Calls beyond LLM_MAX_CONCURRENCY wait here, not in the HTTP pool
+    queued_at = time.perf_counter()
+    async with _slots:
+        started_at = time.perf_counter()
+        metrics.observe("ai.llm.wait_seconds", started_at - queued_at)
+        _in_flight += 1
+        metrics.set_gauge("ai.llm.in_flight", _in_flight)
+        try:
+            response = await client.chat.completions.create(
+                model=model or settings.LLM_MODEL,
+                messages=messages,
+                temperature=temperature
+            )
+        finally:
+            _in_flight -= 1
+            metrics.set_gauge("ai.llm.in_flight", _in_flight)
+            metrics.observe("ai.llm.call_seconds", time.perf_counter() - started_at)
+
+    if response.usage is not None:
+        metrics.inc("ai.llm.prompt_tokens", response.usage.prompt_tokens)
+        metrics.inc("ai.llm.completion_tokens", response.usage.completion_tokens)
+    return response.choices[0].message.content
+
 
 async def generate_summary(transcript: str):
     prompt = SUMMARY_PROMPT.format(transcript=transcript)
 
-    response = client.chat.completions.create(
-        model="gpt-4.1-mini",
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.2
-    )
+    return await complete([
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ])
 
-    return response.choices[0].message.content
+
+async def merge_summaries(partials: list):
+    prompt = MERGE_PROMPT.format(partials=json.dumps(partials, indent=1))
+
+    return await complete([
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ])
+
+
+async def update_summary(previous: dict, transcript: str):
+    prompt = UPDATE_PROMPT.format(previous=json.dumps(previous, indent=1), transcript=transcript)
+
+    return await complete([
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ])
@@ -1,8 +1,175 @@
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from app.db.repository import BaseRepository
 
 class AISummaryRepository(BaseRepository):
     def __init__(self, db):
         super().__init__(db["ai_summaries"])
 
+    async def ensure_indexes(self):
+        await self.collection.create_index([
+            ("tenant_id", ASCENDING), ("transcript_hash", ASCENDING),
+            ("model_version", ASCENDING), ("prompt_version", ASCENDING)
+        ])
+
     async def find_by_interaction(self, interaction_id: str):
         return await self.find_one({"interaction_id": interaction_id})
+
+    async def find_cached(self, tenant_id: str, transcript_hash: str, model_version: str, prompt_version: str):
+        # A summary of the same transcript text from the same model and
+        # prompt; rejected ones are generated again
+        return await self.find_one({
+            "tenant_id": tenant_id,
+            "transcript_hash": transcript_hash,
+            "model_version": model_version,
+            "prompt_version": prompt_version,
+            "status": {"$ne": "rejected"}
+        })
+
+
+class RollingSummaryRepository(BaseRepository):
+    """
+    Running summary of an interaction still being recorded, one document
+    per interaction (_id = interaction_id): the structured summary of every
+    segment up to last_seq, and how many segments that is.
+    """
+
+    def __init__(self, db):
+        super().__init__(db["ai_rolling_summaries"])
+
+    async def find_by_interaction(self, interaction_id: str):
+        return await self.find_one({"_id": interaction_id})
+
+    async def save(self, interaction_id: str, state: dict) -> bool:
+        # Only moves forward: an update that covers no more than the stored
+        # one (e.g. from another worker) collides on _id and is dropped. A
+        # summary from another model or prompt version is replaced.
+        try:
+            await self.collection.update_one(
+                {"_id": interaction_id, "$or": [
+                    {"last_seq": {"$lt": state["last_seq"]}},
+                    {"model_version": {"$ne": state["model_version"]}},
+                    {"prompt_version": {"$ne": state["prompt_version"]}}
+                ]},
+                {"$set": state},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+
+class SummaryJobRepository(BaseRepository):
+    """
+    Summarization jobs (ai_summary_jobs): queued -> running -> done | failed.
+    A running job holds a lease that its worker renews; a job whose lease
+    ran out (the worker died, the server restarted) can be claimed again
+    until it has used up its attempts.
+
+    Running jobs per tenant are limited by slot documents
+    (ai_summary_job_slots, _id "<tenant>:<n>" for n below the limit): a
+    worker takes a free slot before claiming a job and gives it back when
+    the job ends. Slots are leased like jobs, so a slot held by a dead
+    worker frees itself.
+
+    Queued and running jobs carry open_key (tenant and interaction), unique
+    while set, so an interaction has at most one open job.
+    """
+
+    def __init__(self, db):
+        super().__init__(db["ai_summary_jobs"])
+        self.slots = db["ai_summary_job_slots"]
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("status", ASCENDING), ("tenant_id", ASCENDING), ("created_at", ASCENDING)])
+        await self.collection.create_index("open_key", unique=True, sparse=True)
+
+    def _claimable(self, now: str, max_attempts: int) -> dict:
+        return {"$or": [
+            {"status": "queued"},
+            {"status": "running", "lease_until": {"$lt": now}, "attempts": {"$lt": max_attempts}}
+        ]}
+
+    async def create_open(self, data: dict):
+        # None if the interaction already has an open job
+        data["open_key"] = f"{data['tenant_id']}:{data['interaction_id']}"
+        try:
+            return await self.create(data)
+        except DuplicateKeyError:
+            return None
+
+    async def find_open(self, tenant_id: str, interaction_id: str):
+        return await self.find_one({"open_key": f"{tenant_id}:{interaction_id}"})
+
+    async def claimable_tenants(self, now: str, max_attempts: int) -> list:
+        return sorted(await self.collection.distinct("tenant_id", self._claimable(now, max_attempts)))
+
+    async def count_ahead(self, job: dict) -> int:
+        # Queued jobs of the same tenant submitted before this one
+        return await self.collection.count_documents({
+            "tenant_id": job["tenant_id"], "status": "queued", "created_at": {"$lt": job["created_at"]}
+        })
+
+    async def acquire_slot(self, tenant_id: str, limit: int, token: str, now: str, lease_until: str):
+        # One atomic upsert per slot until a free one is found; a taken slot
+        # fails the filter and its upsert collides on _id
+        for n in range(limit):
+            try:
+                await self.slots.update_one(
+                    {"_id": f"{tenant_id}:{n}", "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}]},
+                    {"$set": {"token": token, "lease_until": lease_until}},
+                    upsert=True
+                )
+            except DuplicateKeyError:
+                continue
+            return f"{tenant_id}:{n}"
+        return None
+
+    async def release_slot(self, slot_id: str, token: str):
+        await self.slots.update_one({"_id": slot_id, "token": token}, {"$set": {"token": None, "lease_until": None}})
+
+    async def claim(self, tenant_id: str, worker_id: str, slot: dict, now: str, lease_until: str, max_attempts: int):
+        # Oldest claimable job of the tenant; None if another worker got there first
+        return await self.collection.find_one_and_update(
+            {"tenant_id": tenant_id, **self._claimable(now, max_attempts)},
+            {
+                "$set": {
+                    "status": "running", "worker_id": worker_id, "slot": slot,
+                    "started_at": now, "lease_until": lease_until
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("created_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def renew(self, job: dict, worker_id: str, lease_until: str) -> bool:
+        result = await self.collection.update_one(
+            {"_id": job["_id"], "worker_id": worker_id, "status": "running"},
+            {"$set": {"lease_until": lease_until}}
+        )
+        await self.slots.update_one(
+            {"_id": job["slot"]["id"], "token": job["slot"]["token"]},
+            {"$set": {"lease_until": lease_until}}
+        )
+        return result.matched_count == 1
+
+    async def finish(self, job_id: str, worker_id: str, data: dict):
+        # Ignored if the lease was lost and the job handed to another
+        # worker. A job that ends (done, failed) is no longer open.
+        update = {"$set": data}
+        if data["status"] in ("done", "failed"):
+            update["$unset"] = {"open_key": ""}
+        await self.collection.update_one({"_id": job_id, "worker_id": worker_id, "status": "running"}, update)
+
+    async def fail_abandoned(self, now: str, max_attempts: int) -> int:
+        # Jobs whose last attempt's worker died: nobody will finish them
+        result = await self.collection.update_many(
+            {"status": "running", "lease_until": {"$lt": now}, "attempts": {"$gte": max_attempts}},
+            {
+                "$set": {"status": "failed", "finished_at": now, "lease_until": None,
+                         "error": "Worker stopped responding"},
+                "$unset": {"open_key": ""}
+            }
+        )
+        return result.modified_count
@@ -1,22 +1,36 @@
-from fastapi import APIRouter, Request, Depends, HTTPException
+from fastapi import APIRouter, Request, Response, Depends, HTTPException
 from app.db.mongo import get_db
-from app.ai.service import generate_ai_summary
+from app.ai.jobs import submit_summary_job, get_job_status
 from app.roles.guard import require_permission
 
 router = APIRouter()
 
-@router.post("/summarize", dependencies=[Depends(require_permission("interaction:close"))])
-async def summarize_interaction(request: Request, interaction_id: str):
+@router.post("/summarize", status_code=202, dependencies=[Depends(require_permission("interaction:close"))])
+async def summarize_interaction(request: Request, response: Response, interaction_id: str):
     db = get_db()
 
-    summary = await generate_ai_summary(
+    # Summarized in the background; poll the job for the result
+    job = await submit_summary_job(
         db=db,
         interaction_id=interaction_id,
         tenant_id=request.state.tenant_id,
         doctor_id=request.state.user_id
     )
 
-    if not summary:
+    if not job:
         raise HTTPException(status_code=400, detail="No transcript found")
 
-    return summary
+    response.headers["Location"] = str(request.url_for("summary_job_status", job_id=job["_id"]))
+    return {"job_id": job["_id"], "status": job["status"]}
+
+
+@router.get("/summarize/jobs/{job_id}", dependencies=[Depends(require_permission("interaction:close"))])
+async def summary_job_status(request: Request, job_id: str):
+    db = get_db()
+
+    status = await get_job_status(db, job_id, request.state.tenant_id)
+
+    if not status:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return status
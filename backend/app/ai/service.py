@@ -1,25 +1,79 @@
+import asyncio
+import hashlib
 import json
+import time
 from datetime import datetime
-from app.ai.repository import AISummaryRepository
-from app.ai.llm_client import generate_summary
+from app.core.config import settings
+from app.ai.repository import AISummaryRepository, RollingSummaryRepository
+from app.ai.chunking import chunk_segments, estimate_tokens
+from app.ai.llm_client import PROMPT_VERSION, generate_summary, merge_summaries, update_summary
 from app.ai.confidence import calculate_confidence
+from app.core.metrics import metrics
 from app.voice.repository import TranscriptRepository
+from app.voice.writer import flush_interaction
+
+SUMMARY_FIELDS = ("summary", "complaints", "action_points")
+
+# Summaries being generated in this process, by cache key; identical
+# concurrent requests wait for the same one
+_in_flight = {}
+
+# Running summaries kept up to date by this process, by interaction
+_rolling = {}
+
 
 async def generate_ai_summary(db, interaction_id, tenant_id, doctor_id):
     transcript_repo = TranscriptRepository(db)
-    summary_repo = AISummaryRepository(db)
+
+    # Summarize everything said so far, including segments not yet flushed
+    await flush_interaction(interaction_id)
 
     transcript = await transcript_repo.find_by_interaction(interaction_id)
 
     if not transcript:
         return None
 
-    full_text = " ".join([s["text"] for s in transcript["segments"]])
+    # Stream bucket by bucket; only seq and text are kept. Segments of
+    # pre-bucketing transcripts have no seq and come first.
+    segments = [
+        (segment.get("seq", -1), segment["text"])
+        async for segment in transcript_repo.iter_segments(interaction_id)
+    ]
+    full_text = " ".join(text for _, text in segments)
+    transcript_hash = hashlib.sha256(full_text.encode()).hexdigest()
 
-    ai_output = await generate_summary(full_text)
-    structured = json.loads(ai_output)
+    key = (tenant_id, interaction_id, transcript_hash, settings.LLM_MODEL, PROMPT_VERSION)
+    task = _in_flight.get(key)
+    if task is not None:
+        metrics.inc("ai.summary.coalesced")
+        return await asyncio.shield(task)
 
-    confidence = calculate_confidence(full_text)
+    task = asyncio.ensure_future(
+        _summarize(db, interaction_id, tenant_id, doctor_id, segments, transcript_hash)
+    )
+    _in_flight[key] = task
+    task.add_done_callback(lambda _: _in_flight.pop(key, None))
+    # Shielded: a caller that goes away does not cancel the others' result
+    return await asyncio.shield(task)
+
+
+async def _summarize(db, interaction_id, tenant_id, doctor_id, segments: list, transcript_hash: str):
+    summary_repo = AISummaryRepository(db)
+
+    cached = await summary_repo.find_cached(tenant_id, transcript_hash, settings.LLM_MODEL, PROMPT_VERSION)
+    if cached is not None and cached["interaction_id"] == interaction_id:
+        metrics.inc("ai.summary.cache_hits")
+        return cached
+
+    if cached is not None:
+        # Same text in another interaction of the tenant: reuse the output
+        metrics.inc("ai.summary.cache_hits")
+        structured = {field: cached[field] for field in SUMMARY_FIELDS}
+        confidence = cached["confidence_score"]
+    else:
+        metrics.inc("ai.summary.cache_misses")
+        structured = await summarize_transcript(db, interaction_id, segments)
+        confidence = calculate_confidence(" ".join(text for _, text in segments))
 
     summary = await summary_repo.create({
         "interaction_id": interaction_id,
@@ -29,10 +83,197 @@ async def generate_ai_summary(db, interaction_id, tenant_id, doctor_id):
         "complaints": structured["complaints"],
         "action_points": structured["action_points"],
         "confidence_score": confidence,
-        "model_version": "gpt-4.1-mini",
-        "prompt_version": "v1",
+        "model_version": settings.LLM_MODEL,
+        "prompt_version": PROMPT_VERSION,
+        "transcript_hash": transcript_hash,
         "status": "pending",
         "created_at": datetime.utcnow().isoformat()
     })
 
     return summary
+
+
+async def summarize_segments(texts: list) -> dict:
+    # Transcripts within SUMMARY_CHUNK_TOKENS take one call. Longer ones are
+    # cut on segment boundaries, the chunks summarized in parallel and the
+    # partial results merged by one more, short, call.
+    chunks = chunk_segments(texts, settings.SUMMARY_CHUNK_TOKENS)
+    if len(chunks) <= 1:
+        return json.loads(await generate_summary(" ".join(texts)))
+
+    metrics.observe("ai.summary.chunks", len(chunks))
+    slots = asyncio.Semaphore(settings.SUMMARY_MAX_PARALLEL_CHUNKS)
+
+    async def summarize_chunk(chunk: str) -> dict:
+        async with slots:
+            return json.loads(await generate_summary(chunk))
+
+    partials = await asyncio.gather(*(summarize_chunk(chunk) for chunk in chunks))
+    return await merge_structured(partials)
+
+
+async def merge_structured(partials: list) -> dict:
+    try:
+        merged = json.loads(await merge_summaries(partials))
+        return {field: merged[field] for field in SUMMARY_FIELDS}
+    except (ValueError, KeyError, TypeError):
+        # Unusable merge output: keep the chunks' results side by side
+        metrics.inc("ai.summary.merge_fallbacks")
+        return merge_partials(partials)
+
+
+def merge_partials(partials: list) -> dict:
+    merged = {
+        "summary": " ".join(partial["summary"] for partial in partials if partial.get("summary")),
+        "complaints": [],
+        "action_points": []
+    }
+    for field in ("complaints", "action_points"):
+        seen = set()
+        for item in (item for partial in partials for item in partial.get(field) or []):
+            key = json.dumps(item, sort_keys=True).lower()
+            if key not in seen:
+                seen.add(key)
+                merged[field].append(item)
+    return merged
+
+
+async def summarize_transcript(db, interaction_id: str, segments: list) -> dict:
+    # With a running summary only the segments stored after it are folded
+    # in; without one (or if it cannot be used) the whole transcript is
+    # summarized
+    state = await rolling_state(db, interaction_id, wait=True) if settings.SUMMARY_ROLLING_ENABLED else None
+    if state is not None:
+        covered = sum(1 for seq, _ in segments if seq <= state["last_seq"])
+        # A segment stored behind the running summary's back is not in it
+        if covered == state["segments"]:
+            delta = [text for seq, text in segments if seq > state["last_seq"]]
+            metrics.observe("ai.summary.rolling_delta_segments", len(delta))
+            try:
+                return await fold_segments(state["summary"], delta)
+            except (ValueError, KeyError, TypeError):
+                pass
+        metrics.inc("ai.summary.rolling_misses")
+
+    return await summarize_segments([text for _, text in segments])
+
+
+async def fold_segments(previous: dict, texts: list) -> dict:
+    # The summary of what came before texts, updated with texts
+    if previous is None:
+        return await summarize_segments(texts)
+    if not texts:
+        return {field: previous[field] for field in SUMMARY_FIELDS}
+    if estimate_tokens(" ".join(texts)) > settings.SUMMARY_CHUNK_TOKENS:
+        return await merge_structured([previous, await summarize_segments(texts)])
+
+    updated = json.loads(await update_summary(previous, " ".join(texts)))
+    return {field: updated[field] for field in SUMMARY_FIELDS}
+
+
+class RollingSummary:
+    # This process's bookkeeping for one interaction's running summary
+    def __init__(self):
+        self.new_segments = 0
+        self.updated_at = time.monotonic()
+        self.task = None
+
+
+def schedule_rolling_update(db, interaction_id: str, stored: int = 0, final: bool = False):
+    """
+    Called as an interaction's transcript segments are stored. With
+    SUMMARY_ROLLING_ENABLED, the running summary is brought up to date in
+    the background once SUMMARY_ROLLING_SEGMENTS new segments have been
+    stored or SUMMARY_ROLLING_SECONDS have passed since the last update.
+    One update runs at a time; segments stored meanwhile wait for the next.
+    final (the interaction was closed) folds in whatever is left, after any
+    update in progress.
+    """
+    if not settings.SUMMARY_ROLLING_ENABLED:
+        return
+    tracker = _rolling.setdefault(interaction_id, RollingSummary())
+    tracker.new_segments += stored
+
+    due = final or tracker.new_segments >= settings.SUMMARY_ROLLING_SEGMENTS or (
+        tracker.new_segments and time.monotonic() - tracker.updated_at >= settings.SUMMARY_ROLLING_SECONDS
+    )
+    running = tracker.task if tracker.task is not None and not tracker.task.done() else None
+    if not due or (running is not None and not final):
+        return
+
+    tracker.new_segments = 0
+    tracker.updated_at = time.monotonic()
+    task = asyncio.ensure_future(_run_rolling_update(db, interaction_id, running))
+    tracker.task = task
+    if final:
+        task.add_done_callback(
+            lambda _: _rolling.pop(interaction_id, None) if _rolling.get(interaction_id) is tracker and tracker.task is task else None
+        )
+
+
+def release_rolling_update(interaction_id: str):
+    # The interaction's stream in this process has closed: its tracker is
+    # dropped once no update is running. The final update (close_interaction)
+    # may run in another process, so it cannot be relied on to do this
+    tracker = _rolling.get(interaction_id)
+    if tracker is None:
+        return
+
+    def drop(_=None):
+        if _rolling.get(interaction_id) is not tracker:
+            return
+        if tracker.task is not None and not tracker.task.done():
+            tracker.task.add_done_callback(drop)
+            return
+        _rolling.pop(interaction_id, None)
+
+    drop()
+
+
+async def _run_rolling_update(db, interaction_id: str, previous):
+    if previous is not None:
+        await asyncio.wait([previous])
+    try:
+        await update_rolling_summary(db, interaction_id)
+    except Exception as e:
+        # The next update, or the final summary, starts from the stored state
+        metrics.inc("ai.summary.rolling_failures")
+        print(f"Rolling summary update failed for interaction {interaction_id}: {e}")
+
+
+async def update_rolling_summary(db, interaction_id: str):
+    state = await rolling_state(db, interaction_id)
+    after_seq = state["last_seq"] if state else None
+
+    segments = [
+        (segment.get("seq", -1), segment["text"])
+        async for segment in TranscriptRepository(db).iter_segments(interaction_id, after_seq)
+    ]
+    if not segments:
+        return
+
+    with metrics.timer("ai.summary.rolling_update_seconds"):
+        summary = await fold_segments(state["summary"] if state else None, [text for _, text in segments])
+
+    await RollingSummaryRepository(db).save(interaction_id, {
+        "summary": summary,
+        "last_seq": max(seq for seq, _ in segments),
+        "segments": (state["segments"] if state else 0) + len(segments),
+        "model_version": settings.LLM_MODEL,
+        "prompt_version": PROMPT_VERSION,
+        "updated_at": datetime.utcnow().isoformat()
+    })
+    metrics.inc("ai.summary.rolling_updates")
+
+
+async def rolling_state(db, interaction_id: str, wait: bool = False):
+    # The stored running summary, if made by the current model and prompts.
+    # wait: let an update in progress in this process finish first
+    tracker = _rolling.get(interaction_id)
+    if wait and tracker is not None and tracker.task is not None:
+        await asyncio.wait([tracker.task])
+
+    state = await RollingSummaryRepository(db).find_by_interaction(interaction_id)
+    if state is None or state["model_version"] != settings.LLM_MODEL or state["prompt_version"] != PROMPT_VERSION:
+        return None
+    return state
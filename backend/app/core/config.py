@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -14,6 +15,86 @@ class Settings(BaseSettings):
     MONGO_DB_NAME: str = "emr_control_plane"
     OPENAI_API_KEY: str
 
+    # Voice transcription
+    VOICE_ENABLED: bool = True  # False: "no voice" worker, never loads Whisper
+    VOICE_WARMUP: bool = False  # load the model at startup instead of on first chunk
+    WHISPER_MODEL: str = "base"
+    WHISPER_DEVICE: str = "cpu"
+    WHISPER_TEMPERATURES: list[float] = [0.0, 0.2, 0.4, 0.6, 0.8, 1.0]  # fallback schedule
+    WHISPER_BEAM_SIZE: Optional[int] = None  # None: greedy
+    WHISPER_FP16: bool = False  # only honoured on CUDA
+    VOICE_DEFAULT_LANGUAGE: Optional[str] = None  # None: detect once per interaction
+    VOICE_ENGINE: str = "whisper"  # "whisper", "whisper-int8", "faster-whisper" or "fake"
+    VOICE_FAKE_ENGINE_RTF: float = 0.0  # CPU seconds the fake engine burns per audio second
+    VOICE_PROMPT_CHARS: int = 200  # previous text carried as the next window's prompt
+    # Latency/quality tiers, chosen per tenant (voice_tier) or per interaction
+    # (hello "tier"); unset keys fall back to VOICE_ENGINE / WHISPER_* above
+    VOICE_TIERS: dict[str, dict] = {
+        "fast": {"model": "tiny", "temperature": [0.0], "beam_size": None, "quantize": True},
+        "standard": {},
+        "quality": {"model": "small", "beam_size": 5}
+    }
+    VOICE_DEFAULT_TIER: str = "standard"
+    VOICE_MODEL_MEMORY_MB: int = 2048  # models kept loaded side by side, least recently used evicted
+    VOICE_EXECUTOR: str = "thread"  # "thread", "process" or "remote" (python -m app.voice.worker)
+    VOICE_WORKERS: int = 1
+    VOICE_WORKER_ADDRESS: str = "/tmp/emr-voice-worker.sock"  # unix socket path or host:port of the remote pool
+    VOICE_WORKER_AUTHKEY: Optional[str] = None  # shared secret of the API and the remote pool; required for "remote"
+    VOICE_QUEUE_SIZE: int = 8
+    VOICE_QUEUE_TIMEOUT_SECONDS: float = 10.0
+    VOICE_MAX_BATCH_SIZE: int = 1  # >1 batches chunks across streams
+    VOICE_MAX_BATCH_WAIT_MS: int = 30
+    VOICE_WINDOW_SECONDS: float = 10.0  # target inference window
+    VOICE_MIN_WINDOW_SECONDS: float = 2.0  # earliest a pause may close a window
+    VOICE_PAUSE_MS: int = 400
+    VOICE_WINDOW_OVERLAP_MS: int = 300  # carried over when a window is cut mid-speech
+    # Interim results re-decode the whole filling window each time (Whisper
+    # pads every input to 30 s), so at 2.0 a 10 s window costs ~4 extra
+    # decodes; they run on the cheap VOICE_INTERIM_TIER to keep that small
+    VOICE_INTERIM_SECONDS: float = 2.0  # 0 disables interim results
+    VOICE_INTERIM_TIER: Optional[str] = "fast"  # None: the stream's own tier
+    VOICE_STREAM_MAX_QUEUED_SECONDS: float = 10.0  # per-connection backlog bound
+    VOICE_STREAM_OVERLOAD_POLICY: str = "coalesce"  # "coalesce" (wait) or "drop" (oldest audio)
+    VOICE_CLIENT_CHUNK_MS: int = 250  # chunk size suggested to clients when keeping up
+    VOICE_FLOW_INTERVAL_SECONDS: float = 5.0
+    VAD_ENABLED: bool = True
+    VAD_THRESHOLD_DB: float = -45.0  # frame energy (dBFS) counted as speech
+    VAD_FRAME_MS: int = 30
+    VAD_HANGOVER_MS: int = 300  # context kept around speech
+    TRANSCRIPT_BUCKET_SIZE: int = 200  # segments per voice_transcript_buckets document
+    # Transcript segments are written in batches; 0 writes through. Closing
+    # an interaction flushes streams held by the same worker process only:
+    # with several workers, text of a stream held elsewhere can reach Mongo
+    # up to this long after close (and after a summary job reads it)
+    VOICE_WRITE_FLUSH_SECONDS: float = 2.0
+    VOICE_WRITE_FLUSH_SEGMENTS: int = 16
+    VOICE_ARCHIVE_DIR: Optional[str] = None  # keep received audio for replay; None disables
+    VOICE_REPLAY_WINDOW_SECONDS: float = 30.0
+    VOICE_REPLAY_BATCH_SIZE: int = 16
+    VOICE_CACHE_BACKEND: str = "memory"  # transcription results by audio hash: "memory", "redis" (shared) or "none"
+    VOICE_CACHE_MAX_ENTRIES: int = 10000  # per process, least recently used evicted
+    VOICE_CACHE_TTL_SECONDS: float = 3600.0
+    VOICE_BROADCAST_BACKEND: str = "local"  # "redis": also reach live viewers on other workers via REDIS_URL
+    VOICE_BROADCAST_QUEUE_SIZE: int = 100  # per viewer; the oldest messages are dropped beyond this
+
+    # LLM summarization (OpenAI or any OpenAI-compatible endpoint)
+    LLM_MODEL: str = "gpt-4.1-mini"
+    LLM_BASE_URL: Optional[str] = None  # None: api.openai.com
+    LLM_MAX_CONCURRENCY: int = 8  # in-flight completions per process; further calls wait
+    LLM_MAX_CONNECTIONS: int = 16  # pooled keep-alive HTTP connections
+    LLM_TIMEOUT_SECONDS: float = 60.0  # per attempt, connect excluded
+    LLM_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    LLM_MAX_RETRIES: int = 2
+    SUMMARY_CHUNK_TOKENS: int = 8000  # longer transcripts are summarized in chunks, then merged
+    SUMMARY_MAX_PARALLEL_CHUNKS: int = 4  # per summary; LLM_MAX_CONCURRENCY still applies
+    SUMMARY_ROLLING_ENABLED: bool = False  # keep a running summary while the interaction is recorded
+    SUMMARY_ROLLING_SEGMENTS: int = 30  # new stored segments that trigger a running summary update
+    SUMMARY_ROLLING_SECONDS: float = 180.0  # ...or time since the last update, whichever comes first
+    SUMMARY_WORKERS: int = 4  # async workers processing summary jobs per process; 0: submit only
+    SUMMARY_JOBS_PER_TENANT: int = 2  # jobs of one tenant running at once, across all processes
+    SUMMARY_JOB_LEASE_SECONDS: float = 300.0  # a job whose worker stops renewing is claimed again
+    SUMMARY_JOB_POLL_SECONDS: float = 2.0  # idle workers look for jobs from other processes this often
+    SUMMARY_JOB_MAX_ATTEMPTS: int = 3
 
     ENV: str = "development"
 
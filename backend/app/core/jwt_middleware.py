@@ -1,6 +1,7 @@
-from fastapi import Request, HTTPException
+from fastapi import Request, HTTPException, WebSocket
 from jose import jwt, JWTError, ExpiredSignatureError
 from app.core.config import settings
+from app.core.security import decode_access_token
 from app.audit.service import write_audit_event
 
 async def jwt_auth_middleware(request: Request, call_next):
@@ -45,3 +46,26 @@ async def jwt_auth_middleware(request: Request, call_next):
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
     return await call_next(request)
+
+
+def websocket_identity(websocket: WebSocket):
+    # jwt_auth_middleware does not run for websockets, so websocket routes
+    # check the same access token themselves, before accepting. Browsers
+    # cannot set headers on a websocket, so besides "Authorization: Bearer"
+    # the token may come as ?token=. Returns the token payload, or None if
+    # the token is missing, invalid, expired or lacks user_id / tenant_id.
+    token = websocket.query_params.get("token")
+    if not token:
+        auth_header = websocket.headers.get("Authorization", "")
+        scheme, _, token = auth_header.partition(" ")
+        if scheme.lower() != "bearer":
+            return None
+
+    try:
+        payload = decode_access_token(token)
+    except JWTError:
+        return None
+
+    if not payload.get("user_id") or not payload.get("tenant_id"):
+        return None
+    return payload
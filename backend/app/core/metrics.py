@@ -0,0 +1,72 @@
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+HISTOGRAM_WINDOW = 1024
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = defaultdict(int)
+        self.gauges = defaultdict(float)
+        self.histograms = defaultdict(lambda: deque(maxlen=HISTOGRAM_WINDOW))
+
+    def inc(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] += value
+
+    def set_gauge(self, name: str, value: float):
+        with self._lock:
+            self.gauges[name] = value
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            self.histograms[name].append(value)
+
+    @contextmanager
+    def timer(self, name: str):
+        # Observes the wall time of the block, even if it raises
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "histograms": {
+                    name: _summarize(list(values)) for name, values in self.histograms.items()
+                }
+            }
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+
+
+def _summarize(values: list) -> dict:
+    if not values:
+        return {"count": 0}
+
+    ordered = sorted(values)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))]
+
+    return {
+        "count": len(ordered),
+        "avg": sum(ordered) / len(ordered),
+        "p50": pct(0.50),
+        "p95": pct(0.95),
+        "max": ordered[-1]
+    }
+
+
+metrics = Metrics()
@@ -1,5 +1,7 @@
 from datetime import datetime
 from app.interactions.repository import InteractionRepository
+from app.voice.writer import flush_interaction
+from app.ai.service import schedule_rolling_update
 
 async def start_interaction(db, tenant_id: str, doctor_id: str):
     repo = InteractionRepository(db)
@@ -25,6 +27,9 @@ async def start_interaction(db, tenant_id: str, doctor_id: str):
 async def close_interaction(db, interaction_id: str):
     repo = InteractionRepository(db)
 
+    # Transcript segments still buffered by open voice streams
+    await flush_interaction(interaction_id)
+
     await repo.update(
         {"_id": interaction_id},
         {
@@ -32,3 +37,7 @@ async def close_interaction(db, interaction_id: str):
             "ended_at": datetime.utcnow().isoformat()
         }
     )
+
+    # Fold the last segments into the running summary now, so a summary
+    # requested after the visit is ready sooner
+    schedule_rolling_update(db, interaction_id, final=True)
@@ -3,11 +3,19 @@ from app.core.config import settings
 from app.core.middleware import register_middlewares
 from app.auth.routes import router as auth_router
 from app.audit.routes import router as audit_router
-from app.db.mongo import connect_to_mongo, close_mongo_connection
+from app.db.mongo import connect_to_mongo, close_mongo_connection, get_db
 from app.invites.routes import router as invite_router
 from app.tenants.routes import router as tenant_router
 from app.voice.routes import router as voice_router
+from app.voice.executor import get_executor, shutdown_executor
+from app.voice.batcher import shutdown_scheduler
+from app.voice.broadcast import shutdown_hub
+from app.voice.engines import warm_up
+from app.voice.repository import TranscriptRepository
 from app.ai.routes import router as ai_router
+from app.ai.llm_client import close_client
+from app.ai.repository import AISummaryRepository, SummaryJobRepository
+from app.ai.jobs import start_summary_workers, stop_summary_workers
 from app.review.routes import router as review_router
 
 def create_app():
@@ -26,7 +34,8 @@ def create_app():
     app.include_router(audit_router, prefix="/audit", tags=["Audit"])
     app.include_router(invite_router, prefix="/invites", tags=["Invites"])
     app.include_router(tenant_router, prefix="/tenants", tags=["Tenants"])
-    app.include_router(voice_router, prefix="/voice", tags=["Voice"])
+    if settings.VOICE_ENABLED:
+        app.include_router(voice_router, prefix="/voice", tags=["Voice"])
     app.include_router(ai_router, prefix="/ai", tags=["AI"])
     app.include_router(review_router, prefix="/review", tags=["Review"])
     
@@ -34,9 +43,20 @@ def create_app():
     @app.on_event("startup")
     async def startup_event():
         await connect_to_mongo()
+        await TranscriptRepository(get_db()).ensure_indexes()
+        await AISummaryRepository(get_db()).ensure_indexes()
+        await SummaryJobRepository(get_db()).ensure_indexes()
+        start_summary_workers(get_db())
+        if settings.VOICE_ENABLED and settings.VOICE_WARMUP:
+            await get_executor().run(warm_up)
 
     @app.on_event("shutdown")
     async def shutdown_event():
+        shutdown_scheduler()
+        shutdown_executor()
+        await shutdown_hub()
+        await stop_summary_workers()
+        await close_client()
         await close_mongo_connection()
 
     return app
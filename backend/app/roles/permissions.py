@@ -14,6 +14,9 @@ PERMISSIONS = {
     "INTERACTION_START": "interaction:start",
     "INTERACTION_CLOSE": "interaction:close",
 
+    "VOICE_STREAM": "voice:stream",
+    "VOICE_SUBSCRIBE": "voice:subscribe",
+
     "SUMMARY_APPROVE": "summary:approve",
     "SUMMARY_REJECT": "summary:reject",
 
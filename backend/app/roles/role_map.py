@@ -20,13 +20,16 @@ ROLES = {
     "DOCTOR": {
         "name": "Doctor",
         "permissions": [
-            "user:view"
+            "user:view",
+            "voice:stream",
+            "voice:subscribe"
         ]
     },
     "NURSE": {
         "name": "Nurse",
         "permissions": [
-            "user:view"
+            "user:view",
+            "voice:subscribe"
         ]
     },
     "RECEPTIONIST": {
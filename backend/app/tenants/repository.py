@@ -6,3 +6,6 @@ class TenantRepository(BaseRepository):
 
     async def find_by_name(self, name: str):
         return await self.find_one({"name": name})
+
+    async def find_by_id(self, tenant_id: str):
+        return await self.find_one({"_id": tenant_id})
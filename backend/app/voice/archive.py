@@ -0,0 +1,121 @@
+import os
+import re
+import struct
+import time
+from datetime import datetime
+import numpy as np
+from app.core.config import settings
+from app.voice.audio import SAMPLE_RATE, pcm_to_float32
+
+# Raw-audio archive, enabled by VOICE_ARCHIVE_DIR. Each interaction gets two
+# append-only files under <dir>/<tenant_id>/:
+#   <interaction_id>.pcm  16 kHz mono PCM16, every received chunk in order
+#   <interaction_id>.idx  one INDEX_RECORD per chunk: client seq (-1 without
+#                         one), first sample, sample count, receive time
+# Audio is written before its index record, so after a crash the index never
+# points past the audio; a torn trailing record is ignored on read.
+INDEX_RECORD = struct.Struct("<qQId")
+
+# Ids become file names; anything else could escape the archive directory
+_SAFE_ID = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def archive_paths(tenant_id: str, interaction_id: str, root: str = None):
+    for value in (tenant_id, interaction_id):
+        if not value or not _SAFE_ID.match(value):
+            raise ValueError(f"Cannot archive audio under id {value!r}")
+    base = os.path.join(root or settings.VOICE_ARCHIVE_DIR, tenant_id, interaction_id)
+    return base + ".pcm", base + ".idx"
+
+
+class ArchiveWriter:
+    def __init__(self, tenant_id: str, interaction_id: str, root: str = None):
+        self.pcm_path, self.idx_path = archive_paths(tenant_id, interaction_id, root)
+        os.makedirs(os.path.dirname(self.pcm_path), exist_ok=True)
+        # A reconnect appends to the same files
+        self._pcm = open(self.pcm_path, "ab")
+        self._idx = open(self.idx_path, "ab")
+        self.samples = self._pcm.tell() // 2
+
+    def append(self, audio: np.ndarray, seq: int = None):
+        pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2")
+        self._pcm.write(pcm.tobytes())
+        self._idx.write(INDEX_RECORD.pack(-1 if seq is None else seq, self.samples, len(pcm), time.time()))
+        self.samples += len(pcm)
+
+    def close(self):
+        self._pcm.close()
+        self._idx.close()
+
+
+def read_index(idx_path: str, total_samples: int = None) -> list:
+    with open(idx_path, "rb") as f:
+        data = f.read()
+    usable = len(data) - len(data) % INDEX_RECORD.size
+
+    records = []
+    for seq, offset, count, received_at in INDEX_RECORD.iter_unpack(data[:usable]):
+        if total_samples is not None and offset + count > total_samples:
+            break
+        records.append((seq, offset, count, received_at))
+    return records
+
+
+def open_archive(tenant_id: str, interaction_id: str, root: str = None):
+    """
+    Returns (samples, ranges): a read-only memory map of the interaction's
+    PCM16 audio and the (start, end) sample ranges to replay, in order.
+    Chunks a client resent after a reconnect (same seq) are skipped.
+    """
+    pcm_path, idx_path = archive_paths(tenant_id, interaction_id, root)
+    if os.path.getsize(pcm_path) == 0:
+        return np.zeros(0, dtype="<i2"), []
+    samples = np.memmap(pcm_path, dtype="<i2", mode="r")
+
+    ranges = []
+    last_seq = -1
+    for seq, offset, count, _ in read_index(idx_path, len(samples)):
+        if seq >= 0:
+            if seq <= last_seq:
+                continue
+            last_seq = seq
+        if ranges and ranges[-1][1] == offset:
+            ranges[-1] = (ranges[-1][0], offset + count)
+        else:
+            ranges.append((offset, offset + count))
+    return samples, ranges
+
+
+def list_archives(day: str = None, tenant_id: str = None, root: str = None) -> list:
+    # (tenant_id, interaction_id) pairs, optionally only those whose first
+    # chunk was received on `day` (YYYY-MM-DD, local time)
+    root = root or settings.VOICE_ARCHIVE_DIR
+    found = []
+    tenants = [tenant_id] if tenant_id else sorted(os.listdir(root)) if os.path.isdir(root) else []
+    for tenant in tenants:
+        tenant_dir = os.path.join(root, tenant)
+        if not os.path.isdir(tenant_dir):
+            continue
+        for name in sorted(os.listdir(tenant_dir)):
+            if not name.endswith(".idx"):
+                continue
+            interaction_id = name[:-len(".idx")]
+            if day is not None:
+                records = read_index(os.path.join(tenant_dir, name))
+                if not records or datetime.fromtimestamp(records[0][3]).strftime("%Y-%m-%d") != day:
+                    continue
+            found.append((tenant, interaction_id))
+    return found
+
+
+def iter_windows(samples: np.ndarray, ranges: list, window_seconds: float):
+    # Fixed windows of up to window_seconds over the replayed ranges, as
+    # (start second, float32 audio). Slices of the memory map are only read
+    # from disk when converted.
+    step = int(window_seconds * SAMPLE_RATE)
+    position = 0
+    for start, end in ranges:
+        for offset in range(start, end, step):
+            chunk = samples[offset:min(offset + step, end)]
+            yield position / SAMPLE_RATE, pcm_to_float32(np.asarray(chunk))
+            position += len(chunk)
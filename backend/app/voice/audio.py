@@ -0,0 +1,174 @@
+import math
+import struct
+from functools import lru_cache
+import numpy as np
+
+# Whisper models are trained on 16 kHz mono float32 audio
+SAMPLE_RATE = 16000
+# Whisper decodes fixed 30 s windows
+WINDOW_SAMPLES = 30 * SAMPLE_RATE
+# Source rates accepted from clients (hello or WAV header)
+MIN_SOURCE_RATE = 4000
+MAX_SOURCE_RATE = 192000
+
+_PCM_DTYPES = {
+    (1, 16): np.dtype("<i2"),
+    (1, 32): np.dtype("<i4"),
+    (3, 32): np.dtype("<f4"),
+}
+
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def parse_wav_header(data) -> dict:
+    view = memoryview(data)
+
+    if len(view) < 12 or bytes(view[0:4]) != b"RIFF" or bytes(view[8:12]) != b"WAVE":
+        raise ValueError("Not a RIFF/WAVE chunk")
+
+    header = {}
+    pos = 12
+
+    while pos + 8 <= len(view):
+        chunk_id = bytes(view[pos:pos + 4])
+        chunk_size = struct.unpack_from("<I", view, pos + 4)[0]
+        body = pos + 8
+
+        if chunk_id == b"fmt ":
+            if chunk_size < 16 or body + 16 > len(view):
+                raise ValueError("Truncated WAV fmt chunk")
+            audio_format, channels, sample_rate = struct.unpack_from("<HHI", view, body)
+            if channels == 0:
+                raise ValueError("WAV fmt chunk has no channels")
+            bits = struct.unpack_from("<H", view, body + 14)[0]
+            if audio_format == _WAVE_FORMAT_EXTENSIBLE and chunk_size >= 26 and body + 26 <= len(view):
+                # Real format code is the first two bytes of the sub-format GUID
+                audio_format = struct.unpack_from("<H", view, body + 24)[0]
+            header.update(
+                audio_format=audio_format,
+                channels=channels,
+                sample_rate=check_sample_rate(sample_rate),
+                bits=bits
+            )
+
+        elif chunk_id == b"data":
+            # Streaming encoders often write 0 or 0xFFFFFFFF as the data size
+            end = len(view) if chunk_size in (0, 0xFFFFFFFF) else min(body + chunk_size, len(view))
+            header.update(data_offset=body, data_size=end - body)
+            break
+
+        pos = body + chunk_size + (chunk_size & 1)
+
+    if "audio_format" not in header or "data_offset" not in header:
+        raise ValueError("WAV chunk is missing fmt or data section")
+
+    return header
+
+
+def check_sample_rate(sample_rate: int) -> int:
+    if not MIN_SOURCE_RATE <= sample_rate <= MAX_SOURCE_RATE:
+        raise ValueError(f"Unsupported sample rate: {sample_rate}")
+    return sample_rate
+
+
+def pcm_to_float32(samples: np.ndarray) -> np.ndarray:
+    if samples.dtype == np.float32:
+        return samples
+
+    scale = np.float32(1.0 / (np.iinfo(samples.dtype).max + 1))
+    out = np.empty(samples.shape, dtype=np.float32)
+    np.multiply(samples, scale, out=out, dtype=np.float32)
+    return out
+
+
+def downmix(samples: np.ndarray, channels: int) -> np.ndarray:
+    if channels == 1:
+        return samples
+    usable = len(samples) - len(samples) % channels
+    return samples[:usable].reshape(-1, channels).mean(axis=1, dtype=np.float32)
+
+
+@lru_cache(maxsize=16)
+def _polyphase_filter(up: int, down: int) -> np.ndarray:
+    # Kaiser-windowed sinc low-pass at the lower of the two Nyquist rates,
+    # designed for the up-sampled rate (as scipy.signal.resample_poly does)
+    # and split into one row of taps per phase
+    half = 10 * max(up, down)
+    cutoff = 0.5 / max(up, down)
+    n = np.arange(-half, half + 1)
+    taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(2 * half + 1, 5.0)
+    taps *= up / taps.sum()
+
+    per_phase = math.ceil(len(taps) / up)
+    phases = np.zeros((up, per_phase), dtype=np.float32)
+    for phase in range(up):
+        row = taps[phase::up]
+        phases[phase, :len(row)] = row
+    return phases
+
+
+def resample(samples: np.ndarray, source_rate: int, target_rate: int = SAMPLE_RATE) -> np.ndarray:
+    # Polyphase resampling by target_rate / source_rate in lowest terms; the
+    # low-pass keeps content above the new Nyquist rate from folding down
+    if source_rate == target_rate or len(samples) == 0:
+        return samples
+
+    g = math.gcd(source_rate, target_rate)
+    up, down = target_rate // g, source_rate // g
+    phases = _polyphase_filter(up, down)
+    per_phase = phases.shape[1]
+    half = 10 * max(up, down)
+
+    target_length = int(round(len(samples) * target_rate / source_rate))
+    # Output n is centred on up-sampled position n * down
+    positions = np.arange(target_length, dtype=np.int64) * down + half
+    phase = positions % up
+    base = positions // up
+
+    padded = np.concatenate([np.zeros(per_phase, dtype=np.float32), samples.astype(np.float32, copy=False),
+                             np.zeros(per_phase, dtype=np.float32)])
+    index = base[:, None] - np.arange(per_phase)[None, :] + per_phase
+    np.clip(index, 0, len(padded) - 1, out=index)
+    return np.einsum("ij,ij->i", phases[phase], padded[index]).astype(np.float32, copy=False)
+
+
+def decode_wav(data) -> np.ndarray:
+    header = parse_wav_header(data)
+
+    dtype = _PCM_DTYPES.get((header["audio_format"], header["bits"]))
+    if dtype is None:
+        raise ValueError(
+            f"Unsupported WAV encoding: format={header['audio_format']} bits={header['bits']}"
+        )
+
+    size = header["data_size"] - header["data_size"] % dtype.itemsize
+    # frombuffer is a view over the received bytes; only the float conversion allocates
+    samples = np.frombuffer(data, dtype=dtype, count=size // dtype.itemsize, offset=header["data_offset"])
+
+    audio = downmix(pcm_to_float32(samples), header["channels"])
+    return resample(audio, header["sample_rate"])
+
+
+def decode_pcm16(data, sample_rate: int = SAMPLE_RATE, channels: int = 1) -> np.ndarray:
+    usable = len(data) - len(data) % 2
+    samples = np.frombuffer(data, dtype="<i2", count=usable // 2)
+    audio = downmix(pcm_to_float32(samples), channels)
+    return resample(audio, sample_rate)
+
+
+def decode_audio_chunk(data) -> np.ndarray:
+    # WAV chunks carry their own header; anything else is treated as raw 16 kHz mono PCM16
+    if bytes(data[:4]) == b"RIFF":
+        return decode_wav(data)
+    return decode_pcm16(data)
+
+
+def encode_wav(audio: np.ndarray, sample_rate: int = SAMPLE_RATE) -> bytes:
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+    header = struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + len(pcm), b"WAVE",
+        b"fmt ", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16,
+        b"data", len(pcm)
+    )
+    return header + pcm
@@ -0,0 +1,132 @@
+import asyncio
+import time
+from app.core.config import settings
+from app.voice.executor import get_executor
+from app.core.metrics import metrics
+from app.voice.audio import WINDOW_SAMPLES
+
+
+class BatchScheduler:
+    """
+    Collects chunks from all active voice streams and transcribes them
+    together. A batch is dispatched when it reaches `max_batch_size` or when
+    its oldest chunk has waited `max_wait_ms`; every caller gets its own
+    result back through a future.
+    """
+
+    def __init__(self, transcribe_batch, executor=None, max_batch_size: int = 8, max_wait_ms: int = 30):
+        self.transcribe_batch = transcribe_batch
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: asyncio.Queue = None
+        self._task: asyncio.Task = None
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._dispatch_loop())
+
+    async def submit(self, audio, options: dict = None):
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((audio, options, future, time.perf_counter()))
+        metrics.set_gauge("voice.batch.pending", self._queue.qsize())
+        return await future
+
+    async def _collect(self) -> list:
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _dispatch_loop(self):
+        while True:
+            batch = await self._collect()
+            metrics.set_gauge("voice.batch.pending", self._queue.qsize())
+            # Run the forward pass in the background so the next batch can fill meanwhile
+            asyncio.create_task(self._run_batch(batch))
+
+    async def _run_batch(self, batch: list):
+        metrics.observe("voice.batch.size", len(batch))
+
+        # One forward pass per set of compatible decode options
+        groups = {}
+        for item in batch:
+            groups.setdefault(batch_key(item[1]), []).append(item)
+        await asyncio.gather(*(self._run_group(items) for items in groups.values()))
+
+    async def _run_group(self, items: list):
+        audios = [audio for audio, _, _, _ in items]
+        options = items[0][1]
+
+        try:
+            if self.executor is not None:
+                results = await self.executor.run(self.transcribe_batch, audios, options)
+            else:
+                results = self.transcribe_batch(audios, options)
+        except Exception as e:
+            for _, _, future, _ in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        now = time.perf_counter()
+        for (_, _, future, queued_at), result in zip(items, results):
+            metrics.observe("voice.batch.latency_seconds", now - queued_at)
+            if not future.done():
+                future.set_result(result)
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+_scheduler: BatchScheduler = None
+
+
+def get_scheduler() -> BatchScheduler:
+    global _scheduler
+    if _scheduler is None:
+        from app.voice.engines import transcribe_batch
+        _scheduler = BatchScheduler(
+            transcribe_batch,
+            executor=get_executor(),
+            max_batch_size=settings.VOICE_MAX_BATCH_SIZE,
+            max_wait_ms=settings.VOICE_MAX_BATCH_WAIT_MS
+        )
+    return _scheduler
+
+
+def shutdown_scheduler():
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.stop()
+        _scheduler = None
+
+
+def batch_key(options: dict):
+    # Chunks for the same engine, model, language and decoding settings can
+    # share a pass; per-chunk prompts are not supported by batched decoding
+    if not options:
+        return None
+    temperature = tuple(options.get("temperature") or ())[:1]
+    return (
+        options.get("engine"), options.get("model"), options.get("quantize"), options.get("language"),
+        temperature, options.get("beam_size"), options.get("fp16")
+    )
+
+
+def can_batch(audio) -> bool:
+    # Batched decoding covers a single 30 s window; longer chunks use transcribe()
+    return settings.VOICE_MAX_BATCH_SIZE > 1 and len(audio) <= WINDOW_SAMPLES
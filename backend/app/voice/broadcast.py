@@ -0,0 +1,251 @@
+import asyncio
+import json
+import uuid
+from fastapi import WebSocketDisconnect
+from app.core.config import settings
+from app.core.metrics import metrics
+
+CHANNEL_PREFIX = "voice:transcript:"
+
+
+class Subscription:
+    """
+    One viewer of an interaction's live transcript. Messages wait in a
+    bounded queue; a viewer that falls behind loses its oldest messages
+    rather than holding up the stream or the other viewers.
+    """
+
+    def __init__(self, hub, interaction_id: str, max_messages: int):
+        self.hub = hub
+        self.interaction_id = interaction_id
+        self.queue = asyncio.Queue(maxsize=max_messages)
+
+    def put(self, message: dict):
+        if self.queue.full():
+            self.queue.get_nowait()
+            metrics.inc("voice.broadcast.dropped")
+        self.queue.put_nowait(message)
+
+    async def get(self) -> dict:
+        return await self.queue.get()
+
+    async def close(self):
+        await self.hub.unsubscribe(self)
+
+
+class TranscriptHub:
+    """
+    Fans each interaction's live transcript out to its subscribers, so text
+    is transcribed once by the worker holding the audio socket and pushed to
+    every viewer. With a Redis client (VOICE_BROADCAST_BACKEND="redis")
+    messages also go through pub/sub channel voice:transcript:<id>, reaching
+    viewers connected to other workers; this worker listens only on the
+    channels it has local subscribers for and skips its own messages.
+    """
+
+    def __init__(self, redis=None, max_messages: int = None):
+        self.redis = redis
+        self.max_messages = max_messages or settings.VOICE_BROADCAST_QUEUE_SIZE
+        self.origin = uuid.uuid4().hex
+        self._subscribers = {}
+        self._pubsub = None
+        self._listener = None
+
+    def subscriber_count(self, interaction_id: str) -> int:
+        return len(self._subscribers.get(interaction_id, ()))
+
+    async def subscribe(self, interaction_id: str) -> Subscription:
+        subscription = Subscription(self, interaction_id, self.max_messages)
+        subscribers = self._subscribers.setdefault(interaction_id, set())
+        subscribers.add(subscription)
+        metrics.inc("voice.broadcast.subscribers")
+
+        if self.redis is not None and len(subscribers) == 1:
+            if self._pubsub is None:
+                self._pubsub = self.redis.pubsub()
+            await self._pubsub.subscribe(CHANNEL_PREFIX + interaction_id)
+            if self._listener is None:
+                self._listener = asyncio.create_task(self._listen())
+        return subscription
+
+    async def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.interaction_id)
+        if not subscribers or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        if subscribers:
+            return
+
+        self._subscribers.pop(subscription.interaction_id, None)
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.unsubscribe(CHANNEL_PREFIX + subscription.interaction_id)
+            except Exception as e:
+                print(f"Transcript broadcast unsubscribe failed: {e}")
+
+    async def publish(self, interaction_id: str, message: dict):
+        self._deliver(interaction_id, message)
+        if self.redis is None:
+            return
+
+        payload = json.dumps({"origin": self.origin, "message": message})
+        try:
+            await self.redis.publish(CHANNEL_PREFIX + interaction_id, payload)
+        except Exception as e:
+            # Viewers on other workers miss this message; the stream carries on
+            metrics.inc("voice.broadcast.errors")
+            print(f"Transcript broadcast publish failed for interaction {interaction_id}: {e}")
+
+    def _deliver(self, interaction_id: str, message: dict):
+        subscribers = self._subscribers.get(interaction_id)
+        if not subscribers:
+            return
+        for subscription in subscribers:
+            subscription.put(message)
+        metrics.inc("voice.broadcast.delivered", len(subscribers))
+
+    async def _listen(self):
+        while True:
+            try:
+                if not self._pubsub.subscribed:
+                    await asyncio.sleep(1.0)
+                    continue
+                raw = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Transcript broadcast listener error: {e}")
+                await asyncio.sleep(1.0)
+                continue
+
+            if raw is None or raw.get("type") != "message":
+                continue
+            channel = raw["channel"]
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            try:
+                payload = json.loads(raw["data"])
+            except ValueError:
+                continue
+            if payload.get("origin") == self.origin:
+                continue
+            self._deliver(channel[len(CHANNEL_PREFIX):], payload["message"])
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        if self.redis is not None:
+            await self.redis.aclose()
+
+
+async def relay(websocket, subscription: Subscription):
+    # Forwards messages until the viewer disconnects; anything the viewer
+    # sends is ignored
+    async def receive():
+        try:
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        except WebSocketDisconnect:
+            pass
+
+    async def send():
+        while True:
+            await websocket.send_json(await subscription.get())
+
+    tasks = {asyncio.create_task(receive()), asyncio.create_task(send())}
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() and not isinstance(task.exception(), (WebSocketDisconnect, RuntimeError)):
+                raise task.exception()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await subscription.close()
+
+
+class InMemoryRedis:
+    """
+    Stand-in for the redis.asyncio pub/sub calls the hub makes, for local
+    runs and tests (REDIS_URL=memory://). Clients created in the same
+    process share channels, like workers sharing one Redis server.
+    """
+
+    channels = {}
+
+    async def publish(self, channel: str, data: str) -> int:
+        receivers = list(self.channels.get(channel, ()))
+        for pubsub in receivers:
+            pubsub.messages.put_nowait({"type": "message", "channel": channel, "data": data})
+        return len(receivers)
+
+    def pubsub(self):
+        return InMemoryPubSub()
+
+    async def aclose(self):
+        pass
+
+
+class InMemoryPubSub:
+    def __init__(self):
+        self.messages = asyncio.Queue()
+        self.subscribed_channels = set()
+
+    @property
+    def subscribed(self) -> bool:
+        return bool(self.subscribed_channels)
+
+    async def subscribe(self, *channels):
+        for channel in channels:
+            InMemoryRedis.channels.setdefault(channel, set()).add(self)
+            self.subscribed_channels.add(channel)
+
+    async def unsubscribe(self, *channels):
+        for channel in channels or list(self.subscribed_channels):
+            InMemoryRedis.channels.get(channel, set()).discard(self)
+            self.subscribed_channels.discard(channel)
+
+    async def get_message(self, ignore_subscribe_messages: bool = False, timeout: float = 0.0):
+        try:
+            return await asyncio.wait_for(self.messages.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def aclose(self):
+        await self.unsubscribe()
+
+
+def redis_client(url: str = None):
+    url = url or settings.REDIS_URL
+    if url.startswith("memory://"):
+        return InMemoryRedis()
+    import redis.asyncio
+    return redis.asyncio.from_url(url)
+
+
+_hub = None
+
+
+def get_hub() -> TranscriptHub:
+    global _hub
+    if _hub is None:
+        backend = settings.VOICE_BROADCAST_BACKEND
+        if backend not in ("local", "redis"):
+            raise ValueError(f"Unknown broadcast backend: {backend}")
+        _hub = TranscriptHub(redis_client() if backend == "redis" else None)
+    return _hub
+
+
+async def shutdown_hub():
+    global _hub
+    if _hub is not None:
+        await _hub.close()
+        _hub = None
@@ -0,0 +1,118 @@
+import numpy as np
+from app.voice.audio import SAMPLE_RATE, WINDOW_SAMPLES
+from app.voice.vad import frame_energy_db
+
+
+class AudioStreamBuffer:
+    """
+    Per-stream PCM buffer that turns arbitrarily sized client chunks into
+    inference windows. Audio is written into one preallocated float32 array;
+    after a window is emitted the small remainder is moved to the front.
+
+    A window is cut at the last speech pause between `min_seconds` and
+    `target_seconds`, or at `target_seconds` when nobody pauses. Forced cuts
+    carry `overlap_ms` of audio into the next window so a word split at the
+    boundary is heard whole at least once; pause cuts need no overlap.
+    """
+
+    def __init__(self, target_seconds: float = 10.0, min_seconds: float = 2.0,
+                 pause_ms: int = 400, overlap_ms: int = 300, threshold_db: float = -45.0,
+                 frame_ms: int = 30, capacity: int = WINDOW_SAMPLES):
+        self.target = min(int(target_seconds * SAMPLE_RATE), capacity)
+        self.minimum = min(int(min_seconds * SAMPLE_RATE), self.target)
+        self.overlap = int(overlap_ms * SAMPLE_RATE / 1000)
+        self.frame = max(1, SAMPLE_RATE * frame_ms // 1000)
+        self.pause_frames = max(1, pause_ms // frame_ms)
+        self.threshold_db = threshold_db
+
+        self._buffer = np.zeros(capacity, dtype=np.float32)
+        self._length = 0
+        # Samples at the start of the buffer already sent in the previous window
+        self._carried = 0
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def new_samples(self) -> int:
+        return self._length - self._carried
+
+    def pending(self) -> np.ndarray:
+        return self._buffer[:self._length]
+
+    def push(self, pcm: np.ndarray) -> list:
+        windows = []
+        offset = 0
+
+        while offset < len(pcm):
+            n = min(len(self._buffer) - self._length, len(pcm) - offset)
+            self._buffer[self._length:self._length + n] = pcm[offset:offset + n]
+            self._length += n
+            offset += n
+
+            while True:
+                window = self._next_window()
+                if window is None:
+                    break
+                windows.append(window)
+
+        return windows
+
+    def flush(self):
+        window = None
+        if self.new_samples > 0 and not self._all_silent():
+            window = self._buffer[:self._length].copy()
+        self._length = self._carried = 0
+        return window
+
+    def _all_silent(self) -> bool:
+        return bool((frame_energy_db(self._buffer[:self._length], self.frame) <= self.threshold_db).all())
+
+    def _pause_cut(self, end: int):
+        # Latest sample index inside [minimum, end] sitting in the middle of a
+        # run of `pause_frames` silent frames, or None
+        n_frames = end // self.frame
+        if n_frames < self.pause_frames:
+            return None
+
+        silent = frame_energy_db(self._buffer[:n_frames * self.frame], self.frame) <= self.threshold_db
+        runs = np.convolve(silent.astype(np.int16), np.ones(self.pause_frames, dtype=np.int16), mode="valid")
+        run_starts = np.flatnonzero(runs == self.pause_frames)
+        if len(run_starts) == 0:
+            return None
+
+        cut = (int(run_starts[-1]) + self.pause_frames // 2) * self.frame
+        return cut if cut >= self.minimum else None
+
+    def _next_window(self):
+        if self.new_samples <= 0 or self._length < self.minimum:
+            return None
+
+        if self._length >= self.target:
+            cut = self._pause_cut(self.target)
+            forced = cut is None
+            if forced:
+                cut = self.target
+        else:
+            # Only emit early when the speaker is pausing right now
+            tail = self.pause_frames * self.frame
+            if self._length < tail:
+                return None
+            energies = frame_energy_db(self._buffer[self._length - tail:self._length], self.frame)
+            if (energies > self.threshold_db).any():
+                return None
+            if self._all_silent():
+                # Nothing but silence buffered: drop it rather than emit an empty window
+                self._length = self._carried = 0
+                return None
+            cut, forced = self._length, False
+
+        window = self._buffer[:cut].copy()
+
+        keep_from = max(0, cut - self.overlap) if forced else cut
+        remainder = self._length - keep_from
+        self._buffer[:remainder] = self._buffer[keep_from:self._length]
+        self._length = remainder
+        self._carried = cut - keep_from
+
+        return window
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from app.core.config import settings
+from app.core.metrics import metrics
+
+# Decode options that change the text for the same audio; "tier" only
+# selects among these
+KEY_OPTIONS = ("engine", "model", "quantize", "language", "temperature", "beam_size", "fp16", "initial_prompt")
+
+
+def cache_key(audio, options: dict) -> str:
+    # Content address: the float32 samples plus everything the decode depends on
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.ascontiguousarray(audio, dtype=np.float32).data)
+    digest.update(json.dumps([options.get(name) for name in KEY_OPTIONS], default=list).encode())
+    return digest.hexdigest()
+
+
+class MemoryCache:
+    """
+    Per-process LRU of transcription results. Entries expire ttl seconds
+    after they were stored; beyond max_entries the least recently used go.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                metrics.inc("voice.cache.expired")
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: dict):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                metrics.inc("voice.cache.evictions")
+            metrics.set_gauge("voice.cache.entries", len(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCache:
+    """
+    Cache shared by every API and worker process through REDIS_URL. Entries
+    expire after ttl seconds; size is bounded by the server's maxmemory
+    policy (e.g. allkeys-lru).
+    """
+
+    prefix = "voice:transcription:"
+
+    def __init__(self, client, ttl: float):
+        self.client = client
+        self.ttl = ttl
+
+    def get(self, key: str):
+        value = self.client.get(self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key: str, value: dict):
+        self.client.set(self.prefix + key, json.dumps(value), ex=max(1, int(self.ttl)))
+
+
+class TranscriptionCache:
+    """
+    Read-through cache in front of the engines: byte-identical audio decoded
+    with the same engine, model and options is transcribed once. Backend
+    errors count as misses, so a cache outage only costs the decode.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    def _record(self, hits: int, misses: int):
+        self.hits += hits
+        self.misses += misses
+        metrics.inc("voice.cache.hits", hits)
+        metrics.inc("voice.cache.misses", misses)
+        metrics.set_gauge("voice.cache.hit_ratio", self.hits / max(1, self.hits + self.misses))
+
+    def get(self, key: str):
+        try:
+            return self.backend.get(key)
+        except Exception as e:
+            metrics.inc("voice.cache.errors")
+            print(f"Transcription cache lookup failed: {e}")
+            return None
+
+    def set(self, key: str, value: dict):
+        try:
+            self.backend.set(key, value)
+        except Exception as e:
+            metrics.inc("voice.cache.errors")
+            print(f"Transcription cache store failed: {e}")
+
+    def transcribe(self, transcribe, audio, options: dict) -> dict:
+        key = cache_key(audio, options)
+        cached = self.get(key)
+        self._record(cached is not None, cached is None)
+        if cached is not None:
+            return dict(cached)
+
+        result = transcribe(audio, options)
+        self.set(key, result)
+        return result
+
+    def transcribe_batch(self, transcribe_batch, audios: list, options: dict) -> list:
+        keys = [cache_key(audio, options) for audio in audios]
+        results = [self.get(key) for key in keys]
+        missing = [i for i, cached in enumerate(results) if cached is None]
+        self._record(len(audios) - len(missing), len(missing))
+
+        if missing:
+            for i, result in zip(missing, transcribe_batch([audios[i] for i in missing], options)):
+                results[i] = result
+                self.set(keys[i], result)
+        return [dict(result) for result in results]
+
+
+_cache = None
+
+
+def get_cache():
+    # None when VOICE_CACHE_BACKEND is "none"
+    global _cache
+    backend = settings.VOICE_CACHE_BACKEND
+    if backend == "none":
+        return None
+    if _cache is None:
+        ttl = settings.VOICE_CACHE_TTL_SECONDS
+        if backend == "memory":
+            _cache = TranscriptionCache(MemoryCache(settings.VOICE_CACHE_MAX_ENTRIES, ttl))
+        elif backend == "redis":
+            import redis
+            _cache = TranscriptionCache(RedisCache(redis.Redis.from_url(settings.REDIS_URL), ttl))
+        else:
+            raise ValueError(f"Unknown transcription cache backend: {backend}")
+    return _cache
+
+
+def reset_cache():
+    global _cache
+    _cache = None
@@ -0,0 +1,115 @@
+import io
+import numpy as np
+from app.voice.audio import SAMPLE_RATE, check_sample_rate, decode_audio_chunk, decode_pcm16, resample
+
+try:
+    import soundfile
+except ImportError:  # FLAC transport is optional
+    soundfile = None
+
+
+def _mulaw_table() -> np.ndarray:
+    u = ~np.arange(256, dtype=np.int32) & 0xFF
+    exponent = (u >> 4) & 0x07
+    mantissa = u & 0x0F
+    magnitude = (((mantissa << 3) + 0x84) << exponent) - 0x84
+    return (np.where(u & 0x80, -magnitude, magnitude) / 32768.0).astype(np.float32)
+
+
+def _alaw_table() -> np.ndarray:
+    a = np.arange(256, dtype=np.int32) ^ 0x55
+    exponent = (a >> 4) & 0x07
+    mantissa = a & 0x0F
+    magnitude = np.where(
+        exponent == 0,
+        (mantissa << 4) + 8,
+        ((mantissa << 4) + 0x108) << np.maximum(exponent - 1, 0)
+    )
+    return (np.where(a & 0x80, magnitude, -magnitude) / 32768.0).astype(np.float32)
+
+
+# G.711 byte -> float32 sample; decoding is a single table lookup per byte
+MULAW_TABLE = _mulaw_table()
+ALAW_TABLE = _alaw_table()
+
+
+def _g711_decoder(table: np.ndarray, sample_rate: int):
+    def decode(data) -> np.ndarray:
+        audio = table[np.frombuffer(data, dtype=np.uint8)]
+        return resample(audio, sample_rate)
+    return decode
+
+
+def _flac_decode(data) -> np.ndarray:
+    # Each frame is a self-contained FLAC stream (STREAMINFO + audio frames)
+    audio, sample_rate = soundfile.read(io.BytesIO(bytes(data)), dtype="float32", always_2d=True)
+    audio = audio.mean(axis=1, dtype=np.float32) if audio.shape[1] > 1 else audio[:, 0]
+    return resample(audio, sample_rate)
+
+
+def available_codecs() -> list:
+    # In server preference order: smallest on the wire first
+    codecs = ["flac"] if soundfile is not None else []
+    return codecs + ["mulaw", "alaw", "pcm16", "wav", "auto"]
+
+
+def get_decoder(codec: str = "auto", sample_rate: int = SAMPLE_RATE):
+    """
+    Returns a function turning one received frame into 16 kHz float32 audio.
+    sample_rate applies to the headerless codecs (pcm16, mulaw, alaw).
+    """
+    if codec not in available_codecs():
+        raise ValueError(f"Unsupported codec: {codec}")
+    check_sample_rate(sample_rate)
+
+    if codec == "mulaw":
+        return _g711_decoder(MULAW_TABLE, sample_rate)
+    if codec == "alaw":
+        return _g711_decoder(ALAW_TABLE, sample_rate)
+    if codec == "flac":
+        return _flac_decode
+    if codec == "pcm16":
+        return lambda data: decode_pcm16(data, sample_rate=sample_rate)
+    # "wav" and "auto": WAV header if present, raw 16 kHz PCM16 otherwise
+    return decode_audio_chunk
+
+
+def negotiate(requested) -> str:
+    # First codec the client offers that this server can decode
+    if isinstance(requested, str):
+        requested = [requested]
+    supported = available_codecs()
+    for codec in requested or []:
+        if codec in supported:
+            return codec
+    return "auto"
+
+
+def _to_pcm16(audio: np.ndarray) -> np.ndarray:
+    return (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int32)
+
+
+def encode_mulaw(audio: np.ndarray) -> bytes:
+    samples = _to_pcm16(audio)
+    sign = (samples < 0).astype(np.int32) << 7
+    magnitude = np.minimum(np.abs(samples), 32635) + 0x84
+    exponent = np.clip(np.floor(np.log2(magnitude)).astype(np.int32) - 7, 0, 7)
+    mantissa = (magnitude >> (exponent + 3)) & 0x0F
+    return (~(sign | (exponent << 4) | mantissa) & 0xFF).astype(np.uint8).tobytes()
+
+
+def encode_alaw(audio: np.ndarray) -> bytes:
+    samples = _to_pcm16(audio)
+    sign = (samples >= 0).astype(np.int32) << 7
+    magnitude = np.minimum(np.abs(samples), 32767)
+    exponent = np.clip(np.floor(np.log2(np.maximum(magnitude, 1))).astype(np.int32) - 7, 0, 7)
+    mantissa = np.where(exponent == 0, magnitude >> 4, magnitude >> (exponent + 3)) & 0x0F
+    return ((sign | (exponent << 4) | mantissa) ^ 0x55).astype(np.uint8).tobytes()
+
+
+def encode_flac(audio: np.ndarray, sample_rate: int = SAMPLE_RATE) -> bytes:
+    if soundfile is None:
+        raise ValueError("FLAC support requires the soundfile package")
+    out = io.BytesIO()
+    soundfile.write(out, audio, sample_rate, format="FLAC", subtype="PCM_16")
+    return out.getvalue()
@@ -0,0 +1,195 @@
+import hashlib
+import threading
+import time
+import numpy as np
+from app.core.config import settings
+from app.voice.audio import SAMPLE_RATE
+from app.voice.cache import get_cache
+from app.voice import whisper_engine
+from app.voice.whisper_engine import VoiceDisabled
+
+# Transcription backends. Callers go through the module-level functions
+# below (they are what the executor ships to worker threads/processes);
+# the backend is chosen per call by options["engine"], which comes from the
+# stream's tier or VOICE_ENGINE. Results are cached by audio content and
+# decode options (app.voice.cache).
+
+
+class TranscriptionEngine:
+    name = None
+
+    def transcribe(self, audio, options: dict) -> dict:
+        # Returns {"text", "language"}
+        raise NotImplementedError
+
+    def transcribe_batch(self, audios: list, options: dict) -> list:
+        return [self.transcribe(audio, options) for audio in audios]
+
+    def memory_bytes(self) -> int:
+        # Size of the loaded models, if the backend can tell
+        return 0
+
+
+class WhisperEngine(TranscriptionEngine):
+    # openai-whisper on torch; tiers may ask for int8 dynamic quantization
+    name = "whisper"
+    quantize = False
+
+    def _options(self, options: dict) -> dict:
+        if self.quantize and not options["quantize"]:
+            return {**options, "quantize": True}
+        return options
+
+    def transcribe(self, audio, options: dict) -> dict:
+        return whisper_engine.transcribe_segment(audio, self._options(options))
+
+    def transcribe_batch(self, audios: list, options: dict) -> list:
+        return whisper_engine.transcribe_batch(audios, self._options(options))
+
+    def memory_bytes(self) -> int:
+        return whisper_engine.loaded_bytes()
+
+
+class QuantizedWhisperEngine(WhisperEngine):
+    # Same models with the Linear layers in int8 (CPU only)
+    name = "whisper-int8"
+    quantize = True
+
+
+class FasterWhisperEngine(TranscriptionEngine):
+    # CTranslate2 int8 runtime (optional faster-whisper package). Its models
+    # live outside torch and are not counted against VOICE_MODEL_MEMORY_MB.
+    name = "faster-whisper"
+
+    def __init__(self):
+        self._models = {}
+        self._lock = threading.Lock()
+        self._loading = {}
+
+    def _model(self, options: dict):
+        device = settings.WHISPER_DEVICE
+        compute_type = "int8" if device == "cpu" else ("float16" if options["fp16"] else "float32")
+        key = (options["model"], device, compute_type)
+
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                return model
+            if not settings.VOICE_ENABLED:
+                raise VoiceDisabled("Voice transcription is disabled on this worker")
+            loading = self._loading.setdefault(key, threading.Lock())
+
+        # As in whisper_engine.get_model: one load per model, other models
+        # stay available meanwhile
+        with loading:
+            with self._lock:
+                model = self._models.get(key)
+            if model is not None:
+                return model
+            try:
+                from faster_whisper import WhisperModel
+            except ImportError:
+                raise RuntimeError("The faster-whisper engine needs the faster-whisper package")
+            model = WhisperModel(options["model"], device=device, compute_type=compute_type)
+            with self._lock:
+                self._models[key] = model
+                self._loading.pop(key, None)
+        print(f"Loaded faster-whisper model '{options['model']}' on {device} ({compute_type})")
+        return model
+
+    def transcribe(self, audio, options: dict) -> dict:
+        segments, info = self._model(options).transcribe(
+            audio,
+            language=options["language"],
+            temperature=list(options["temperature"]),
+            beam_size=options["beam_size"] or 1,
+            initial_prompt=options["initial_prompt"],
+            condition_on_previous_text=False
+        )
+        return {"text": "".join(segment.text for segment in segments), "language": info.language}
+
+
+class FakeEngine(TranscriptionEngine):
+    # Deterministic stand-in for load tests: the text is derived from the
+    # audio bytes, and VOICE_FAKE_ENGINE_RTF seconds of CPU are burnt per
+    # second of audio so queues and executors behave as under a real model
+    name = "fake"
+
+    def transcribe(self, audio, options: dict) -> dict:
+        audio = np.asarray(audio, dtype=np.float32)
+        seconds = len(audio) / SAMPLE_RATE
+
+        deadline = time.perf_counter() + seconds * settings.VOICE_FAKE_ENGINE_RTF
+        while time.perf_counter() < deadline:
+            pass
+
+        digest = hashlib.blake2b(audio.tobytes(), digest_size=4).hexdigest()
+        return {"text": f"segment {digest} {seconds:.1f}s", "language": options["language"] or "en"}
+
+
+ENGINES = {
+    engine.name: engine
+    for engine in (WhisperEngine, QuantizedWhisperEngine, FasterWhisperEngine, FakeEngine)
+}
+_instances = {}
+
+
+def get_engine(name: str = None) -> TranscriptionEngine:
+    name = name or settings.VOICE_ENGINE
+    engine = _instances.get(name)
+    if engine is None:
+        if name not in ENGINES:
+            raise ValueError(f"Unknown transcription engine: {name}")
+        engine = _instances.setdefault(name, ENGINES[name]())
+    return engine
+
+
+def decode_options(tier: str = None, **overrides) -> dict:
+    # Per-stream decoding settings; a stream builds these once and reuses them
+    tier = tier or settings.VOICE_DEFAULT_TIER
+    spec = settings.VOICE_TIERS.get(tier)
+    if spec is None:
+        raise ValueError(f"Unknown transcription tier: {tier}")
+
+    options = {
+        "tier": tier,
+        "engine": spec.get("engine") or settings.VOICE_ENGINE,
+        "model": spec.get("model") or settings.WHISPER_MODEL,
+        "quantize": bool(spec.get("quantize", False)),
+        "language": settings.VOICE_DEFAULT_LANGUAGE,
+        "temperature": tuple(spec.get("temperature", settings.WHISPER_TEMPERATURES)),
+        "beam_size": spec.get("beam_size", settings.WHISPER_BEAM_SIZE),
+        "fp16": spec.get("fp16", settings.WHISPER_FP16),
+        "initial_prompt": None
+    }
+    options.update(overrides)
+    return options
+
+
+def transcribe_segment(audio, options: dict = None) -> dict:
+    options = options or decode_options()
+    engine = get_engine(options["engine"])
+    cache = get_cache()
+    if cache is None:
+        return engine.transcribe(audio, options)
+    return cache.transcribe(engine.transcribe, audio, options)
+
+
+def transcribe_audio(audio, options: dict = None) -> str:
+    return transcribe_segment(audio, options)["text"]
+
+
+def transcribe_batch(audios: list, options: dict = None) -> list:
+    options = options or decode_options()
+    engine = get_engine(options["engine"])
+    cache = get_cache()
+    if cache is None:
+        return engine.transcribe_batch(audios, options)
+    # Only the chunks not seen before go through the model
+    return cache.transcribe_batch(engine.transcribe_batch, audios, options)
+
+
+def warm_up(tier: str = None):
+    # Load the tier's model and run one short decode so the first real chunk
+    # does not pay for lazy initialisation
+    transcribe_audio(np.zeros(SAMPLE_RATE, dtype=np.float32), decode_options(tier))
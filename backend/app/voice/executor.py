@@ -0,0 +1,104 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from app.core.config import settings
+from app.core.metrics import metrics
+
+
+class TranscriptionQueueFull(Exception):
+    pass
+
+
+def _timed_call(fn, args, kwargs):
+    # Runs inside the pool; wall-clock start time works across processes
+    started_at = time.time()
+    return started_at, fn(*args, **kwargs)
+
+
+class TranscriptionExecutor:
+    """
+    Runs blocking transcription work on a thread or process pool, or on the
+    shared transcription workers (app.voice.worker), so the event loop keeps
+    serving other requests. At most `workers + queue_size` jobs are
+    admitted at once; callers beyond that wait up to `queue_timeout` seconds
+    and then get TranscriptionQueueFull.
+    """
+
+    def __init__(self, kind: str = "thread", workers: int = 1, queue_size: int = 8,
+                 queue_timeout: float = 10.0):
+        if kind == "process":
+            self.pool = ProcessPoolExecutor(max_workers=workers)
+        elif kind == "remote":
+            # Pool started separately with python -m app.voice.worker
+            from app.voice.worker import WorkerClient
+            self.pool = WorkerClient()
+        elif kind == "thread":
+            self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="transcribe")
+        else:
+            raise ValueError(f"Unknown executor kind: {kind}")
+
+        self.kind = kind
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(workers + queue_size)
+        self._admitted = 0
+
+    @property
+    def queue_depth(self) -> int:
+        # The pool runs `workers` jobs at a time; everything else admitted is waiting
+        return max(0, self._admitted - self.workers)
+
+    def _publish(self):
+        metrics.set_gauge("voice.executor.queue_depth", self.queue_depth)
+        metrics.set_gauge("voice.executor.in_flight", min(self._admitted, self.workers))
+
+    async def run(self, fn, *args, **kwargs):
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            metrics.inc("voice.executor.rejected")
+            raise TranscriptionQueueFull("Transcription queue is full")
+
+        loop = asyncio.get_running_loop()
+        submitted_at = time.time()
+        self._admitted += 1
+        self._publish()
+
+        try:
+            future = loop.run_in_executor(self.pool, _timed_call, fn, args, kwargs)
+            started_at, result = await future
+            finished_at = time.time()
+
+            metrics.observe("voice.executor.wait_seconds", max(0.0, started_at - submitted_at))
+            metrics.observe("voice.executor.run_seconds", finished_at - started_at)
+            metrics.inc("voice.executor.completed")
+            return result
+        finally:
+            self._admitted -= 1
+            self._slots.release()
+            self._publish()
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+_executor: TranscriptionExecutor = None
+
+
+def get_executor() -> TranscriptionExecutor:
+    global _executor
+    if _executor is None:
+        _executor = TranscriptionExecutor(
+            kind=settings.VOICE_EXECUTOR,
+            workers=settings.VOICE_WORKERS,
+            queue_size=settings.VOICE_QUEUE_SIZE,
+            queue_timeout=settings.VOICE_QUEUE_TIMEOUT_SECONDS
+        )
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
@@ -0,0 +1,94 @@
+"""
+Re-transcribe archived consult audio (see app.voice.archive), e.g. after a
+model upgrade. Runs offline, one interaction per worker process, feeding the
+engine large batches of 30 s windows:
+
+    python -m app.voice.replay --day 2026-10-17 --tier quality --workers 4 --output replays/
+
+Each interaction's segments are written to <output>/<tenant>/<interaction>.jsonl;
+live transcripts in MongoDB are left untouched.
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from app.core.config import settings
+from app.voice.archive import iter_windows, list_archives, open_archive
+from app.voice.audio import SAMPLE_RATE
+from app.voice.engines import decode_options, transcribe_batch
+from app.voice.vad import gate
+
+
+def replay_interaction(tenant_id: str, interaction_id: str, options: dict = None,
+                       batch_size: int = None, window_seconds: float = None) -> list:
+    options = options or decode_options()
+    batch_size = batch_size or settings.VOICE_REPLAY_BATCH_SIZE
+    window_seconds = window_seconds or settings.VOICE_REPLAY_WINDOW_SECONDS
+
+    samples, ranges = open_archive(tenant_id, interaction_id)
+    segments = []
+    batch = []
+
+    def run_batch():
+        results = transcribe_batch([audio for _, _, audio in batch], options)
+        for (start, end, _), result in zip(batch, results):
+            segments.append({"start": round(start, 2), "end": round(end, 2), "text": result["text"].strip()})
+        batch.clear()
+
+    for start, window in iter_windows(samples, ranges, window_seconds):
+        speech = gate(window)
+        if speech is None:
+            continue
+        batch.append((start, start + len(window) / SAMPLE_RATE, speech))
+        if len(batch) >= batch_size:
+            run_batch()
+    if batch:
+        run_batch()
+
+    return segments
+
+
+def _replay_to_file(tenant_id: str, interaction_id: str, tier: str, batch_size: int, output: str) -> int:
+    options = decode_options(tier)
+    segments = replay_interaction(tenant_id, interaction_id, options, batch_size)
+
+    path = os.path.join(output, tenant_id, interaction_id + ".jsonl")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        for segment in segments:
+            f.write(json.dumps({**segment, "engine": options["engine"], "model": options["model"]}) + "\n")
+    return len(segments)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--day", help="YYYY-MM-DD; default: every archived interaction")
+    parser.add_argument("--tenant")
+    parser.add_argument("--tier")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=settings.VOICE_REPLAY_BATCH_SIZE)
+    parser.add_argument("--output", default="replays")
+    args = parser.parse_args()
+
+    if not settings.VOICE_ARCHIVE_DIR:
+        parser.error("VOICE_ARCHIVE_DIR is not set")
+
+    archives = list_archives(day=args.day, tenant_id=args.tenant)
+    print(f"Replaying {len(archives)} interactions with {args.workers} workers")
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {
+            pool.submit(_replay_to_file, tenant_id, interaction_id, args.tier, args.batch_size, args.output):
+                (tenant_id, interaction_id)
+            for tenant_id, interaction_id in archives
+        }
+        for future in as_completed(futures):
+            tenant_id, interaction_id = futures[future]
+            try:
+                print(f"{tenant_id}/{interaction_id}: {future.result()} segments")
+            except Exception as e:
+                print(f"{tenant_id}/{interaction_id}: failed ({e})")
+
+
+if __name__ == "__main__":
+    main()
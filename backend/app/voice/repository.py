@@ -1,8 +1,229 @@
+import asyncio
+import uuid
+from datetime import datetime
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.core.config import settings
 from app.db.repository import BaseRepository
 
 class TranscriptRepository(BaseRepository):
+    """
+    Transcripts are split across two collections:
+    - voice_transcripts: one header per interaction (owner, segment counter)
+    - voice_transcript_buckets: segments, TRANSCRIPT_BUCKET_SIZE per document,
+      keyed by (interaction_id, bucket) where bucket = seq // bucket size
+    Header documents written before bucketing may still hold a `segments` array.
+    """
+
     def __init__(self, db):
         super().__init__(db["voice_transcripts"])
+        self.buckets = db["voice_transcript_buckets"]
+        self.bucket_size = settings.TRANSCRIPT_BUCKET_SIZE
+        # Segment and seq writes issued through this instance
+        self.writes = 0
+
+    async def ensure_indexes(self):
+        # Unique keys let concurrent upserts converge on one document.
+        # Before bucketing, racing first appends could create two headers for
+        # one interaction; until the index exists those are merged first or
+        # it cannot build. Once it does, duplicates cannot appear and the
+        # scan is skipped
+        indexes = await self.collection.index_information()
+        if not indexes.get("interaction_id_1", {}).get("unique"):
+            merged = await self.merge_duplicate_headers()
+            if merged:
+                print(f"Merged {merged} duplicate transcript headers")
+        await self.collection.create_index("interaction_id", unique=True)
+        await self.buckets.create_index(
+            [("interaction_id", ASCENDING), ("bucket", ASCENDING)], unique=True
+        )
+
+    async def merge_duplicate_headers(self) -> int:
+        # Folds every interaction's extra headers into its oldest one: legacy
+        # segments are combined in timestamp order, counters keep their
+        # highest value. Returns the number of headers removed
+        duplicates = self.collection.aggregate([
+            {"$group": {"_id": "$interaction_id", "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": 1}}}
+        ])
+        removed = 0
+        async for group in duplicates:
+            cursor = self.collection.find({"interaction_id": group["_id"]})
+            headers = await cursor.sort([("created_at", ASCENDING), ("_id", ASCENDING)]).to_list(length=None)
+            keep, extra = headers[0], headers[1:]
+
+            merged = {}
+            segments = [segment for header in headers for segment in header.get("segments", [])]
+            if segments:
+                merged["segments"] = sorted(segments, key=lambda segment: segment.get("timestamp", ""))
+            for counter in ("last_seq", "acked_seq"):
+                values = [header[counter] for header in headers if counter in header]
+                if values:
+                    merged[counter] = max(values)
+
+            if merged:
+                await self.collection.update_one({"_id": keep["_id"]}, {"$set": merged})
+            result = await self.collection.delete_many({"_id": {"$in": [header["_id"] for header in extra]}})
+            removed += result.deleted_count
+        return removed
 
     async def find_by_interaction(self, interaction_id: str):
         return await self.find_one({"interaction_id": interaction_id})
+
+    async def next_seq(self, interaction_id: str, tenant_id: str, doctor_id: str, count: int = 1) -> int:
+        # Reserves `count` consecutive sequence numbers and returns the first one
+        self.writes += 1
+        header = await self.collection.find_one_and_update(
+            {"interaction_id": interaction_id},
+            {
+                "$inc": {"last_seq": count},
+                "$setOnInsert": {
+                    "_id": str(uuid.uuid4()),
+                    "tenant_id": tenant_id,
+                    "doctor_id": doctor_id,
+                    "created_at": datetime.utcnow().isoformat()
+                }
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return header["last_seq"] - count + 1
+
+    async def advance_seq(self, interaction_id: str, tenant_id: str, doctor_id: str, seq: int):
+        # For segments numbered by the client (protocol 2 frame seqs): creates
+        # the header on the first write and keeps last_seq at or above every
+        # stored seq, so a later next_seq never hands out one already taken
+        self.writes += 1
+        await self.collection.update_one(
+            {"interaction_id": interaction_id},
+            {
+                "$max": {"last_seq": seq},
+                "$setOnInsert": {
+                    "_id": str(uuid.uuid4()),
+                    "tenant_id": tenant_id,
+                    "doctor_id": doctor_id,
+                    "created_at": datetime.utcnow().isoformat()
+                }
+            },
+            upsert=True
+        )
+
+    async def push_segment(self, interaction_id: str, tenant_id: str, doctor_id: str, segment: dict) -> bool:
+        # Single atomic round trip into the segment's bucket; the bucket is
+        # created on its first segment and kept sorted by seq.
+        # Idempotent on (interaction_id, seq): if the bucket already holds the
+        # seq, the filter misses, the upsert collides with the unique bucket
+        # key and nothing is written. Returns False for such duplicates.
+        bucket = segment["seq"] // self.bucket_size
+        self.writes += 1
+        try:
+            await self.buckets.update_one(
+                {"interaction_id": interaction_id, "bucket": bucket, "segments.seq": {"$ne": segment["seq"]}},
+                {
+                    "$push": {"segments": {"$each": [segment], "$sort": {"seq": 1}}},
+                    "$inc": {"count": 1},
+                    "$setOnInsert": {
+                        "_id": str(uuid.uuid4()),
+                        "tenant_id": tenant_id,
+                        "doctor_id": doctor_id,
+                        "created_at": datetime.utcnow().isoformat()
+                    }
+                },
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def push_segments(self, interaction_id: str, tenant_id: str, doctor_id: str, segments: list) -> int:
+        # Batched push_segment: one upsert per bucket touched (normally just
+        # one), issued concurrently. A bucket upsert collides like a single
+        # push if the bucket already holds any of its seqs; those segments are
+        # then retried one by one so the new ones still land. Returns the
+        # number of segments stored.
+        groups = {}
+        for segment in sorted(segments, key=lambda s: s["seq"]):
+            groups.setdefault(segment["seq"] // self.bucket_size, []).append(segment)
+
+        stored = await asyncio.gather(*(
+            self._push_bucket(interaction_id, tenant_id, doctor_id, bucket, group)
+            for bucket, group in groups.items()
+        ))
+        return sum(stored)
+
+    async def _push_bucket(self, interaction_id: str, tenant_id: str, doctor_id: str, bucket: int, group: list) -> int:
+        self.writes += 1
+        try:
+            await self.buckets.update_one(
+                {
+                    "interaction_id": interaction_id,
+                    "bucket": bucket,
+                    "segments.seq": {"$nin": [segment["seq"] for segment in group]}
+                },
+                {
+                    "$push": {"segments": {"$each": group, "$sort": {"seq": 1}}},
+                    "$inc": {"count": len(group)},
+                    "$setOnInsert": {
+                        "_id": str(uuid.uuid4()),
+                        "tenant_id": tenant_id,
+                        "doctor_id": doctor_id,
+                        "created_at": datetime.utcnow().isoformat()
+                    }
+                },
+                upsert=True
+            )
+            return len(group)
+        except DuplicateKeyError:
+            if len(group) == 1:
+                return 0
+
+        stored = 0
+        for segment in group:
+            stored += await self.push_segment(interaction_id, tenant_id, doctor_id, segment)
+        return stored
+
+    async def record_ack(self, interaction_id: str, tenant_id: str, doctor_id: str, seq: int):
+        # Highest client frame seq fully processed (stored or skipped as silence)
+        await self.collection.update_one(
+            {"interaction_id": interaction_id},
+            {
+                "$max": {"acked_seq": seq},
+                "$setOnInsert": {
+                    "_id": str(uuid.uuid4()),
+                    "tenant_id": tenant_id,
+                    "doctor_id": doctor_id,
+                    "created_at": datetime.utcnow().isoformat()
+                }
+            },
+            upsert=True
+        )
+
+    async def last_acked_seq(self, interaction_id: str) -> int:
+        # Resume point: the recorded ack, or the newest stored segment if the
+        # stream ended before its ack was recorded; -1 when nothing is stored
+        header = await self.find_by_interaction(interaction_id)
+        acked = (header or {}).get("acked_seq", -1)
+
+        cursor = self.buckets.find({"interaction_id": interaction_id}, {"segments.seq": 1})
+        async for bucket in cursor.sort("bucket", DESCENDING).limit(1):
+            if bucket.get("segments"):
+                acked = max(acked, bucket["segments"][-1]["seq"])
+
+        return acked
+
+    async def iter_segments(self, interaction_id: str, after_seq: int = None):
+        # Streams segments in order, holding one bucket in memory at a time
+        if after_seq is None:
+            header = await self.find_by_interaction(interaction_id)
+            for segment in (header or {}).get("segments", []):
+                yield segment
+
+        query = {"interaction_id": interaction_id}
+        if after_seq is not None:
+            query["bucket"] = {"$gte": after_seq // self.bucket_size}
+
+        cursor = self.buckets.find(query, {"segments": 1}).sort("bucket", ASCENDING).batch_size(2)
+        async for bucket in cursor:
+            for segment in bucket["segments"]:
+                if after_seq is None or segment["seq"] > after_seq:
+                    yield segment
@@ -1,43 +1,70 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from app.voice.whisper_engine import transcribe_audio
-from app.voice.service import append_transcript_segment
+from fastapi import APIRouter, WebSocket, Depends
+from app.core.jwt_middleware import websocket_identity
+from app.voice.stream import VoiceStream
+from app.voice.broadcast import get_hub, relay
+from app.voice.repository import TranscriptRepository
+from app.interactions.repository import InteractionRepository
+from app.core.metrics import metrics
+from app.roles.guard import require_permission
+from app.roles.service import has_permission
 from app.db.mongo import get_db
-import tempfile
-import os
 
 router = APIRouter()
 
+
 @router.websocket("/stream/{interaction_id}")
 async def voice_stream(websocket: WebSocket, interaction_id: str):
+    identity = await authorize(websocket, interaction_id, "voice:stream")
+    if identity is None:
+        await websocket.close(code=1008)
+        return
+
     await websocket.accept()
 
-    try:
-        while True:
-            audio_bytes = await websocket.receive_bytes()
+    stream = VoiceStream(
+        websocket=websocket,
+        db=get_db(),
+        interaction_id=interaction_id,
+        tenant_id=identity["tenant_id"],
+        doctor_id=identity["user_id"]
+    )
+
+    await stream.run()
+    print("Voice stream closed")
+
 
-            # Save chunk temporarily
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as f:
-                f.write(audio_bytes)
-                temp_path = f.name
+async def interaction_tenant(db, interaction_id: str):
+    # The interaction record, or the transcript header for a stream that
+    # was opened without one
+    interaction = await InteractionRepository(db).find_one({"_id": interaction_id})
+    if interaction is None:
+        interaction = await TranscriptRepository(db).find_by_interaction(interaction_id)
+    return interaction.get("tenant_id") if interaction else None
 
-            # Transcribe
-            text = transcribe_audio(temp_path)
 
-            # Cleanup
-            os.remove(temp_path)
+async def authorize(websocket: WebSocket, interaction_id: str, permission: str):
+    # Token, role permission and the interaction's tenant, checked before
+    # accept(); returns the token payload or None
+    identity = websocket_identity(websocket)
+    if identity is None or not has_permission(identity.get("role_name"), permission):
+        return None
+    if await interaction_tenant(get_db(), interaction_id) != identity["tenant_id"]:
+        return None
+    return identity
 
-            # Store transcript
-            db = get_db()
-            await append_transcript_segment(
-                db=db,
-                interaction_id=interaction_id,
-                tenant_id=websocket.scope["state"].tenant_id,
-                doctor_id=websocket.scope["state"].user_id,
-                text=text
-            )
 
-            # Send back live text
-            await websocket.send_json({"text": text})
+@router.websocket("/subscribe/{interaction_id}")
+async def voice_subscribe(websocket: WebSocket, interaction_id: str):
+    # Live text of an interaction being transcribed on any worker
+    if await authorize(websocket, interaction_id, "voice:subscribe") is None:
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+    subscription = await get_hub().subscribe(interaction_id)
+    await relay(websocket, subscription)
+
 
-    except WebSocketDisconnect:
-        print("Voice stream closed")
+@router.get("/metrics", dependencies=[Depends(require_permission("audit:view"))])
+async def voice_metrics():
+    return metrics.snapshot()
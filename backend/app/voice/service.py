@@ -1,29 +1,43 @@
+import asyncio
 from datetime import datetime
 from app.voice.repository import TranscriptRepository
+from app.voice.engines import transcribe_segment
+from app.voice.executor import get_executor
+from app.voice.batcher import get_scheduler, can_batch
+
+async def transcribe_chunk(audio, options: dict = None) -> dict:
+    # Returns {"text", "language"}
+    if can_batch(audio):
+        return await get_scheduler().submit(audio, options)
+    return await get_executor().run(transcribe_segment, audio, options)
 
 async def append_transcript_segment(
     db,
     interaction_id: str,
     tenant_id: str,
     doctor_id: str,
-    text: str
+    text: str,
+    seq: int = None
 ):
     repo = TranscriptRepository(db)
 
-    transcript = await repo.find_by_interaction(interaction_id)
+    reserved = seq is None
+    if reserved:
+        seq = await repo.next_seq(interaction_id, tenant_id, doctor_id)
 
     segment = {
+        "seq": seq,
         "timestamp": datetime.utcnow().isoformat(),
         "text": text
     }
 
-    if not transcript:
-        await repo.create({
-            "interaction_id": interaction_id,
-            "tenant_id": tenant_id,
-            "doctor_id": doctor_id,
-            "segments": [segment]
-        })
+    # None when (interaction_id, seq) was already stored, e.g. a resent frame
+    if reserved:
+        stored = await repo.push_segment(interaction_id, tenant_id, doctor_id, segment)
     else:
-        transcript["segments"].append(segment)
-        await repo.update({"_id": transcript["_id"]}, {"segments": transcript["segments"]})
+        # A client seq: the header is brought up to date alongside
+        stored, _ = await asyncio.gather(
+            repo.push_segment(interaction_id, tenant_id, doctor_id, segment),
+            repo.advance_seq(interaction_id, tenant_id, doctor_id, seq)
+        )
+    return segment if stored else None
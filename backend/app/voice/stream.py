@@ -0,0 +1,515 @@
+import asyncio
+import json
+import struct
+import time
+from collections import deque
+import numpy as np
+from fastapi import WebSocketDisconnect
+from app.core.config import settings
+from app.voice.archive import ArchiveWriter
+from app.voice.audio import SAMPLE_RATE
+from app.voice.broadcast import get_hub
+from app.voice.codecs import available_codecs, get_decoder, negotiate
+from app.voice.buffer import AudioStreamBuffer
+from app.voice.executor import TranscriptionQueueFull
+from app.core.metrics import metrics
+from app.voice.repository import TranscriptRepository
+from app.voice.service import transcribe_chunk
+from app.voice.engines import decode_options
+from app.tenants.repository import TenantRepository
+from app.voice.vad import gate
+from app.voice.writer import SegmentWriter
+from app.ai.service import release_rolling_update, schedule_rolling_update
+
+# Protocol 2 frame header: big-endian uint32 sequence number
+FRAME_HEADER = struct.Struct(">I")
+
+
+class PcmQueue:
+    """
+    Bounded hand-off between the socket reader and the transcription side of
+    one stream, measured in samples. The consumer always takes everything
+    queued at once, so a slow transcription coalesces the backlog into one
+    larger piece of work. When the bound is reached the "coalesce" policy
+    makes the reader wait (the client sees TCP backpressure, no audio lost);
+    "drop" discards the oldest queued audio to stay close to real time.
+    """
+
+    def __init__(self, max_samples: int, policy: str = "coalesce"):
+        if policy not in ("coalesce", "drop"):
+            raise ValueError(f"Unknown overload policy: {policy}")
+        self.max_samples = max_samples
+        self.policy = policy
+        self.samples = 0
+        self._items = deque()
+        self._readable = asyncio.Event()
+        self._writable = asyncio.Event()
+        self._writable.set()
+        self._closed = False
+
+    async def put(self, pcm: np.ndarray, seq: int = None):
+        if self.policy == "drop":
+            while self._items and self.samples + len(pcm) > self.max_samples:
+                dropped = self._items.popleft()[0]
+                self.samples -= len(dropped)
+                metrics.inc("voice.stream.dropped_samples", len(dropped))
+        else:
+            while self._items and self.samples + len(pcm) > self.max_samples:
+                self._writable.clear()
+                await self._writable.wait()
+
+        self._items.append((pcm, seq, time.perf_counter()))
+        self.samples += len(pcm)
+        self._readable.set()
+
+    async def get_all(self):
+        # Returns (audio, seq of the newest frame) or (None, None) once closed
+        while not self._items:
+            if self._closed:
+                return None, None
+            self._readable.clear()
+            await self._readable.wait()
+
+        items = list(self._items)
+        self._items.clear()
+        self.samples = 0
+        self._writable.set()
+        # "receive" stage: how long the oldest chunk waited for processing
+        metrics.observe("voice.stage.receive_seconds", time.perf_counter() - items[0][2])
+
+        seq = items[-1][1]
+        if len(items) == 1:
+            return items[0][0], seq
+
+        metrics.inc("voice.stream.coalesced_chunks", len(items) - 1)
+        return np.concatenate([item[0] for item in items]), seq
+
+    def close(self):
+        self._closed = True
+        self._readable.set()
+
+
+class VoiceStream:
+    """
+    One /voice/stream connection: the socket reader decodes frames into a
+    PcmQueue, the processing task cuts them into windows, sends their text
+    and stores it through a SegmentWriter. Wire protocol: app/voice/README.md.
+    """
+
+    def __init__(self, websocket, db, interaction_id: str, tenant_id: str, doctor_id: str):
+        self.websocket = websocket
+        self.db = db
+        self.interaction_id = interaction_id
+        self.tenant_id = tenant_id
+        self.doctor_id = doctor_id
+        self.connected = True
+
+        self.protocol = 1
+        self.codec = "auto"
+        self.decode = get_decoder(self.codec)
+        self.last_received_seq = -1
+        self.acked_seq = -1
+        self._completed_seq = -1
+        # Set when a protocol 2 window could not be transcribed: nothing past
+        # the last real ack may be acked, the client resends from there
+        self._rejected = False
+        # (absolute end sample, seq) for frames not yet fully consumed
+        self._frames = deque()
+        self._pushed = 0
+        self._pending_texts = []
+        self.writer = SegmentWriter(db, interaction_id, tenant_id, doctor_id, on_flush=self._flushed)
+        self._summarized = 0
+        # Opened on the first chunk when VOICE_ARCHIVE_DIR is set
+        self.archive = None
+        self._archive_enabled = bool(settings.VOICE_ARCHIVE_DIR)
+
+        self.options = decode_options()
+        self.previous_text = ""
+
+        self.buffer = AudioStreamBuffer(
+            target_seconds=settings.VOICE_WINDOW_SECONDS,
+            min_seconds=settings.VOICE_MIN_WINDOW_SECONDS,
+            pause_ms=settings.VOICE_PAUSE_MS,
+            overlap_ms=settings.VOICE_WINDOW_OVERLAP_MS,
+            threshold_db=settings.VAD_THRESHOLD_DB,
+            frame_ms=settings.VAD_FRAME_MS
+        )
+        self.queue = PcmQueue(
+            max_samples=int(settings.VOICE_STREAM_MAX_QUEUED_SECONDS * SAMPLE_RATE),
+            policy=settings.VOICE_STREAM_OVERLOAD_POLICY
+        )
+        self._interim_step = int(settings.VOICE_INTERIM_SECONDS * SAMPLE_RATE)
+        self._interim_at = 0
+
+        # Processing seconds per second of audio, smoothed
+        self.realtime_factor = None
+        self._flow_sent = None
+        self._flow_sent_at = 0.0
+
+    async def run(self):
+        await self._load_tenant_defaults()
+        await self._send_flow(force=True)
+        receiver = asyncio.create_task(self._receive_loop())
+        processor = asyncio.create_task(self._process_loop())
+
+        await asyncio.wait({receiver, processor}, return_when=asyncio.FIRST_COMPLETED)
+        if not receiver.done():
+            # Processing failed; stop reading audio nobody will handle
+            receiver.cancel()
+
+        self.queue.close()
+        try:
+            await processor
+        finally:
+            await self.close()
+
+    async def _load_tenant_defaults(self):
+        if not self.tenant_id:
+            return
+        tenant = await TenantRepository(self.db).find_by_id(self.tenant_id)
+        if not tenant:
+            return
+        if tenant.get("voice_tier"):
+            try:
+                self.set_tier(tenant["voice_tier"])
+            except ValueError as e:
+                print(f"Tenant {self.tenant_id}: {e}")
+        if tenant.get("voice_language") and self.options["language"] is None:
+            self.options["language"] = tenant["voice_language"]
+
+    def set_tier(self, tier: str):
+        # Keeps a language that was already pinned for this interaction
+        self.options = decode_options(tier, language=self.options["language"])
+
+    def _interim_options(self) -> dict:
+        # The stream's own options if no interim tier is set or it is not
+        # one of VOICE_TIERS
+        tier = settings.VOICE_INTERIM_TIER
+        if not tier or tier == self.options["tier"] or tier not in settings.VOICE_TIERS:
+            return dict(self.options)
+        return decode_options(tier, language=self.options["language"])
+
+    async def _receive_loop(self):
+        try:
+            while True:
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("text") is not None:
+                    if await self.handle_control(message["text"]) is False:
+                        await self.websocket.close(code=1008)
+                        break
+                elif message.get("bytes") is not None:
+                    await self.receive_frame(message["bytes"])
+        except WebSocketDisconnect:
+            pass
+        self.connected = False
+
+    async def handle_control(self, text: str):
+        try:
+            message = json.loads(text)
+        except ValueError:
+            await self._send({"error": "Invalid control message"})
+            return
+
+        if message.get("type") != "hello":
+            await self._send({"error": f"Unknown control message: {message.get('type')}"})
+            return
+
+        if message.get("protocol") == 2:
+            # Frame seqs are the interaction's segment seqs: numbering cannot
+            # start over once segments are stored
+            last_acked = await TranscriptRepository(self.db).last_acked_seq(self.interaction_id)
+            if not message.get("resume", True) and last_acked >= 0:
+                await self._send({"error": "Segments already stored for this interaction; resume after last_acked_seq"})
+                return False
+            self.protocol = 2
+            if message.get("resume", True):
+                self.acked_seq = last_acked
+                self.last_received_seq = max(self.last_received_seq, self.acked_seq)
+            # An ack covers every earlier frame, so no audio may be dropped
+            self.queue.policy = "coalesce"
+
+        if message.get("tier"):
+            try:
+                self.set_tier(message["tier"])
+            except ValueError as e:
+                await self._send({"error": str(e)})
+        if message.get("language"):
+            self.options["language"] = message["language"]
+
+        codec = negotiate(message.get("codecs") or message.get("codec"))
+        try:
+            self.decode = get_decoder(codec, int(message.get("sample_rate", SAMPLE_RATE)))
+            self.codec = codec
+        except (TypeError, ValueError):
+            await self._send({"error": "Invalid sample_rate"})
+
+        await self._send({
+            "type": "ready",
+            "protocol": self.protocol,
+            "last_acked_seq": self.acked_seq,
+            "codec": self.codec,
+            "codecs": available_codecs(),
+            "language": self.options["language"],
+            "tier": self.options["tier"]
+        })
+
+    async def receive_frame(self, data: bytes):
+        seq = None
+        if self.protocol == 2:
+            if len(data) < FRAME_HEADER.size:
+                await self._send({"error": "Frame too short"})
+                return
+            seq = FRAME_HEADER.unpack_from(data)[0]
+            if seq <= self.last_received_seq:
+                # Already processed (or queued) before a reconnect
+                metrics.inc("voice.stream.duplicate_frames")
+                return
+            data = memoryview(data)[FRAME_HEADER.size:]
+
+        metrics.inc("voice.stream.bytes_received", len(data))
+        metrics.inc(f"voice.codec.{self.codec}.bytes", len(data))
+
+        # Decode the negotiated codec straight into a float32 array
+        try:
+            with metrics.timer("voice.stage.decode_seconds"):
+                audio = self.decode(data)
+        except (ValueError, RuntimeError) as e:
+            await self._send({"error": str(e), "seq": seq} if seq is not None else {"error": str(e)})
+            return
+
+        if seq is not None:
+            self.last_received_seq = seq
+        self._archive_audio(audio, seq)
+        await self.queue.put(audio, seq)
+        metrics.observe("voice.stream.queued_seconds", self.queue.samples / SAMPLE_RATE)
+
+    def _archive_audio(self, audio: np.ndarray, seq: int = None):
+        if not self._archive_enabled:
+            return
+        try:
+            if self.archive is None:
+                self.archive = ArchiveWriter(self.tenant_id, self.interaction_id)
+            self.archive.append(audio, seq)
+        except (OSError, ValueError) as e:
+            # Archiving is best effort; live transcription carries on
+            print(f"Audio archive disabled for interaction {self.interaction_id}: {e}")
+            self._archive_enabled = False
+
+    async def handle_audio(self, audio: np.ndarray, seq: int = None):
+        started = time.perf_counter()
+
+        self._pushed += len(audio)
+        if seq is not None:
+            self._frames.append((self._pushed, seq))
+
+        windows = self.buffer.push(audio)
+        for window in windows:
+            await self._finalize(window)
+            if self._rejected:
+                break
+
+        if not windows:
+            await self._interim()
+
+        await self._commit()
+        self._update_realtime_factor(time.perf_counter() - started, len(audio) / SAMPLE_RATE)
+
+    async def close(self):
+        # Store whatever is still buffered
+        window = self.buffer.flush()
+        if window is not None and not self._rejected:
+            await self._finalize(window)
+        await self._commit()
+        try:
+            await self.writer.close()
+        finally:
+            release_rolling_update(self.interaction_id)
+        if self.archive is not None:
+            self.archive.close()
+
+        if self.protocol == 2 and self.acked_seq >= 0:
+            await TranscriptRepository(self.db).record_ack(
+                self.interaction_id, self.tenant_id, self.doctor_id, self.acked_seq
+            )
+
+    async def _process_loop(self):
+        while True:
+            audio, seq = await self.queue.get_all()
+            if audio is None:
+                return
+            await self.handle_audio(audio, seq)
+            if self._rejected:
+                # 1013 (try again later): the client reconnects and resends
+                # everything after last_acked_seq
+                self.connected = False
+                await self.websocket.close(code=1013)
+                return
+            await self._send_flow()
+
+    async def _send(self, message: dict):
+        if not self.connected:
+            return
+        try:
+            with metrics.timer("voice.stage.send_seconds"):
+                await self.websocket.send_json(message)
+        except (WebSocketDisconnect, RuntimeError):
+            self.connected = False
+
+    async def _transcribe(self, audio, interim: bool = False):
+        # Skip silence / background noise before it costs a Whisper decode
+        speech = gate(audio)
+        if speech is None:
+            return None
+
+        options = self._interim_options() if interim else dict(self.options)
+        if self.previous_text and settings.VOICE_PROMPT_CHARS > 0:
+            options["initial_prompt"] = self.previous_text[-settings.VOICE_PROMPT_CHARS:]
+
+        # Transcribe on the bounded pool (batched across streams when enabled)
+        with metrics.timer("voice.stage.transcribe_seconds"):
+            result = await transcribe_chunk(speech, options)
+
+        if not interim and self.options["language"] is None and result.get("language"):
+            # Detected once; later windows skip the detection pass
+            self.options["language"] = result["language"]
+            metrics.inc("voice.language.pinned")
+
+        return result["text"]
+
+    async def _finalize(self, window):
+        self._interim_at = 0
+
+        try:
+            text = await self._transcribe(window)
+        except TranscriptionQueueFull as e:
+            await self._send({"error": str(e)})
+            if self.protocol == 2:
+                self._rejected = True
+                metrics.inc("voice.stream.rejected_windows")
+            return
+
+        if text is None:
+            return
+
+        self.previous_text = text
+        self._pending_texts.append(text)
+        await self._send_text({"text": text, "final": True})
+
+    async def _commit(self):
+        # Store finished text. Protocol 2 stores it under the newest frame
+        # whose audio has been fully consumed, then acks that frame.
+        if self.protocol == 1:
+            for text in self._pending_texts:
+                await self.writer.add(text)
+            self._pending_texts = []
+            return
+
+        if self._rejected:
+            # Text of this push is transcribed again when the client resends
+            self._pending_texts = []
+            return
+
+        consumed = self._pushed - self.buffer.new_samples
+        completed = None
+        while self._frames and self._frames[0][0] <= consumed:
+            completed = self._frames.popleft()[1]
+
+        if completed is None:
+            return
+
+        self._completed_seq = completed
+        if self._pending_texts:
+            await self.writer.add(" ".join(self._pending_texts), seq=completed)
+            self._pending_texts = []
+
+        # With text still waiting to be written the ack comes from the flush
+        await self._ack()
+
+    async def _flushed(self):
+        # After each batched write: ack its frames, keep the running summary going
+        await self._ack()
+        schedule_rolling_update(self.db, self.interaction_id, self.writer.stored - self._summarized)
+        self._summarized = self.writer.stored
+
+    async def _ack(self):
+        if self.protocol != 2:
+            return
+        # Only as far as the text is known to be stored: a flush that ends
+        # while newer text is pending or being written covers its own batch
+        seq = self._completed_seq
+        if self.writer.unwritten:
+            seq = min(seq, self.writer.written_seq)
+        if seq <= self.acked_seq:
+            return
+        self.acked_seq = seq
+        await self._send({"type": "ack", "seq": self.acked_seq})
+
+    async def _interim(self):
+        # Skipped while a backlog is queued: catching up matters more than captions
+        if self._interim_step <= 0 or self.queue.samples:
+            return
+        if self.buffer.new_samples - self._interim_at < self._interim_step:
+            return
+        self._interim_at = self.buffer.new_samples
+
+        try:
+            text = await self._transcribe(self.buffer.pending().copy(), interim=True)
+        except TranscriptionQueueFull:
+            # Interim text is best effort; the window's final decode still runs
+            return
+
+        if text is not None:
+            await self._send_text({"text": text, "final": False})
+
+    async def _send_text(self, message: dict):
+        # To the speaker's socket first, then to everyone watching the interaction
+        await self._send(message)
+        await get_hub().publish(self.interaction_id, message)
+
+    def _update_realtime_factor(self, elapsed: float, audio_seconds: float):
+        if audio_seconds <= 0:
+            return
+        sample = elapsed / audio_seconds
+        if self.realtime_factor is None:
+            self.realtime_factor = sample
+        else:
+            self.realtime_factor = 0.8 * self.realtime_factor + 0.2 * sample
+        metrics.observe("voice.stream.realtime_factor", sample)
+
+    def flow_control(self) -> dict:
+        base_chunk_ms = settings.VOICE_CLIENT_CHUNK_MS
+        rtf = self.realtime_factor or 0.0
+        queued_ms = int(self.queue.samples * 1000 / SAMPLE_RATE)
+
+        # Falling behind: ask for larger, less frequent chunks, and report the
+        # audio rate (seconds of audio per second) the server can sustain
+        if rtf > 1.0 or queued_ms > base_chunk_ms * 4:
+            chunk_ms = min(int(base_chunk_ms * max(2.0, rtf * 2)), int(settings.VOICE_WINDOW_SECONDS * 1000))
+        else:
+            chunk_ms = base_chunk_ms
+
+        sustainable = 1.0 if rtf <= 0 else min(1.0, 1.0 / rtf)
+        return {
+            "type": "flow",
+            "chunk_ms": chunk_ms,
+            "max_chunks_per_second": round(sustainable * 1000 / chunk_ms, 2),
+            "realtime_factor": round(rtf, 3),
+            "queued_ms": queued_ms
+        }
+
+    async def _send_flow(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._flow_sent_at < settings.VOICE_FLOW_INTERVAL_SECONDS:
+            return
+
+        message = self.flow_control()
+        changed = self._flow_sent is None or (
+            message["chunk_ms"], message["max_chunks_per_second"]
+        ) != (self._flow_sent["chunk_ms"], self._flow_sent["max_chunks_per_second"])
+
+        if force or changed:
+            await self._send(message)
+            self._flow_sent = message
+        self._flow_sent_at = now
@@ -0,0 +1,80 @@
+import numpy as np
+from app.core.config import settings
+from app.voice.audio import SAMPLE_RATE
+from app.core.metrics import metrics
+
+_EPS = 1e-10
+
+
+def frame_energy_db(audio: np.ndarray, frame_samples: int) -> np.ndarray:
+    n_frames = len(audio) // frame_samples
+    if n_frames == 0:
+        n_frames, frame_samples = 1, len(audio)
+
+    frames = audio[:n_frames * frame_samples].reshape(n_frames, frame_samples)
+    power = np.einsum("ij,ij->i", frames, frames, dtype=np.float64) / frame_samples
+    return 10 * np.log10(power + _EPS)
+
+
+def speech_mask(audio: np.ndarray, threshold_db: float, frame_ms: int, hangover_ms: int) -> np.ndarray:
+    frame_samples = max(1, SAMPLE_RATE * frame_ms // 1000)
+    voiced = frame_energy_db(audio, frame_samples) > threshold_db
+
+    # Keep a little context around each voiced frame so word onsets and
+    # trailing consonants are not clipped
+    hangover = hangover_ms // frame_ms
+    if hangover and voiced.any():
+        voiced = np.convolve(voiced.astype(np.int8), np.ones(2 * hangover + 1, dtype=np.int8), mode="same") > 0
+
+    return voiced
+
+
+def trim_to_speech(audio: np.ndarray, threshold_db: float, frame_ms: int, hangover_ms: int):
+    """
+    Returns (speech_audio, voiced_frames, total_frames). speech_audio is None
+    when the chunk holds no speech; a contiguous voiced region is returned as
+    a view, scattered regions are compacted into one array.
+    """
+    if len(audio) == 0:
+        return None, 0, 0
+
+    mask = speech_mask(audio, threshold_db, frame_ms, hangover_ms)
+    voiced_frames = int(mask.sum())
+    if voiced_frames == 0:
+        return None, 0, len(mask)
+
+    frame_samples = len(audio) // len(mask)
+    voiced_idx = np.flatnonzero(mask)
+    first, last = voiced_idx[0], voiced_idx[-1]
+
+    if last - first + 1 == voiced_frames:
+        end = len(audio) if last == len(mask) - 1 else (last + 1) * frame_samples
+        return audio[first * frame_samples:end], voiced_frames, len(mask)
+
+    sample_mask = np.repeat(mask, frame_samples)
+    # Samples past the last whole frame follow the last frame's decision
+    tail = np.full(len(audio) - len(sample_mask), mask[-1], dtype=bool)
+    return audio[np.concatenate([sample_mask, tail])], voiced_frames, len(mask)
+
+
+def gate(audio: np.ndarray):
+    # Drops silent chunks and trims non-speech before transcription
+    if not settings.VAD_ENABLED:
+        return audio
+
+    speech, voiced_frames, total_frames = trim_to_speech(
+        audio,
+        threshold_db=settings.VAD_THRESHOLD_DB,
+        frame_ms=settings.VAD_FRAME_MS,
+        hangover_ms=settings.VAD_HANGOVER_MS
+    )
+
+    metrics.inc("voice.vad.frames_total", total_frames)
+    metrics.inc("voice.vad.frames_skipped", total_frames - voiced_frames)
+
+    if speech is None:
+        metrics.inc("voice.vad.chunks_skipped")
+        return None
+
+    metrics.inc("voice.vad.samples_skipped", len(audio) - len(speech))
+    return speech
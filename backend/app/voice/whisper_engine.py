@@ -1,7 +1,148 @@
-import whisper
+import threading
+from collections import OrderedDict
+from app.core.config import settings
+from app.voice.audio import WINDOW_SAMPLES
+from app.core.metrics import metrics
 
-model = whisper.load_model("base")  # start with base, upgrade later
+# Models are loaded on first use (or by warm_up at startup), never at import:
+# importing whisper pulls in torch, which most API workers never need.
+# Several tiers' models stay loaded side by side; when their combined size
+# passes VOICE_MODEL_MEMORY_MB the least recently used one is dropped.
+_models = OrderedDict()  # (name, device, quantize) -> (model, size in bytes)
+_lock = threading.Lock()
+_loading = {}  # key -> lock held while that model loads
 
-def transcribe_audio(audio_path: str) -> str:
-    result = model.transcribe(audio_path)
-    return result["text"]
+
+class VoiceDisabled(Exception):
+    pass
+
+
+def _load(name: str, device: str, quantize: bool):
+    import whisper
+    model = whisper.load_model(name, device=device)
+    if quantize and device == "cpu":
+        model = quantize_model(model)
+    return model
+
+
+def quantize_model(model):
+    # int8 dynamic quantization of the Linear layers (CPU only). Whisper uses
+    # its own Linear subclass, which quantize_dynamic does not recognise; it
+    # only adds a dtype cast, so the layers are turned back into nn.Linear first
+    import torch
+    import whisper
+
+    for module in model.modules():
+        if type(module) is whisper.model.Linear:
+            module.__class__ = torch.nn.Linear
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _model_bytes(model) -> int:
+    # Counts quantized packed weights too, which are not parameters
+    import torch
+
+    total = 0
+    for value in model.state_dict().values():
+        for tensor in value if isinstance(value, (tuple, list)) else (value,):
+            if isinstance(tensor, torch.Tensor):
+                total += tensor.numel() * tensor.element_size()
+    return total
+
+
+def _evict(budget: int, keep):
+    total = loaded_bytes()
+    for key in list(_models):
+        if total <= budget:
+            break
+        if key == keep:
+            continue
+        _, size = _models.pop(key)
+        total -= size
+        metrics.inc("voice.models.evicted")
+        print(f"Unloaded Whisper model '{key[0]}' to stay under the memory budget")
+    metrics.set_gauge("voice.models.loaded_bytes", total)
+
+
+def get_model(name: str = None, device: str = None, quantize: bool = False):
+    name = name or settings.WHISPER_MODEL
+    device = device or settings.WHISPER_DEVICE
+    key = (name, device, bool(quantize))
+
+    with _lock:
+        entry = _models.get(key)
+        if entry is not None:
+            _models.move_to_end(key)
+            return entry[0]
+
+        if not settings.VOICE_ENABLED:
+            raise VoiceDisabled("Voice transcription is disabled on this worker")
+        loading = _loading.setdefault(key, threading.Lock())
+
+    # Loaded outside _lock, so calls for models already loaded (other tiers)
+    # are not held up; callers wanting this model wait for the one load
+    with loading:
+        with _lock:
+            entry = _models.get(key)
+            if entry is not None:
+                _models.move_to_end(key)
+                return entry[0]
+
+        model = _load(name, device, bool(quantize))
+        size = _model_bytes(model)
+        with _lock:
+            _models[key] = (model, size)
+            _loading.pop(key, None)
+            print(f"Loaded Whisper model '{name}' on {device}{' (int8)' if quantize else ''}")
+            _evict(settings.VOICE_MODEL_MEMORY_MB * 1024 * 1024, keep=key)
+
+    return model
+
+
+def _model_for(options: dict):
+    return get_model(options["model"], quantize=options["quantize"])
+
+
+def loaded_bytes() -> int:
+    return sum(size for _, size in _models.values())
+
+
+def transcribe_segment(audio, options: dict) -> dict:
+    # Accepts a file path or a 16 kHz float32 NumPy array (see app.voice.audio);
+    # arrays are handed to the model as-is, skipping the ffmpeg decode.
+    # A pinned language skips Whisper's per-call language detection pass.
+    model = _model_for(options)
+    result = model.transcribe(
+        audio,
+        language=options["language"],
+        temperature=options["temperature"],
+        beam_size=options["beam_size"],
+        fp16=options["fp16"] and model.device.type == "cuda",
+        initial_prompt=options["initial_prompt"],
+        condition_on_previous_text=False
+    )
+    return {"text": result["text"], "language": result.get("language")}
+
+
+def transcribe_batch(audios: list, options: dict) -> list:
+    # One encoder/decoder pass over a batch of <=30 s chunks; each chunk is
+    # padded to Whisper's 30 s window and decoded independently. Batched
+    # decoding shares one set of options and has no per-chunk prompt or
+    # temperature fallback, so only the first temperature is used.
+    import torch
+    import whisper
+
+    model = _model_for(options)
+    mels = torch.stack([
+        whisper.log_mel_spectrogram(whisper.pad_or_trim(audio, WINDOW_SAMPLES), model.dims.n_mels)
+        for audio in audios
+    ]).to(model.device)
+
+    decoding = whisper.DecodingOptions(
+        language=options["language"],
+        temperature=options["temperature"][0],
+        beam_size=options["beam_size"],
+        fp16=options["fp16"] and model.device.type == "cuda"
+    )
+    results = whisper.decode(model, mels, decoding)
+    return [{"text": result.text, "language": result.language} for result in results]
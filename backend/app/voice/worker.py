@@ -0,0 +1,334 @@
+"""
+Out-of-process transcription pool. Models live only in the pool's worker
+processes, so API workers stay small, start quickly and never decode on
+their own GIL. Start it next to the API:
+
+    python -m app.voice.worker --workers 2 --warmup
+
+and set VOICE_EXECUTOR=remote. Every API process then sends its
+transcription calls to the pool over VOICE_WORKER_ADDRESS; both sides
+authenticate with VOICE_WORKER_AUTHKEY, which must be set. Audio does not
+go through the socket: the caller copies each call's arrays into a shared
+memory block and sends only the block name, offsets and shapes; the worker
+reads the audio in place. Results come back as they finish, in any order.
+"""
+import argparse
+import itertools
+import os
+import pickle
+import signal
+import sys
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from multiprocessing import AuthenticationError, get_context, resource_tracker
+from multiprocessing.connection import Client, Listener
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+from app.core.config import settings
+from app.voice.executor import TranscriptionQueueFull
+from app.core.metrics import metrics
+
+# Shared blocks are reused between calls; smaller ones are rounded up
+MIN_BLOCK_BYTES = 1 << 20
+MAX_FREE_BLOCKS = 8
+
+
+class TranscriptionWorkerUnavailable(TranscriptionQueueFull):
+    pass
+
+
+class SharedArray:
+    # Stands in for a numpy array that was copied into the call's shared block
+    __slots__ = ("offset", "shape", "dtype")
+
+    def __init__(self, offset: int, shape: tuple, dtype: str):
+        self.offset = offset
+        self.shape = shape
+        self.dtype = dtype
+
+    def __reduce__(self):
+        return SharedArray, (self.offset, self.shape, self.dtype)
+
+
+def _address(value: str):
+    # "host:port" for TCP, anything else is a unix socket path
+    host, sep, port = value.rpartition(":")
+    if sep and port.isdigit():
+        return host, int(port)
+    return value
+
+
+def _authkey() -> bytes:
+    # Its own secret: a leaked token-signing key must not also let callers
+    # hand pickled jobs to the pool
+    if not settings.VOICE_WORKER_AUTHKEY:
+        raise ValueError("VOICE_WORKER_AUTHKEY must be set to use the transcription worker pool")
+    return settings.VOICE_WORKER_AUTHKEY.encode()
+
+
+def _arrays(value):
+    if isinstance(value, np.ndarray):
+        yield value
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _arrays(item)
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _arrays(item)
+
+
+def _replace(value, swap):
+    if isinstance(value, (np.ndarray, SharedArray)):
+        return swap(value)
+    if isinstance(value, list):
+        return [_replace(item, swap) for item in value]
+    if isinstance(value, tuple):
+        return tuple(_replace(item, swap) for item in value)
+    if isinstance(value, dict):
+        return {key: _replace(item, swap) for key, item in value.items()}
+    return value
+
+
+# Worker side
+
+def _run_job(block_name: str, fn, args: tuple, kwargs: dict):
+    if block_name is None:
+        return fn(*args, **kwargs)
+
+    block = SharedMemory(name=block_name)
+    # The caller owns the block; this process must not unlink it on exit
+    resource_tracker.unregister(block._name, "shared_memory")
+    try:
+        def view(shared):
+            return np.ndarray(shared.shape, dtype=shared.dtype, buffer=block.buf, offset=shared.offset)
+
+        args, kwargs = _replace(args, view), _replace(kwargs, view)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            # Views must be gone before the mapping can be closed
+            del args, kwargs
+    finally:
+        try:
+            block.close()
+        except BufferError:
+            # A traceback still references a view; unmapped once collected
+            pass
+
+
+class WorkerServer:
+    """
+    Accepts API processes on `address` and runs their calls on a pool of
+    `workers` processes. Each connection gets a reader thread; replies are
+    sent from pool callbacks as calls finish.
+    """
+
+    def __init__(self, address: str = None, workers: int = None, warmup: bool = False):
+        self.address = _address(address or settings.VOICE_WORKER_ADDRESS)
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+
+        initializer = None
+        if warmup:
+            from app.voice.engines import warm_up
+            initializer = warm_up
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers or settings.VOICE_WORKERS,
+            mp_context=get_context("spawn"),
+            initializer=initializer
+        )
+        self.listener = Listener(self.address, authkey=_authkey())
+
+    def serve_forever(self):
+        print(f"Transcription workers listening on {self.listener.address}")
+        while True:
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                # Listener closed
+                return
+            except Exception as e:
+                print(f"Rejected transcription client: {e}")
+                continue
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        send_lock = threading.Lock()
+
+        def reply(job_id, future):
+            try:
+                message = (job_id, future.result(), None)
+            except Exception as e:
+                message = (job_id, None, e)
+            try:
+                data = pickle.dumps(message)
+            except Exception as e:
+                data = pickle.dumps((job_id, None, RuntimeError(f"Unpicklable result: {e}")))
+            try:
+                with send_lock:
+                    conn.send_bytes(data)
+            except OSError:
+                pass
+
+        try:
+            while True:
+                job_id, block_name, fn, args, kwargs = pickle.loads(conn.recv_bytes())
+                future = self.pool.submit(_run_job, block_name, fn, args, kwargs)
+                future.add_done_callback(lambda f, job_id=job_id: reply(job_id, f))
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+
+    def close(self):
+        self.listener.close()
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+
+# API side
+
+class WorkerClient(Executor):
+    """
+    concurrent.futures executor backed by a WorkerServer, used by
+    TranscriptionExecutor for VOICE_EXECUTOR="remote". numpy arguments
+    travel through shared memory; functions are sent by reference and must
+    be importable by the workers. Connects lazily and reconnects on the next
+    call after the server went away; calls in flight then fail with
+    TranscriptionWorkerUnavailable.
+    """
+
+    def __init__(self, address: str = None):
+        self.address = _address(address or settings.VOICE_WORKER_ADDRESS)
+        self._conn = None
+        self._lock = threading.Lock()
+        self._job_ids = itertools.count()
+        # job_id -> (future, block)
+        self._pending = {}
+        self._free = []
+
+    def _connect(self):
+        if self._conn is None:
+            try:
+                self._conn = Client(self.address, authkey=_authkey())
+            except (OSError, EOFError, AuthenticationError) as e:
+                raise TranscriptionWorkerUnavailable(f"Transcription workers unavailable: {e}")
+            threading.Thread(target=self._read, args=(self._conn,), daemon=True).start()
+        return self._conn
+
+    def _allocate(self, size: int) -> SharedMemory:
+        for i, block in enumerate(self._free):
+            if block.size >= size:
+                return self._free.pop(i)
+        return SharedMemory(create=True, size=max(MIN_BLOCK_BYTES, 1 << (size - 1).bit_length()))
+
+    def _release(self, block: SharedMemory):
+        if block is None:
+            return
+        with self._lock:
+            if len(self._free) < MAX_FREE_BLOCKS:
+                self._free.append(block)
+                return
+        block.close()
+        block.unlink()
+
+    def _share(self, args: tuple, kwargs: dict):
+        arrays = list(_arrays((args, kwargs)))
+        if not arrays:
+            return None, args, kwargs
+
+        block = self._allocate(sum(array.nbytes for array in arrays))
+        offset = 0
+
+        def copy(array):
+            nonlocal offset
+            shared = SharedArray(offset, array.shape, array.dtype.str)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf, offset=offset)[...] = array
+            offset += array.nbytes
+            return shared
+
+        args, kwargs = _replace(args, copy), _replace(kwargs, copy)
+        metrics.inc("voice.worker.shared_bytes", offset)
+        return block, args, kwargs
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        future = Future()
+        # Already on its way to a worker: cannot be cancelled from here on
+        future.set_running_or_notify_cancel()
+        with self._lock:
+            conn = self._connect()
+            block, args, kwargs = self._share(args, kwargs)
+            job_id = next(self._job_ids)
+            self._pending[job_id] = (future, block)
+            data = pickle.dumps((job_id, block.name if block else None, fn, args, kwargs))
+            try:
+                conn.send_bytes(data)
+            except OSError as e:
+                # Also fails this call's future and frees its block
+                self._disconnected(conn)
+                raise TranscriptionWorkerUnavailable(f"Transcription workers unavailable: {e}")
+
+        metrics.observe("voice.worker.message_bytes", len(data))
+        return future
+
+    def _read(self, conn):
+        try:
+            while True:
+                job_id, result, error = pickle.loads(conn.recv_bytes())
+                with self._lock:
+                    future, block = self._pending.pop(job_id, (None, None))
+                self._release(block)
+                if future is None:
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+        except (EOFError, OSError):
+            with self._lock:
+                self._disconnected(conn)
+
+    def _disconnected(self, conn):
+        # Called with the lock held
+        if self._conn is conn:
+            self._conn = None
+        conn.close()
+        pending, self._pending = self._pending, {}
+        for future, block in pending.values():
+            if block is not None:
+                block.close()
+                block.unlink()
+            if not future.done():
+                future.set_exception(TranscriptionWorkerUnavailable("Transcription workers disconnected"))
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        with self._lock:
+            if self._conn is not None:
+                self._disconnected(self._conn)
+            for block in self._free:
+                block.close()
+                block.unlink()
+            self._free = []
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--address", default=settings.VOICE_WORKER_ADDRESS)
+    parser.add_argument("--workers", type=int, default=settings.VOICE_WORKERS)
+    parser.add_argument("--warmup", action="store_true", help="load the default tier's model in every worker first")
+    args = parser.parse_args()
+
+    server = WorkerServer(args.address, args.workers, args.warmup)
+    # Stopped like the API: the pool processes go down with the server
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    # Through the importable module, so the pool's pickled references resolve
+    from app.voice.worker import main
+    main()
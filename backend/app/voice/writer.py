@@ -0,0 +1,139 @@
+import asyncio
+import weakref
+from datetime import datetime
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.voice.repository import TranscriptRepository
+
+# Open writers per interaction, so closing an interaction can flush them
+_writers = {}
+
+
+class SegmentWriter:
+    """
+    Coalesces one stream's transcript segments into batched writes, off the
+    live-caption path: text goes to the client straight away and is stored
+    when VOICE_WRITE_FLUSH_SECONDS have passed since the first unflushed
+    segment, when VOICE_WRITE_FLUSH_SEGMENTS are pending, on close(), or
+    when the interaction is closed (flush_interaction). A flush is one
+    bucket upsert per bucket touched (plus one seq reservation or header
+    update) instead of two round trips per segment; segments colliding with
+    stored ones are retried one by one. A failed flush keeps its
+    segments for the next attempt; a failed flush triggered by add() or the
+    timer is logged, not raised. on_flush is awaited after each successful
+    flush; stored counts the segments written so far and written_seq is the
+    highest seq among them.
+    """
+
+    def __init__(self, db, interaction_id: str, tenant_id: str, doctor_id: str,
+                 flush_seconds: float = None, max_segments: int = None, on_flush=None):
+        self.db = db
+        self.interaction_id = interaction_id
+        self.tenant_id = tenant_id
+        self.doctor_id = doctor_id
+        self.flush_seconds = settings.VOICE_WRITE_FLUSH_SECONDS if flush_seconds is None else flush_seconds
+        self.max_segments = max_segments or settings.VOICE_WRITE_FLUSH_SEGMENTS
+        self.on_flush = on_flush
+
+        self.pending = []
+        self.stored = 0
+        # Highest seq known to be in Mongo
+        self.written_seq = -1
+        self._timer = None
+        self._lock = asyncio.Lock()
+        _writers.setdefault(interaction_id, weakref.WeakSet()).add(self)
+
+    async def add(self, text: str, seq: int = None):
+        self.pending.append({"seq": seq, "timestamp": datetime.utcnow().isoformat(), "text": text})
+
+        if self.flush_seconds <= 0 or len(self.pending) >= self.max_segments:
+            await self._try_flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_seconds)
+        self._timer = None
+        await self._try_flush()
+
+    async def _try_flush(self):
+        try:
+            await self.flush()
+        except Exception as e:
+            # Kept pending; the next add, flush or close retries
+            print(f"Transcript flush failed for interaction {self.interaction_id}: {e}")
+
+    @property
+    def unwritten(self) -> bool:
+        # Segments pending or being written right now
+        return bool(self.pending) or self._lock.locked()
+
+    async def flush(self) -> int:
+        if self._timer is not None and self._timer is not asyncio.current_task():
+            self._timer.cancel()
+            self._timer = None
+
+        async with self._lock:
+            batch, self.pending = self.pending, []
+            if not batch:
+                return 0
+
+            try:
+                with metrics.timer("voice.stage.persist_seconds"):
+                    stored, writes = await self._write(batch)
+            except Exception:
+                self.pending = batch + self.pending
+                raise
+
+        self.stored += stored
+        self.written_seq = max(self.written_seq, max(segment["seq"] for segment in batch))
+        # Without coalescing every segment is its own push plus its own seq
+        # reservation (or header update, for client seqs)
+        metrics.inc("voice.writer.segments", len(batch))
+        metrics.inc("voice.writer.writes", writes)
+        metrics.inc("voice.writer.writes_saved", 2 * len(batch) - writes)
+        metrics.observe("voice.writer.batch_size", len(batch))
+        if stored < len(batch):
+            metrics.inc("voice.stream.duplicate_segments", len(batch) - stored)
+
+        if self.on_flush is not None:
+            await self.on_flush()
+        return stored
+
+    async def _write(self, batch: list):
+        # Returns (segments stored, round trips it took)
+        repo = TranscriptRepository(self.db)
+
+        unsequenced = [segment for segment in batch if segment["seq"] is None]
+        if unsequenced:
+            first = await repo.next_seq(self.interaction_id, self.tenant_id, self.doctor_id, count=len(unsequenced))
+            for offset, segment in enumerate(unsequenced):
+                segment["seq"] = first + offset
+        if len(unsequenced) == len(batch):
+            stored = await repo.push_segments(self.interaction_id, self.tenant_id, self.doctor_id, batch)
+            return stored, repo.writes
+
+        # Client seqs: the header is brought up to date alongside the segments
+        stored, _ = await asyncio.gather(
+            repo.push_segments(self.interaction_id, self.tenant_id, self.doctor_id, batch),
+            repo.advance_seq(self.interaction_id, self.tenant_id, self.doctor_id, max(s["seq"] for s in batch))
+        )
+        return stored, repo.writes
+
+    async def close(self):
+        try:
+            await self.flush()
+        finally:
+            writers = _writers.get(self.interaction_id)
+            if writers is not None:
+                writers.discard(self)
+                if not writers:
+                    _writers.pop(self.interaction_id, None)
+
+
+async def flush_interaction(interaction_id: str):
+    # Stores everything still buffered for the interaction in this process.
+    # Writers of a stream held by another worker process are not reached;
+    # they flush on their own timer (VOICE_WRITE_FLUSH_SECONDS) or close
+    for writer in list(_writers.get(interaction_id, ())):
+        await writer.flush()
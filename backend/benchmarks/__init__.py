@@ -0,0 +1,12 @@
+import os
+
+# Benchmarks run offline: fall back to the test configuration for any
+# setting the environment does not provide
+_ENV_FILE = os.path.join(os.path.dirname(__file__), "..", ".env.test")
+
+with open(_ENV_FILE) as f:
+    for line in f:
+        line = line.strip()
+        if line and not line.startswith("#") and "=" in line:
+            key, value = line.split("=", 1)
+            os.environ.setdefault(key, value)
@@ -0,0 +1,70 @@
+"""
+Chunk decode latency: tempfile + ffmpeg (previous voice_stream path) vs the
+in-memory decoder in app.voice.audio.
+
+    python -m benchmarks.bench_audio_decode [--transcribe]
+
+--transcribe also loads Whisper and times the full chunk (decode + model).
+"""
+import argparse
+import os
+import shutil
+import tempfile
+
+from app.voice.audio import decode_audio_chunk, encode_wav
+from benchmarks.common import synthetic_speech, timed, summarize, print_table
+
+
+def tempfile_path(audio_bytes: bytes, load):
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as f:
+        f.write(audio_bytes)
+        temp_path = f.name
+    try:
+        return load(temp_path)
+    finally:
+        os.remove(temp_path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunk-seconds", type=float, nargs="+", default=[1.0, 5.0, 15.0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--transcribe", action="store_true")
+    args = parser.parse_args()
+
+    has_ffmpeg = shutil.which("ffmpeg") is not None
+    if not has_ffmpeg:
+        print("ffmpeg not found: the tempfile path is timed without the ffmpeg decode\n")
+
+    if has_ffmpeg or args.transcribe:
+        import whisper
+    model = whisper.load_model("base") if args.transcribe else None
+
+    rows = []
+    for seconds in args.chunk_seconds:
+        chunk = encode_wav(synthetic_speech(seconds))
+
+        if has_ffmpeg:
+            baseline, label = (lambda b: tempfile_path(b, whisper.load_audio)), "tempfile+ffmpeg"
+        else:
+            baseline, label = (lambda b: tempfile_path(b, lambda p: None)), "tempfile"
+
+        samples, _ = timed(baseline, chunk, repeat=args.repeat)
+        rows.append({"path": label, "chunk_s": seconds, **summarize(samples)})
+
+        samples, _ = timed(decode_audio_chunk, chunk, repeat=args.repeat)
+        rows.append({"path": "in-memory", "chunk_s": seconds, **summarize(samples)})
+
+        if model is not None:
+            repeat = max(1, args.repeat // 5)
+            if has_ffmpeg:
+                samples, _ = timed(lambda b: tempfile_path(b, model.transcribe), chunk, repeat=repeat)
+                rows.append({"path": "tempfile+ffmpeg+model", "chunk_s": seconds, **summarize(samples)})
+            samples, _ = timed(lambda b: model.transcribe(decode_audio_chunk(b)), chunk, repeat=repeat)
+            rows.append({"path": "in-memory+model", "chunk_s": seconds, **summarize(samples)})
+
+    print_table(rows, ["path", "chunk_s", "mean_ms", "p50_ms", "p95_ms"])
+
+
+if __name__ == "__main__":
+    main()
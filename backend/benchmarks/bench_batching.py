@@ -0,0 +1,115 @@
+"""
+Cross-stream micro-batching: throughput per core and p95 chunk latency as the
+number of concurrent voice streams grows, with and without batching.
+
+    python -m benchmarks.bench_batching --model base
+    python -m benchmarks.bench_batching --simulate   # no model weights needed
+
+--simulate replaces Whisper with a CPU-bound cost model where one forward pass
+costs a fixed overhead plus a per-chunk amount.
+"""
+import argparse
+import asyncio
+import time
+
+from app.voice.batcher import BatchScheduler
+from app.voice.executor import TranscriptionExecutor
+from benchmarks.common import synthetic_speech, percentile, print_table
+
+
+def _spin(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def simulated_engine(pass_overhead_ms: float, per_chunk_ms: float):
+    def transcribe_audio(audio, options=None):
+        _spin((pass_overhead_ms + per_chunk_ms) / 1000)
+        return "simulated"
+
+    def transcribe_batch(audios, options=None):
+        _spin((pass_overhead_ms + per_chunk_ms * len(audios)) / 1000)
+        return [{"text": "simulated", "language": "en"}] * len(audios)
+
+    return transcribe_audio, transcribe_batch
+
+
+def whisper_engine(model_name: str):
+    from app.core.config import settings
+    import app.voice.engines as engine
+    settings.WHISPER_MODEL = model_name
+    engine.warm_up()
+    return engine.transcribe_audio, engine.transcribe_batch
+
+
+async def run_streams(n_streams, chunks_per_stream, interval, submit, chunk):
+    latencies = []
+
+    async def stream(index):
+        # Stagger stream start so arrivals are not artificially aligned
+        await asyncio.sleep(interval * index / n_streams)
+        for _ in range(chunks_per_stream):
+            started = time.perf_counter()
+            await submit(chunk)
+            elapsed = time.perf_counter() - started
+            latencies.append(elapsed)
+            await asyncio.sleep(max(0.0, interval - elapsed))
+
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    await asyncio.gather(*(stream(i) for i in range(n_streams)))
+    cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+
+    return {
+        "chunks_per_s": len(latencies) / wall,
+        "chunks_per_cpu_s": len(latencies) / cpu if cpu else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--streams", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--chunk-seconds", type=float, default=2.0)
+    parser.add_argument("--chunks-per-stream", type=int, default=10)
+    parser.add_argument("--speedup", type=float, default=1.0, help="send audio faster than real time")
+    parser.add_argument("--max-batch-size", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=int, default=30)
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--simulate", action="store_true")
+    parser.add_argument("--pass-overhead-ms", type=float, default=40.0)
+    parser.add_argument("--per-chunk-ms", type=float, default=15.0)
+    args = parser.parse_args()
+
+    if args.simulate:
+        transcribe_audio, transcribe_batch = simulated_engine(args.pass_overhead_ms, args.per_chunk_ms)
+    else:
+        transcribe_audio, transcribe_batch = whisper_engine(args.model)
+
+    chunk = synthetic_speech(args.chunk_seconds)
+    interval = args.chunk_seconds / args.speedup
+    rows = []
+
+    for n in args.streams:
+        executor = TranscriptionExecutor(workers=1, queue_size=max(64, n * 2), queue_timeout=600)
+        unbatched = await run_streams(
+            n, args.chunks_per_stream, interval,
+            lambda audio: executor.run(transcribe_audio, audio), chunk
+        )
+        rows.append({"streams": n, "mode": "per-stream", **unbatched})
+
+        scheduler = BatchScheduler(
+            transcribe_batch, executor=executor,
+            max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms
+        )
+        batched = await run_streams(n, args.chunks_per_stream, interval, scheduler.submit, chunk)
+        scheduler.stop()
+        executor.shutdown()
+        rows.append({"streams": n, "mode": "batched", **batched})
+
+    print_table(rows, ["streams", "mode", "chunks_per_s", "chunks_per_cpu_s", "p50_ms", "p95_ms"])
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,66 @@
+"""
+Voice transport codecs: bytes on the wire and server-side decode CPU per
+codec, for a consult streamed in fixed-size frames.
+
+    python -m benchmarks.bench_codecs [--seconds 300] [--frame-ms 250]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.voice.audio import SAMPLE_RATE, encode_wav
+from app.voice.codecs import available_codecs, get_decoder, encode_alaw, encode_flac, encode_mulaw
+from benchmarks.common import synthetic_speech, print_table
+
+ENCODERS = {
+    "wav": encode_wav,
+    "pcm16": lambda audio: (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2").tobytes(),
+    "mulaw": encode_mulaw,
+    "alaw": encode_alaw,
+    "flac": encode_flac,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=300.0)
+    parser.add_argument("--frame-ms", type=int, default=250)
+    args = parser.parse_args()
+
+    audio = synthetic_speech(args.seconds, speech_ratio=0.6)
+    step = SAMPLE_RATE * args.frame_ms // 1000
+    frames = [audio[i:i + step] for i in range(0, len(audio), step)]
+
+    rows = []
+    for codec in ["wav", "pcm16", "mulaw", "alaw", "flac"]:
+        if codec not in available_codecs():
+            print(f"{codec}: not available (optional dependency missing)")
+            continue
+
+        encoded = [ENCODERS[codec](frame) for frame in frames]
+        decode = get_decoder(codec)
+
+        start = time.process_time()
+        for payload in encoded:
+            decode(payload)
+        cpu = time.process_time() - start
+
+        wire_bytes = sum(len(payload) for payload in encoded)
+        rows.append({
+            "codec": codec,
+            "wire_kb": wire_bytes / 1024,
+            "kbps": wire_bytes * 8 / 1000 / args.seconds,
+            "vs_wav_pct": 0.0,
+            "decode_ms_per_audio_s": cpu * 1000 / args.seconds,
+        })
+
+    wav_bytes = rows[0]["wire_kb"]
+    for row in rows:
+        row["vs_wav_pct"] = row["wire_kb"] / wav_bytes * 100
+
+    print_table(rows, ["codec", "wire_kb", "kbps", "vs_wav_pct", "decode_ms_per_audio_s"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Transcription backends: model load time, real-time factor (processing
+seconds per audio second, wall and CPU) and memory for each engine on the
+same audio. Each backend runs in a fresh process so peak RSS is its own.
+
+    python -m benchmarks.bench_engines --model base
+    python -m benchmarks.bench_engines --engines fake,whisper,whisper-int8 --seconds 60
+
+Backends whose package or weights are missing are reported and skipped.
+"""
+import argparse
+import multiprocessing
+import resource
+import time
+
+from benchmarks.common import synthetic_speech, print_table
+
+
+def _rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_engine(name: str, model: str, seconds: float, window_seconds: float) -> dict:
+    from app.core.config import settings
+    from app.voice.audio import SAMPLE_RATE
+    from app.voice.engines import decode_options, get_engine
+
+    settings.WHISPER_MODEL = model
+    engine = get_engine(name)
+    options = decode_options(engine=name, model=model, language="en")
+
+    audio = synthetic_speech(seconds, speech_ratio=0.7)
+    step = int(window_seconds * SAMPLE_RATE)
+    windows = [audio[i:i + step] for i in range(0, len(audio), step)]
+
+    baseline_rss = _rss_mb()
+    start = time.perf_counter()
+    engine.transcribe(windows[0][:SAMPLE_RATE], options)  # load + warm up
+    load_s = time.perf_counter() - start
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    for window in windows:
+        engine.transcribe(window, options)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+
+    return {
+        "engine": name,
+        "load_s": load_s,
+        "rtf": wall / seconds,
+        "cpu_rtf": cpu / seconds,
+        "model_mb": engine.memory_bytes() / 1024 / 1024,
+        "rss_mb": _rss_mb() - baseline_rss,
+    }
+
+
+def _child(queue, *args):
+    try:
+        queue.put(run_engine(*args))
+    except Exception as e:
+        queue.put({"engine": args[0], "error": f"{type(e).__name__}: {e}"})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--engines", default="fake,whisper,whisper-int8,faster-whisper")
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--seconds", type=float, default=30.0)
+    parser.add_argument("--window-seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    rows = []
+    for name in args.engines.split(","):
+        queue = context.Queue()
+        process = context.Process(target=_child, args=(queue, name, args.model, args.seconds, args.window_seconds))
+        process.start()
+        row = queue.get()
+        process.join()
+
+        if "error" in row:
+            print(f"{name}: skipped ({row['error']})")
+            continue
+        rows.append(row)
+
+    print_table(rows, ["engine", "load_s", "rtf", "cpu_rtf", "model_mb", "rss_mb"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Summarization latency against transcript length: one prompt with the whole
+transcript vs. map-reduce (chunks summarized in parallel, then merged) vs.
+folding the last segments into a running summary kept during the visit
+(SUMMARY_ROLLING_ENABLED; worst case, the update was just missed).
+
+    python -m benchmarks.bench_summarize
+    python -m benchmarks.bench_summarize --minutes 5,30,90 --chunk-tokens 2000 --parallel 8
+    python -m benchmarks.bench_summarize --base-url https://api.openai.com/v1 --model gpt-4.1-mini
+
+By default the LLM is a local OpenAI-compatible stub whose reply time
+follows a simple cost model: a fixed overhead, plus prompt tokens at the
+prefill rate, plus output tokens at the decode rate. Prompts beyond
+--context-tokens are rejected, as by a real model. Requests go through the
+application's async client (pooled connections, LLM_MAX_CONCURRENCY).
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.common import print_table
+
+WORDS = (
+    "patient reports headache since monday worse in the morning no fever some nausea "
+    "takes ibuprofen twice a day sleeps badly blood pressure was fine last visit "
+    "recommend follow up in two weeks order blood test and check vision"
+).split()
+WORDS_PER_MINUTE = 150
+SEGMENT_SECONDS = 10
+
+
+def synthetic_transcript(minutes: float, seed: int = 0) -> list:
+    # One segment per 10 s window of conversation
+    rng = random.Random(seed)
+    words_per_segment = WORDS_PER_MINUTE * SEGMENT_SECONDS // 60
+    return [
+        " ".join(rng.choice(WORDS) for _ in range(words_per_segment))
+        for _ in range(int(minutes * 60 / SEGMENT_SECONDS))
+    ]
+
+
+class StubLLM(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, overhead_ms: float, prefill_ms: float, decode_ms: float,
+                 output_tokens: int, context_tokens: int):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.overhead_ms = overhead_ms
+        self.prefill_ms = prefill_ms
+        self.decode_ms = decode_ms
+        self.output_tokens = output_tokens
+        self.context_tokens = context_tokens
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status: int, body: dict):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        server = self.server
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt_tokens = sum(math.ceil(len(m["content"]) / 4) for m in request["messages"])
+
+        if prompt_tokens > server.context_tokens:
+            self._reply(400, {"error": {
+                "message": f"prompt of {prompt_tokens} tokens exceeds the context window",
+                "type": "invalid_request_error", "code": "context_length_exceeded"
+            }})
+            return
+
+        time.sleep((server.overhead_ms + prompt_tokens * server.prefill_ms
+                    + server.output_tokens * server.decode_ms) / 1000)
+        content = json.dumps({
+            "summary": "Patient reports headaches with nausea.",
+            "complaints": ["headache", "nausea"],
+            "action_points": ["blood test", "follow up in two weeks"]
+        })
+        self._reply(200, {
+            "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()),
+            "model": request["model"],
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": server.output_tokens,
+                      "total_tokens": prompt_tokens + server.output_tokens}
+        })
+
+
+async def measure(texts: list, chunk_tokens: int, previous: dict = None) -> dict:
+    from app.core.config import settings
+    from app.ai.service import fold_segments
+    from app.core.metrics import metrics
+
+    settings.SUMMARY_CHUNK_TOKENS = chunk_tokens
+    metrics.reset()
+    start = time.perf_counter()
+    try:
+        await fold_segments(previous, texts)
+        error = None
+    except Exception as e:
+        error = type(e).__name__
+    elapsed = time.perf_counter() - start
+
+    counters = metrics.snapshot()["counters"]
+    return {
+        "latency_s": elapsed if error is None else None,
+        "calls": len(metrics.histograms.get("ai.llm.call_seconds", ())),
+        "prompt_tokens": counters.get("ai.llm.prompt_tokens", 0),
+        "error": error or "",
+    }
+
+
+async def main_async(args):
+    from app.core.config import settings
+    from app.ai.chunking import estimate_tokens
+    from app.ai.llm_client import close_client
+
+    settings.LLM_MODEL = args.model
+    settings.LLM_MAX_RETRIES = 0
+    settings.LLM_MAX_CONCURRENCY = max(settings.LLM_MAX_CONCURRENCY, args.parallel)
+    settings.SUMMARY_MAX_PARALLEL_CHUNKS = args.parallel
+
+    server = None
+    if args.base_url:
+        settings.LLM_BASE_URL = args.base_url
+    else:
+        server = StubLLM(args.overhead_ms, args.prefill_ms, args.decode_ms, args.output_tokens, args.context_tokens)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        settings.LLM_BASE_URL = server.base_url
+
+    rows = []
+    try:
+        for minutes in [float(m) for m in args.minutes.split(",")]:
+            texts = synthetic_transcript(minutes)
+            tokens = sum(estimate_tokens(text) for text in texts)
+            single = await measure(texts, chunk_tokens=10 ** 9)
+            chunked = await measure(texts, chunk_tokens=args.chunk_tokens)
+            previous = {"summary": "Patient reports headaches.", "complaints": ["headache"], "action_points": []}
+            rolling = await measure(texts[-args.rolling_segments:], args.chunk_tokens, previous)
+            rows.append({
+                "minutes": minutes,
+                "tokens": tokens,
+                "single_s": single["latency_s"],
+                "single_err": single["error"],
+                "mapreduce_s": chunked["latency_s"],
+                "calls": chunked["calls"],
+                "mr_prompt_tokens": chunked["prompt_tokens"],
+                "speedup": single["latency_s"] / chunked["latency_s"]
+                if single["latency_s"] and chunked["latency_s"] else None,
+                "rolling_s": rolling["latency_s"],
+            })
+    finally:
+        await close_client()
+        if server is not None:
+            server.shutdown()
+
+    print_table(rows, ["minutes", "tokens", "single_s", "single_err", "mapreduce_s", "calls", "mr_prompt_tokens", "speedup", "rolling_s"])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", default="5,15,30,60,120", help="comma-separated consult lengths")
+    parser.add_argument("--chunk-tokens", type=int, default=8000)
+    parser.add_argument("--parallel", type=int, default=4)
+    parser.add_argument("--rolling-segments", type=int, default=30, help="segments left to fold in at the end")
+    parser.add_argument("--model", default="gpt-4.1-mini")
+    parser.add_argument("--base-url", help="real OpenAI-compatible endpoint instead of the stub")
+    parser.add_argument("--overhead-ms", type=float, default=300.0)
+    parser.add_argument("--prefill-ms", type=float, default=0.3, help="stub: per prompt token")
+    parser.add_argument("--decode-ms", type=float, default=15.0, help="stub: per output token")
+    parser.add_argument("--output-tokens", type=int, default=150)
+    parser.add_argument("--context-tokens", type=int, default=32000)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
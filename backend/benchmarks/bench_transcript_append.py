@@ -0,0 +1,96 @@
+"""
+Per-append cost of transcript segments as a consult grows: the previous
+read-modify-write ($set of the whole array) vs. the bucketed $push upsert,
+with the sequence number known up front and allocated per append.
+Needs a reachable MongoDB (MONGO_URL); uses a throwaway database.
+
+    python -m benchmarks.bench_transcript_append --segments 2000
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.core.config import settings
+from app.voice.repository import TranscriptRepository
+from app.voice.service import append_transcript_segment
+from benchmarks.common import summarize, print_table
+
+SEGMENT_TEXT = "Patient reports intermittent chest pain over the last two weeks, worse on exertion."
+
+
+async def read_modify_write(repo, interaction_id, segment):
+    # Pre-$push implementation of append_transcript_segment
+    transcript = await repo.find_by_interaction(interaction_id)
+    if not transcript:
+        await repo.create({
+            "interaction_id": interaction_id,
+            "tenant_id": "bench",
+            "doctor_id": "bench",
+            "segments": [segment]
+        })
+    else:
+        transcript["segments"].append(segment)
+        await repo.update({"_id": transcript["_id"]}, {"segments": transcript["segments"]})
+
+
+async def atomic_push(repo, interaction_id, segment):
+    await repo.push_segment(interaction_id, "bench", "bench", segment)
+
+
+def allocate_and_push(db):
+    async def append(repo, interaction_id, segment):
+        await append_transcript_segment(db, interaction_id, "bench", "bench", segment["text"])
+    return append
+
+
+async def measure(repo, append, n_segments, window):
+    interaction_id = str(uuid.uuid4())
+    rows, samples = [], []
+
+    for i in range(1, n_segments + 1):
+        segment = {"seq": i, "timestamp": datetime.utcnow().isoformat(), "text": SEGMENT_TEXT}
+        start = time.perf_counter()
+        await append(repo, interaction_id, segment)
+        samples.append(time.perf_counter() - start)
+
+        if i % window == 0:
+            rows.append({"segments": i, **summarize(samples)})
+            samples = []
+
+    return rows
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--segments", type=int, default=2000)
+    parser.add_argument("--window", type=int, default=250)
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(settings.MONGO_URL)
+    db_name = f"bench_{uuid.uuid4().hex[:8]}"
+    db = client[db_name]
+    repo = TranscriptRepository(db)
+    await repo.ensure_indexes()
+
+    modes = [
+        ("read-modify-write", read_modify_write),
+        ("bucketed $push, seq known", atomic_push),
+        ("bucketed $push, seq allocated", allocate_and_push(db)),
+    ]
+
+    try:
+        for name, append in modes:
+            print(f"\n{name}")
+            rows = await measure(repo, append, args.segments, args.window)
+            print_table(rows, ["segments", "mean_ms", "p50_ms", "p95_ms"])
+    finally:
+        await client.drop_database(db_name)
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,101 @@
+"""
+CPU saved by the VAD gate. Splits recordings into stream-sized chunks and
+transcribes each one with and without app.voice.vad.gate in front.
+
+    python -m benchmarks.bench_vad --recordings /path/to/clinic/wavs --model base
+    python -m benchmarks.bench_vad --simulate
+
+Without --recordings a synthetic consult is used (speech bursts separated by
+room noise, --speech-ratio controls how much of it is voiced). --simulate
+replaces Whisper with a cost model: a fixed per-call cost (the 30 s encoder
+pass) plus a per-second decode cost.
+"""
+import argparse
+import time
+
+from app.voice.audio import SAMPLE_RATE
+from app.voice.vad import gate
+from benchmarks.common import load_recordings, synthetic_speech, print_table
+
+
+def simulated_transcribe(call_ms, per_second_ms):
+    def transcribe(audio):
+        end = time.perf_counter() + (call_ms + per_second_ms * len(audio) / SAMPLE_RATE) / 1000
+        while time.perf_counter() < end:
+            pass
+        return ""
+    return transcribe
+
+
+def run(chunks, transcribe, use_vad):
+    cpu = vad_cpu = 0.0
+    skipped = 0
+    seconds_in = seconds_out = 0.0
+
+    for chunk in chunks:
+        seconds_in += len(chunk) / SAMPLE_RATE
+        if use_vad:
+            start = time.process_time()
+            chunk = gate(chunk)
+            vad_cpu += time.process_time() - start
+            if chunk is None:
+                skipped += 1
+                continue
+        seconds_out += len(chunk) / SAMPLE_RATE
+        start = time.process_time()
+        transcribe(chunk)
+        cpu += time.process_time() - start
+
+    return {
+        "chunks": len(chunks),
+        "skipped": skipped,
+        "audio_in_s": seconds_in,
+        "audio_out_s": seconds_out,
+        "vad_cpu_ms": vad_cpu * 1000,
+        "transcribe_cpu_s": cpu,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recordings", help="directory of WAV recordings")
+    parser.add_argument("--chunk-seconds", type=float, default=3.0)
+    parser.add_argument("--speech-ratio", type=float, default=0.4)
+    parser.add_argument("--consult-seconds", type=float, default=120.0)
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--simulate", action="store_true")
+    parser.add_argument("--call-ms", type=float, default=250.0)
+    parser.add_argument("--per-second-ms", type=float, default=40.0)
+    args = parser.parse_args()
+
+    recordings = load_recordings(args.recordings) or [
+        ("synthetic", synthetic_speech(args.consult_seconds, speech_ratio=args.speech_ratio))
+    ]
+
+    if args.simulate:
+        transcribe = simulated_transcribe(args.call_ms, args.per_second_ms)
+    else:
+        from app.core.config import settings
+        from app.voice.engines import transcribe_audio, warm_up
+        settings.WHISPER_MODEL = args.model
+        warm_up()
+        transcribe = transcribe_audio
+
+    step = int(args.chunk_seconds * SAMPLE_RATE)
+    rows = []
+    for name, audio in recordings:
+        chunks = [audio[i:i + step] for i in range(0, len(audio), step)]
+        baseline = run(chunks, transcribe, use_vad=False)
+        gated = run(chunks, transcribe, use_vad=True)
+        saved = 1 - gated["transcribe_cpu_s"] / baseline["transcribe_cpu_s"] if baseline["transcribe_cpu_s"] else 0.0
+        rows.append({"recording": name, "vad": "off", **baseline})
+        rows.append({"recording": name, "vad": "on", **gated, "cpu_saved_pct": saved * 100})
+
+    print_table(rows, [
+        "recording", "vad", "chunks", "skipped", "audio_in_s", "audio_out_s",
+        "vad_cpu_ms", "transcribe_cpu_s", "cpu_saved_pct"
+    ])
+
+
+if __name__ == "__main__":
+    main()
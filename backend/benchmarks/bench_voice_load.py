@@ -0,0 +1,239 @@
+"""
+End-to-end voice load test: N concurrent WebSocket clients stream audio at
+real-time pace into /voice/stream/{interaction_id} of an in-process server,
+for each concurrency level given.
+
+    python -m benchmarks.bench_voice_load --clients 1,4,8,16 --engine fake --fake-rtf 0.05
+    python -m benchmarks.bench_voice_load --clients 2 --engine whisper --model tiny
+    python -m benchmarks.bench_voice_load --recordings /path/to/wavs --mongo-url mongodb://localhost:27017
+
+Runs offline by default: mongomock stands in for MongoDB (--mongo-url uses a
+real server) and the fake engine replaces Whisper. Clients run in a separate
+process, so the CPU and peak RSS reported are the server's alone.
+
+Reported per level:
+  ack_p50/p95_ms   frame sent -> server ack (transcribed and stored)
+  ack_max_ms       slowest ack; grows without bound once the server falls behind
+  unacked          frames never acked (trailing audio still buffered at the end)
+  rtf_p95          stream processing seconds per audio second (>1: falling behind)
+  writes_saved_per_s  Mongo round trips avoided by write-coalescing
+  cpu_cores        server CPU seconds per wall second
+  rss_mb           server peak resident memory
+and p50/p95 per stage: receive (queued before processing), decode,
+transcribe (incl. executor queueing), persist and send.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import resource
+import socket
+import time
+import uuid
+
+from benchmarks.common import load_recordings, percentile, print_table, synthetic_speech
+
+STAGES = ["receive", "decode", "transcribe", "persist", "send"]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# Client side (separate process)
+
+async def _client(url: str, audio, chunk_ms: int, drain_seconds: float) -> dict:
+    import numpy as np
+    import websockets
+    from app.voice.audio import SAMPLE_RATE
+    from app.voice.stream import FRAME_HEADER
+
+    step = SAMPLE_RATE * chunk_ms // 1000
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2")
+    frames = [pcm[i:i + step].tobytes() for i in range(0, len(pcm), step)]
+
+    sent_at = {}
+    ack_latencies = []
+    last_ack = {"seq": -1}
+    finals = 0
+
+    async with websockets.connect(url, max_size=None) as ws:
+        await ws.send(json.dumps({"type": "hello", "protocol": 2, "resume": False, "codecs": ["pcm16"]}))
+
+        async def read():
+            nonlocal finals
+            async for message in ws:
+                if not isinstance(message, str):
+                    continue
+                message = json.loads(message)
+                if message.get("type") == "ack":
+                    now = time.perf_counter()
+                    for seq in [s for s in sent_at if s <= message["seq"]]:
+                        ack_latencies.append(now - sent_at.pop(seq))
+                    last_ack["seq"] = message["seq"]
+                elif message.get("final"):
+                    finals += 1
+
+        reader = asyncio.create_task(read())
+        start = time.perf_counter()
+        for seq, frame in enumerate(frames):
+            # Real-time pace: frame n leaves at n * chunk_ms
+            await asyncio.sleep(max(0.0, start + seq * chunk_ms / 1000 - time.perf_counter()))
+            sent_at[seq] = time.perf_counter()
+            await ws.send(FRAME_HEADER.pack(seq) + frame)
+        stream_end = time.perf_counter()
+
+        # Give the server time to catch up; trailing audio without a pause
+        # is only stored when the socket closes, so it is never acked
+        deadline = stream_end + drain_seconds
+        while last_ack["seq"] < len(frames) - 1 and time.perf_counter() < deadline:
+            await asyncio.sleep(0.05)
+        reader.cancel()
+
+    return {
+        "ack_latencies": ack_latencies,
+        "unacked": len(sent_at),
+        "finals": finals
+    }
+
+
+async def _clients(url: str, token: str, audios: list, chunk_ms: int, drain_seconds: float) -> list:
+    # One new interaction per client; the token goes in the query string, as from a browser
+    return await asyncio.gather(*(
+        _client(f"{url}/{uuid.uuid4()}?token={token}", audio, chunk_ms, drain_seconds) for audio in audios
+    ))
+
+
+def _client_process(queue, *args):
+    queue.put(asyncio.run(_clients(*args)))
+
+
+# Server side
+
+def _server_app(args):
+    from fastapi import FastAPI
+    from app.core.config import settings
+    from app.db.mongo import mongo
+    from app.voice.routes import router
+
+    settings.VOICE_ENGINE = args.engine
+    settings.VOICE_FAKE_ENGINE_RTF = args.fake_rtf
+    settings.WHISPER_MODEL = args.model
+    settings.VOICE_WORKERS = args.workers
+    settings.VOICE_MAX_BATCH_SIZE = args.batch_size
+
+    if args.mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        mongo.client = AsyncIOMotorClient(args.mongo_url)
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+        mongo.client = AsyncMongoMockClient()
+
+    # Only the voice routes: the perimeter middleware does not apply to websockets
+    app = FastAPI()
+    app.include_router(router, prefix="/voice")
+    return app
+
+
+async def run_level(n_clients: int, args, url: str, token: str, recordings: list) -> dict:
+    from app.core.metrics import metrics
+
+    audios = [recordings[i % len(recordings)][1] for i in range(n_clients)]
+    audio_seconds = len(audios[0]) / 16000
+    metrics.reset()
+
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(
+        target=_client_process, args=(queue, url, token, audios, args.chunk_ms, args.drain_seconds)
+    )
+
+    cpu, wall = time.process_time(), time.perf_counter()
+    process.start()
+    results = await asyncio.get_running_loop().run_in_executor(None, queue.get)
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    process.join()
+
+    latencies = [latency for result in results for latency in result["ack_latencies"]]
+    snapshot = metrics.snapshot()
+    histograms = snapshot["histograms"]
+
+    row = {
+        "clients": n_clients,
+        "audio_s": audio_seconds,
+        "ack_p50_ms": percentile(latencies, 50) * 1000,
+        "ack_p95_ms": percentile(latencies, 95) * 1000,
+        "ack_max_ms": max(latencies, default=0.0) * 1000,
+        "unacked": sum(result["unacked"] for result in results),
+        "finals": sum(result["finals"] for result in results),
+        "rtf_p95": histograms.get("voice.stream.realtime_factor", {}).get("p95"),
+        "writes_saved_per_s": snapshot["counters"].get("voice.writer.writes_saved", 0) / wall,
+        "cpu_cores": cpu / wall,
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+    for stage in STAGES:
+        summary = histograms.get(f"voice.stage.{stage}_seconds", {})
+        row[f"{stage}_p50_ms"] = summary.get("p50", 0.0) * 1000
+        row[f"{stage}_p95_ms"] = summary.get("p95", 0.0) * 1000
+    return row
+
+
+async def main_async(args):
+    import uvicorn
+    from app.core.security import create_access_token
+    from app.db.mongo import get_db
+    from app.voice.batcher import shutdown_scheduler
+    from app.voice.executor import shutdown_executor
+    from app.voice.repository import TranscriptRepository
+
+    app = _server_app(args)
+    await TranscriptRepository(get_db()).ensure_indexes()
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    token = create_access_token({"user_id": "load-doctor", "tenant_id": "load-tenant"})
+    url = f"ws://127.0.0.1:{port}/voice/stream"
+    recordings = load_recordings(args.recordings) or [
+        (f"synthetic-{i}", synthetic_speech(args.seconds, seed=i, speech_ratio=args.speech_ratio)) for i in range(4)
+    ]
+
+    rows = []
+    try:
+        for n_clients in [int(n) for n in args.clients.split(",")]:
+            rows.append(await run_level(n_clients, args, url, token, recordings))
+    finally:
+        server.should_exit = True
+        await serving
+        shutdown_scheduler()
+        shutdown_executor()
+
+    print_table(rows, ["clients", "audio_s", "ack_p50_ms", "ack_p95_ms", "ack_max_ms", "unacked", "finals", "rtf_p95", "writes_saved_per_s", "cpu_cores", "rss_mb"])
+    print()
+    print_table(rows, ["clients"] + [f"{stage}_{p}_ms" for stage in STAGES for p in ("p50", "p95")])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", default="1,4,8", help="comma-separated concurrency levels")
+    parser.add_argument("--seconds", type=float, default=30.0, help="synthetic audio per client")
+    parser.add_argument("--speech-ratio", type=float, default=0.7)
+    parser.add_argument("--recordings", help="directory of .wav files to stream instead")
+    parser.add_argument("--chunk-ms", type=int, default=250)
+    parser.add_argument("--drain-seconds", type=float, default=10.0)
+    parser.add_argument("--engine", default="fake")
+    parser.add_argument("--fake-rtf", type=float, default=0.05, help="fake engine CPU seconds per audio second")
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--mongo-url", help="real MongoDB instead of the in-process stand-in")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import glob
+import os
+import statistics
+import time
+import numpy as np
+
+from app.voice.audio import SAMPLE_RATE, decode_audio_chunk
+
+
+def synthetic_speech(seconds: float, seed: int = 0, speech_ratio: float = 1.0) -> np.ndarray:
+    """
+    Speech-like test signal: voiced bursts (harmonics + noise) separated by
+    low-level room noise. speech_ratio controls the share of voiced audio.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * SAMPLE_RATE)
+    t = np.arange(n, dtype=np.float32) / SAMPLE_RATE
+
+    audio = rng.normal(0, 0.003, n).astype(np.float32)  # background hiss
+
+    burst = int(0.4 * SAMPLE_RATE)
+    for start in range(0, n, burst):
+        if rng.random() >= speech_ratio:
+            continue
+        end = min(start + burst, n)
+        f0 = rng.uniform(100, 220)
+        seg = t[start:end]
+        voiced = sum(np.sin(2 * np.pi * f0 * k * seg) / k for k in range(1, 6))
+        envelope = np.hanning(end - start)
+        audio[start:end] += (0.3 * voiced * envelope).astype(np.float32)
+
+    return np.clip(audio, -1.0, 1.0)
+
+
+def load_recordings(path):
+    # (file name, 16 kHz float32 audio) for every .wav in path; None without a path
+    if path is None:
+        return None
+    recordings = []
+    for name in sorted(glob.glob(os.path.join(path, "*.wav"))):
+        with open(name, "rb") as f:
+            recordings.append((os.path.basename(name), decode_audio_chunk(f.read())))
+    return recordings
+
+
+def timed(fn, *args, repeat: int = 20, **kwargs):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        samples.append(time.perf_counter() - start)
+    return samples, result
+
+
+def percentile(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples) -> dict:
+    return {
+        "mean_ms": statistics.fmean(samples) * 1000 if samples else 0.0,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+    }
+
+
+def print_table(rows, columns):
+    widths = [max(len(str(c)), *(len(_fmt(r.get(c))) for r in rows)) for c in columns]
+    print("  ".join(str(c).ljust(w) for c, w in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(_fmt(row.get(c)).ljust(w) for c, w in zip(columns, widths)))
+
+
+def _fmt(value) -> str:
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return "" if value is None else str(value)
@@ -0,0 +1,238 @@
+"""
+Background summarization jobs: submission returns at once, workers take
+tenants in turn, and queue state in Mongo outlives the worker that held it.
+"""
+import asyncio
+import pytest
+from unittest.mock import patch
+from app.core.config import settings
+from app.ai.jobs import SummaryWorkers, get_job_status, submit_summary_job
+from app.voice.service import append_transcript_segment
+
+
+@pytest.fixture(autouse=True)
+def quick_polling(monkeypatch):
+    monkeypatch.setattr(settings, "SUMMARY_JOB_POLL_SECONDS", 0.01)
+
+
+async def transcript(db, interaction_id, tenant_id="t1"):
+    await append_transcript_segment(db, interaction_id, tenant_id, "d1", "I have had a headache")
+
+
+def fake_summaries(db, delay=0.0, failures=0):
+    # Stands in for generate_ai_summary; records the order jobs ran in
+    calls = []
+    active = {"now": 0, "max": 0}
+
+    async def generate(db_, interaction_id, tenant_id, doctor_id):
+        calls.append((tenant_id, interaction_id))
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        try:
+            await asyncio.sleep(delay)
+            if len(calls) <= failures:
+                raise RuntimeError("LLM unavailable")
+        finally:
+            active["now"] -= 1
+        summary = {"_id": f"s-{interaction_id}", "interaction_id": interaction_id, "summary": "Headache."}
+        await db["ai_summaries"].insert_one(summary)
+        return summary
+
+    return generate, calls, active
+
+
+async def run_until_settled(db, workers, timeout=2.0):
+    workers.start()
+    try:
+        async def settled():
+            while await db["ai_summary_jobs"].count_documents({"status": {"$in": ["queued", "running"]}}):
+                await asyncio.sleep(0.01)
+        await asyncio.wait_for(settled(), timeout)
+    finally:
+        await workers.stop()
+
+
+class TestSummaryJobs:
+    """Queued summaries processed by async workers"""
+
+    @pytest.mark.asyncio
+    async def test_job_is_queued_then_done_with_its_summary(self, mongo_db):
+        await transcript(mongo_db, "i1")
+        generate, _, _ = fake_summaries(mongo_db)
+
+        job = await submit_summary_job(mongo_db, "i1", "t1", "d1")
+        again = await submit_summary_job(mongo_db, "i1", "t1", "d1")
+        queued = await get_job_status(mongo_db, job["_id"], "t1")
+
+        with patch("app.ai.jobs.generate_ai_summary", generate):
+            await run_until_settled(mongo_db, SummaryWorkers(mongo_db, workers=1))
+        done = await get_job_status(mongo_db, job["_id"], "t1")
+
+        assert again["_id"] == job["_id"]
+        assert (queued["status"], queued["queued_ahead"]) == ("queued", 0)
+        assert done["status"] == "done"
+        assert done["summary"]["summary"] == "Headache."
+        assert await get_job_status(mongo_db, job["_id"], "t2") is None
+
+    @pytest.mark.asyncio
+    async def test_no_transcript_is_not_queued(self, mongo_db):
+        assert await submit_summary_job(mongo_db, "missing", "t1", "d1") is None
+
+    @pytest.mark.asyncio
+    async def test_tenants_are_served_in_turn(self, mongo_db):
+        for i in range(4):
+            await transcript(mongo_db, f"a{i}", tenant_id="t1")
+            await submit_summary_job(mongo_db, f"a{i}", "t1", "d1")
+        await transcript(mongo_db, "b0", tenant_id="t2")
+        await submit_summary_job(mongo_db, "b0", "t2", "d2")
+        generate, calls, _ = fake_summaries(mongo_db)
+
+        with patch("app.ai.jobs.generate_ai_summary", generate):
+            await run_until_settled(mongo_db, SummaryWorkers(mongo_db, workers=1))
+
+        # Submitted last, but not left behind t1's backlog
+        assert calls[:2] == [("t1", "a0"), ("t2", "b0")]
+        assert len(calls) == 5
+
+    @pytest.mark.asyncio
+    async def test_running_jobs_per_tenant_are_capped_across_processes(self, mongo_db, monkeypatch):
+        monkeypatch.setattr(settings, "SUMMARY_JOBS_PER_TENANT", 1)
+        for i in range(4):
+            await transcript(mongo_db, f"a{i}")
+            await submit_summary_job(mongo_db, f"a{i}", "t1", "d1")
+        generate, calls, active = fake_summaries(mongo_db, delay=0.05)
+        # Two pools stand in for two server processes
+        other = SummaryWorkers(mongo_db, workers=3)
+
+        with patch("app.ai.jobs.generate_ai_summary", generate):
+            other.start()
+            try:
+                await run_until_settled(mongo_db, SummaryWorkers(mongo_db, workers=3))
+            finally:
+                await other.stop()
+
+        assert len(calls) == 4
+        assert active["max"] == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_submissions_queue_one_job(self, mongo_db):
+        from app.ai.repository import SummaryJobRepository
+        await SummaryJobRepository(mongo_db).ensure_indexes()
+        await transcript(mongo_db, "i1")
+        find_open = SummaryJobRepository.find_open
+
+        async def racing_find_open(self, tenant_id, interaction_id):
+            # Both requests look before either inserts
+            job = await find_open(self, tenant_id, interaction_id)
+            await asyncio.sleep(0.01)
+            return job
+
+        with patch.object(SummaryJobRepository, "find_open", racing_find_open):
+            jobs = await asyncio.gather(*(submit_summary_job(mongo_db, "i1", "t1", "d1") for _ in range(2)))
+
+        assert jobs[0]["_id"] == jobs[1]["_id"]
+        assert await mongo_db["ai_summary_jobs"].count_documents({}) == 1
+
+    @pytest.mark.asyncio
+    async def test_job_of_a_dead_worker_is_taken_over(self, mongo_db):
+        await transcript(mongo_db, "i1")
+        job = await submit_summary_job(mongo_db, "i1", "t1", "d1")
+        # Claimed before a restart; the lease was never renewed
+        await mongo_db["ai_summary_jobs"].update_one({"_id": job["_id"]}, {"$set": {
+            "status": "running", "worker_id": "gone", "attempts": 1, "lease_until": "2000-01-01T00:00:00"
+        }})
+        generate, _, _ = fake_summaries(mongo_db)
+
+        with patch("app.ai.jobs.generate_ai_summary", generate):
+            await run_until_settled(mongo_db, SummaryWorkers(mongo_db, workers=1))
+        status = await get_job_status(mongo_db, job["_id"], "t1")
+
+        assert (status["status"], status["attempts"]) == ("done", 2)
+
+    @pytest.mark.asyncio
+    async def test_job_whose_workers_keep_dying_is_given_up(self, mongo_db, monkeypatch):
+        monkeypatch.setattr(settings, "SUMMARY_JOB_MAX_ATTEMPTS", 2)
+        await transcript(mongo_db, "i1")
+        job = await submit_summary_job(mongo_db, "i1", "t1", "d1")
+        await mongo_db["ai_summary_jobs"].update_one({"_id": job["_id"]}, {"$set": {
+            "status": "running", "worker_id": "gone", "attempts": 2, "lease_until": "2000-01-01T00:00:00"
+        }})
+        generate, calls, _ = fake_summaries(mongo_db)
+
+        with patch("app.ai.jobs.generate_ai_summary", generate):
+            await run_until_settled(mongo_db, SummaryWorkers(mongo_db, workers=1))
+        status = await get_job_status(mongo_db, job["_id"], "t1")
+
+        assert calls == []
+        assert (status["status"], status["attempts"]) == ("failed", 2)
+        # No longer open: the interaction can be submitted again
+        assert (await submit_summary_job(mongo_db, "i1", "t1", "d1"))["_id"] != job["_id"]
+
+    @pytest.mark.asyncio
+    async def test_failures_are_retried_then_reported(self, mongo_db, monkeypatch):
+        monkeypatch.setattr(settings, "SUMMARY_JOB_MAX_ATTEMPTS", 2)
+        await transcript(mongo_db, "i1")
+        await transcript(mongo_db, "i2")
+        flaky = await submit_summary_job(mongo_db, "i1", "t1", "d1")
+        generate, _, _ = fake_summaries(mongo_db, failures=1)
+
+        with patch("app.ai.jobs.generate_ai_summary", generate):
+            await run_until_settled(mongo_db, SummaryWorkers(mongo_db, workers=1))
+        failing = await submit_summary_job(mongo_db, "i2", "t1", "d1")
+        generate, _, _ = fake_summaries(mongo_db, failures=10)
+        with patch("app.ai.jobs.generate_ai_summary", generate):
+            await run_until_settled(mongo_db, SummaryWorkers(mongo_db, workers=1))
+
+        flaky = await get_job_status(mongo_db, flaky["_id"], "t1")
+        failing = await get_job_status(mongo_db, failing["_id"], "t1")
+        assert (flaky["status"], flaky["attempts"]) == ("done", 2)
+        assert (failing["status"], failing["attempts"], failing["error"]) == ("failed", 2, "LLM unavailable")
+
+    @pytest.mark.asyncio
+    async def test_stopping_puts_running_jobs_back_in_the_queue(self, mongo_db):
+        await transcript(mongo_db, "i1")
+        job = await submit_summary_job(mongo_db, "i1", "t1", "d1")
+        generate, calls, _ = fake_summaries(mongo_db, delay=10)
+        workers = SummaryWorkers(mongo_db, workers=1)
+
+        with patch("app.ai.jobs.generate_ai_summary", generate):
+            workers.start()
+            while not calls:
+                await asyncio.sleep(0.01)
+            await workers.stop()
+        status = await get_job_status(mongo_db, job["_id"], "t1")
+
+        assert status["status"] == "queued"
+
+    @pytest.mark.asyncio
+    async def test_worker_survives_a_failed_status_write(self, mongo_db):
+        from app.ai.repository import SummaryJobRepository
+        await transcript(mongo_db, "i1")
+        await transcript(mongo_db, "i2")
+        first = await submit_summary_job(mongo_db, "i1", "t1", "d1")
+        second = await submit_summary_job(mongo_db, "i2", "t1", "d1")
+        generate, calls, _ = fake_summaries(mongo_db)
+        finish = SummaryJobRepository.finish
+        failures = []
+
+        async def flaky_finish(self, job_id, worker_id, data):
+            if not failures:
+                failures.append(job_id)
+                raise RuntimeError("connection reset")
+            return await finish(self, job_id, worker_id, data)
+
+        with patch("app.ai.jobs.generate_ai_summary", generate), \
+                patch.object(SummaryJobRepository, "finish", flaky_finish):
+            workers = SummaryWorkers(mongo_db, workers=1)
+            workers.start()
+            try:
+                async def both_ran():
+                    while len(calls) < 2:
+                        await asyncio.sleep(0.01)
+                await asyncio.wait_for(both_ran(), 2.0)
+                await asyncio.sleep(0.05)
+            finally:
+                await workers.stop()
+
+        assert failures == [first["_id"]]
+        assert (await get_job_status(mongo_db, second["_id"], "t1"))["status"] == "done"
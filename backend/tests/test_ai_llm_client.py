@@ -0,0 +1,142 @@
+"""
+Async LLM client against a local OpenAI-compatible stub server: the event
+loop keeps running during a completion, connections are pooled and
+in-flight calls are capped.
+"""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from app.core.config import settings
+from app.ai import llm_client
+
+
+class StubLLM(ThreadingHTTPServer):
+    # Answers /v1/chat/completions after `delay` seconds, echoing the prompt
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.delay = 0.0
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+        self.requests = 0
+        self.connections = set()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+            server.requests += 1
+            server.connections.add(self.client_address)
+        try:
+            time.sleep(server.delay)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+        payload = json.dumps({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": "summary of: " + body["messages"][-1]["content"]}
+            }],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+@pytest.fixture
+def stub_llm(monkeypatch):
+    server = StubLLM()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(settings, "LLM_BASE_URL", server.base_url)
+    monkeypatch.setattr(settings, "LLM_MAX_RETRIES", 0)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+async def fresh_client():
+    yield
+    await llm_client.close_client()
+
+
+class TestAsyncLLMClient:
+    """Non-blocking, pooled and bounded completions"""
+
+    @pytest.mark.asyncio
+    async def test_summary_comes_from_the_endpoint(self, stub_llm):
+        summary = await llm_client.generate_summary("patient reports a headache")
+
+        assert summary.startswith("summary of: ")
+        assert summary.endswith("patient reports a headache")
+
+    @pytest.mark.asyncio
+    async def test_event_loop_runs_during_completion(self, stub_llm):
+        stub_llm.delay = 0.3
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        await llm_client.generate_summary("transcript")
+        task.cancel()
+
+        assert ticks >= 10
+
+    @pytest.mark.asyncio
+    async def test_in_flight_calls_are_capped(self, stub_llm, monkeypatch):
+        monkeypatch.setattr(settings, "LLM_MAX_CONCURRENCY", 2)
+        stub_llm.delay = 0.1
+
+        await asyncio.gather(*(llm_client.generate_summary(f"transcript {i}") for i in range(6)))
+
+        assert stub_llm.requests == 6
+        assert stub_llm.max_active == 2
+
+    @pytest.mark.asyncio
+    async def test_sequential_calls_reuse_one_connection(self, stub_llm):
+        for i in range(3):
+            await llm_client.generate_summary(f"transcript {i}")
+
+        assert len(stub_llm.connections) == 1
+
+    @pytest.mark.asyncio
+    async def test_slow_completion_times_out(self, stub_llm, monkeypatch):
+        from openai import APITimeoutError
+        monkeypatch.setattr(settings, "LLM_TIMEOUT_SECONDS", 0.1)
+        stub_llm.delay = 0.5
+
+        with pytest.raises(APITimeoutError):
+            await llm_client.generate_summary("transcript")
@@ -0,0 +1,313 @@
+"""
+AI summaries: an unchanged transcript is not summarized twice, concurrent
+requests for the same one share a single LLM call, and long transcripts
+are summarized in parallel chunks. A running summary kept while the
+interaction is recorded leaves only the last segments for the end.
+"""
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.ai.service import generate_ai_summary
+from app.voice.service import append_transcript_segment
+
+OUTPUT = json.dumps({"summary": "Headache for two days.", "complaints": ["headache"], "action_points": []})
+
+
+async def transcript(db, interaction_id, *texts, tenant_id="t1"):
+    for text in texts:
+        await append_transcript_segment(db, interaction_id, tenant_id, "d1", text)
+
+
+def slow_llm(delay=0.0):
+    async def generate(text):
+        await asyncio.sleep(delay)
+        return OUTPUT
+    return AsyncMock(side_effect=generate)
+
+
+class TestSummaryCache:
+    """Summaries keyed by transcript hash, model and prompt version"""
+
+    @pytest.mark.asyncio
+    async def test_unchanged_transcript_is_not_summarized_again(self, mongo_db):
+        await transcript(mongo_db, "i1", "I have had a headache", "for two days")
+        llm = slow_llm()
+
+        with patch("app.ai.service.generate_summary", llm):
+            first = await generate_ai_summary(mongo_db, "i1", "t1", "d1")
+            again = await generate_ai_summary(mongo_db, "i1", "t1", "d1")
+
+        assert llm.call_count == 1
+        assert again["_id"] == first["_id"]
+        assert first["transcript_hash"]
+        assert await mongo_db["ai_summaries"].count_documents({}) == 1
+
+    @pytest.mark.asyncio
+    async def test_new_segments_or_prompt_version_summarize_again(self, mongo_db, monkeypatch):
+        await transcript(mongo_db, "i1", "I have had a headache")
+        llm = slow_llm()
+
+        with patch("app.ai.service.generate_summary", llm):
+            first = await generate_ai_summary(mongo_db, "i1", "t1", "d1")
+            await transcript(mongo_db, "i1", "and some nausea")
+            longer = await generate_ai_summary(mongo_db, "i1", "t1", "d1")
+            monkeypatch.setattr("app.ai.service.PROMPT_VERSION", "v-next")
+            reprompted = await generate_ai_summary(mongo_db, "i1", "t1", "d1")
+
+        assert llm.call_count == 3
+        assert longer["transcript_hash"] != first["transcript_hash"]
+        assert reprompted["prompt_version"] == "v-next"
+
+    @pytest.mark.asyncio
+    async def test_rejected_summary_is_generated_again(self, mongo_db):
+        from app.review.service import reject_summary
+        await transcript(mongo_db, "i1", "I have had a headache")
+        llm = slow_llm()
+
+        with patch("app.ai.service.generate_summary", llm):
+            first = await generate_ai_summary(mongo_db, "i1", "t1", "d1")
+            await reject_summary(mongo_db, first["_id"], "d1", "incomplete")
+            second = await generate_ai_summary(mongo_db, "i1", "t1", "d1")
+
+        assert llm.call_count == 2
+        assert second["_id"] != first["_id"]
+
+    @pytest.mark.asyncio
+    async def test_cache_is_per_tenant(self, mongo_db):
+        await transcript(mongo_db, "i1", "I have had a headache", tenant_id="t1")
+        await transcript(mongo_db, "i2", "I have had a headache", tenant_id="t2")
+        llm = slow_llm()
+
+        with patch("app.ai.service.generate_summary", llm):
+            await generate_ai_summary(mongo_db, "i1", "t1", "d1")
+            await generate_ai_summary(mongo_db, "i2", "t2", "d2")
+
+        assert llm.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_call(self, mongo_db):
+        from app.core.metrics import metrics
+        metrics.reset()
+        await transcript(mongo_db, "i1", "I have had a headache")
+        llm = slow_llm(delay=0.1)
+
+        with patch("app.ai.service.generate_summary", llm):
+            summaries = await asyncio.gather(*(generate_ai_summary(mongo_db, "i1", "t1", "d1") for _ in range(5)))
+
+        assert llm.call_count == 1
+        assert len({summary["_id"] for summary in summaries}) == 1
+        assert metrics.snapshot()["counters"]["ai.summary.coalesced"] == 4
+
+    @pytest.mark.asyncio
+    async def test_transcript_stored_before_bucketing_is_summarized(self, mongo_db):
+        await mongo_db["voice_transcripts"].insert_one({
+            "_id": "legacy", "interaction_id": "i1", "tenant_id": "t1",
+            "segments": [{"text": "I have had a headache"}, {"text": "for two days"}]
+        })
+        llm = slow_llm()
+
+        with patch("app.ai.service.generate_summary", llm):
+            summary = await generate_ai_summary(mongo_db, "i1", "t1", "d1")
+
+        assert llm.call_args[0][0] == "I have had a headache for two days"
+        assert summary["summary"] == "Headache for two days."
+
+    @pytest.mark.asyncio
+    async def test_failed_call_is_not_cached(self, mongo_db):
+        await transcript(mongo_db, "i1", "I have had a headache")
+        llm = AsyncMock(side_effect=[RuntimeError("LLM unavailable"), OUTPUT])
+
+        with patch("app.ai.service.generate_summary", llm):
+            with pytest.raises(RuntimeError):
+                await generate_ai_summary(mongo_db, "i1", "t1", "d1")
+            summary = await generate_ai_summary(mongo_db, "i1", "t1", "d1")
+
+        assert summary["summary"] == "Headache for two days."
+
+
+class TestMapReduceSummary:
+    """Long transcripts summarized in parallel chunks, then merged"""
+
+    def test_chunks_follow_segment_boundaries_under_budget(self):
+        from app.ai.chunking import chunk_segments, estimate_tokens
+        texts = [f"segment {i} " + "word " * 10 for i in range(10)] + ["long " * 200]
+
+        chunks = chunk_segments(texts, max_tokens=40)
+
+        assert " ".join(chunks) == " ".join(texts)
+        assert all(chunk.startswith("segment") or chunk == texts[-1] for chunk in chunks)
+        assert all(estimate_tokens(chunk) <= 40 for chunk in chunks[:-1])
+        # Longer than the budget on its own: not split
+        assert chunks[-1] == texts[-1]
+
+    @pytest.mark.asyncio
+    async def test_chunks_run_in_parallel_under_cap_and_are_merged(self, monkeypatch):
+        from app.core.config import settings
+        from app.ai.service import summarize_segments
+        monkeypatch.setattr(settings, "SUMMARY_CHUNK_TOKENS", 20)
+        monkeypatch.setattr(settings, "SUMMARY_MAX_PARALLEL_CHUNKS", 2)
+        active = max_active = 0
+
+        async def summarize_chunk(text):
+            nonlocal active, max_active
+            active += 1
+            max_active = max(max_active, active)
+            await asyncio.sleep(0.02)
+            active -= 1
+            return json.dumps({"summary": text[:9], "complaints": [text[:9]], "action_points": []})
+
+        merged = json.dumps({"summary": "Merged.", "complaints": ["all"], "action_points": ["follow up"]})
+        chunk_llm = AsyncMock(side_effect=summarize_chunk)
+        merge_llm = AsyncMock(return_value=merged)
+
+        with patch("app.ai.service.generate_summary", chunk_llm), patch("app.ai.service.merge_summaries", merge_llm):
+            result = await summarize_segments([f"segment {i} " + "word " * 10 for i in range(6)])
+
+        assert chunk_llm.call_count == 6
+        assert max_active == 2
+        partials = merge_llm.call_args[0][0]
+        assert [partial["summary"] for partial in partials] == [f"segment {i}" for i in range(6)]
+        assert result == {"summary": "Merged.", "complaints": ["all"], "action_points": ["follow up"]}
+
+    @pytest.mark.asyncio
+    async def test_short_transcript_is_one_call(self):
+        from app.ai.service import summarize_segments
+        merge_llm = AsyncMock()
+
+        with patch("app.ai.service.generate_summary", slow_llm()) as llm, \
+                patch("app.ai.service.merge_summaries", merge_llm):
+            result = await summarize_segments(["I have had a headache", "for two days"])
+
+        assert llm.call_count == 1
+        merge_llm.assert_not_called()
+        assert result["summary"] == "Headache for two days."
+
+    @pytest.mark.asyncio
+    async def test_unusable_merge_falls_back_to_joined_partials(self, monkeypatch):
+        from app.core.config import settings
+        from app.ai.service import summarize_segments
+        monkeypatch.setattr(settings, "SUMMARY_CHUNK_TOKENS", 10)
+        partials = iter([
+            {"summary": "Headache.", "complaints": ["headache"], "action_points": ["MRI"]},
+            {"summary": "Nausea.", "complaints": ["Headache", "nausea"], "action_points": []},
+        ])
+
+        async def summarize_chunk(text):
+            return json.dumps(next(partials))
+
+        with patch("app.ai.service.generate_summary", AsyncMock(side_effect=summarize_chunk)), \
+                patch("app.ai.service.merge_summaries", AsyncMock(return_value="not json")):
+            result = await summarize_segments(["first part of the visit", "second part of the visit"])
+
+        assert result == {"summary": "Headache. Nausea.", "complaints": ["headache", "nausea"], "action_points": ["MRI"]}
+
+
+@pytest.fixture
+def rolling(monkeypatch):
+    from app.core.config import settings
+    from app.ai import service
+    monkeypatch.setattr(settings, "SUMMARY_ROLLING_ENABLED", True)
+    monkeypatch.setattr(settings, "SUMMARY_ROLLING_SEGMENTS", 2)
+    monkeypatch.setattr(service, "_rolling", {})
+    return service
+
+
+def running_summary(summary):
+    async def update(previous, text):
+        return json.dumps({"summary": previous["summary"] + " " + summary, "complaints": [], "action_points": []})
+    return AsyncMock(side_effect=update)
+
+
+class TestRollingSummary:
+    """Running summary kept during the interaction; only the rest is folded in at the end"""
+
+    @pytest.mark.asyncio
+    async def test_updates_in_background_then_folds_only_the_delta(self, mongo_db, rolling):
+        llm, update_llm = slow_llm(), running_summary("Nausea.")
+        await transcript(mongo_db, "i1", "I have had a headache", "for two days")
+
+        with patch("app.ai.service.generate_summary", llm), patch("app.ai.service.update_summary", update_llm):
+            rolling.schedule_rolling_update(mongo_db, "i1", stored=1)
+            assert rolling._rolling["i1"].task is None
+            rolling.schedule_rolling_update(mongo_db, "i1", stored=1)
+            await rolling._rolling["i1"].task
+
+            await transcript(mongo_db, "i1", "and some nausea")
+            summary = await generate_ai_summary(mongo_db, "i1", "t1", "d1")
+
+        assert llm.call_count == 1
+        assert llm.call_args[0][0] == "I have had a headache for two days"
+        assert update_llm.call_args[0][1] == "and some nausea"
+        assert summary["summary"] == "Headache for two days. Nausea."
+
+    @pytest.mark.asyncio
+    async def test_closing_folds_the_rest_before_the_summary_is_requested(self, mongo_db, rolling):
+        from app.interactions.service import close_interaction
+        llm, update_llm = slow_llm(delay=0.05), running_summary("Nausea.")
+        await transcript(mongo_db, "i1", "I have had a headache", "for two days")
+
+        with patch("app.ai.service.generate_summary", llm), patch("app.ai.service.update_summary", update_llm):
+            rolling.schedule_rolling_update(mongo_db, "i1", stored=2)
+            await rolling._rolling["i1"].task
+            await transcript(mongo_db, "i1", "and some nausea")
+            await close_interaction(mongo_db, "i1")
+            final = rolling._rolling["i1"].task
+            # Waits for the fold started on close instead of making its own
+            summary = await generate_ai_summary(mongo_db, "i1", "t1", "d1")
+
+        assert final.done()
+        assert (llm.call_count, update_llm.call_count) == (1, 1)
+        assert summary["summary"] == "Headache for two days. Nausea."
+        assert "i1" not in rolling._rolling
+
+    @pytest.mark.asyncio
+    async def test_closing_the_stream_drops_its_tracker(self, mongo_db, rolling):
+        from app.voice.stream import VoiceStream
+        llm = slow_llm(delay=0.05)
+        await transcript(mongo_db, "i1", "I have had a headache", "for two days")
+        stream = VoiceStream(AsyncMock(), mongo_db, interaction_id="i1", tenant_id="t1", doctor_id="d1")
+
+        with patch("app.ai.service.generate_summary", llm):
+            rolling.schedule_rolling_update(mongo_db, "i1", stored=2)
+            running = rolling._rolling["i1"].task
+            # Closed elsewhere: no final update runs in this process
+            await stream.close()
+            assert "i1" in rolling._rolling
+            await running
+            await asyncio.sleep(0)
+
+        assert "i1" not in rolling._rolling
+
+    @pytest.mark.asyncio
+    async def test_running_summary_from_older_prompts_is_not_used(self, mongo_db, rolling, monkeypatch):
+        llm, update_llm = slow_llm(), running_summary("Nausea.")
+        await transcript(mongo_db, "i1", "I have had a headache", "for two days")
+
+        with patch("app.ai.service.generate_summary", llm), patch("app.ai.service.update_summary", update_llm):
+            rolling.schedule_rolling_update(mongo_db, "i1", stored=2)
+            await rolling._rolling["i1"].task
+            monkeypatch.setattr("app.ai.service.PROMPT_VERSION", "v-next")
+            await transcript(mongo_db, "i1", "and some nausea")
+            await generate_ai_summary(mongo_db, "i1", "t1", "d1")
+
+        update_llm.assert_not_called()
+        assert llm.call_args[0][0] == "I have had a headache for two days and some nausea"
+
+    @pytest.mark.asyncio
+    async def test_running_summary_covers_segments_stored_before_bucketing(self, mongo_db, rolling):
+        await mongo_db["voice_transcripts"].insert_one({
+            "_id": "legacy", "interaction_id": "i1", "tenant_id": "t1",
+            "segments": [{"text": "I have had a headache"}, {"text": "for two days"}]
+        })
+        llm, update_llm = slow_llm(), running_summary("Nausea.")
+
+        with patch("app.ai.service.generate_summary", llm), patch("app.ai.service.update_summary", update_llm):
+            rolling.schedule_rolling_update(mongo_db, "i1", stored=2)
+            await rolling._rolling["i1"].task
+            await transcript(mongo_db, "i1", "and some nausea")
+            summary = await generate_ai_summary(mongo_db, "i1", "t1", "d1")
+
+        assert llm.call_args[0][0] == "I have had a headache for two days"
+        assert update_llm.call_args[0][1] == "and some nausea"
+        assert summary["summary"] == "Headache for two days. Nausea."
@@ -300,3 +300,82 @@ class TestTC04TokenExpiry:
         print("\n✅ TC-04 FULL INTEGRATION PASSED")
         print("   - Expired token rejected with 401")
         print("   - TOKEN_EXPIRED audit event logged")
+
+
+class TestWebsocketAuth:
+    """Access token check for websocket routes (no HTTP middleware there)"""
+
+    def _token(self, **claims):
+        payload = {"user_id": "u1", "tenant_id": "t1", "exp": datetime.utcnow() + timedelta(minutes=5)}
+        payload.update(claims)
+        return jwt.encode(payload, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+
+    def _websocket(self, query=None, headers=None):
+        websocket = MagicMock()
+        websocket.query_params = query or {}
+        websocket.headers = headers or {}
+        return websocket
+
+    def test_token_from_query_or_bearer_header(self):
+        from app.core.jwt_middleware import websocket_identity
+        token = self._token()
+
+        from_query = websocket_identity(self._websocket(query={"token": token}))
+        from_header = websocket_identity(self._websocket(headers={"Authorization": f"Bearer {token}"}))
+
+        assert from_query["tenant_id"] == from_header["tenant_id"] == "t1"
+        assert from_query["user_id"] == from_header["user_id"] == "u1"
+
+    def test_missing_tampered_or_expired_token_is_refused(self):
+        from app.core.jwt_middleware import websocket_identity
+        expired = self._token(exp=datetime.utcnow() - timedelta(minutes=1))
+        tampered = self._token()[:-4] + "AAAA"
+        foreign = jwt.encode({"user_id": "u1", "tenant_id": "t1"}, "another-secret", algorithm=settings.JWT_ALGORITHM)
+
+        assert websocket_identity(self._websocket()) is None
+        assert websocket_identity(self._websocket(headers={"Authorization": f"Basic {self._token()}"})) is None
+        for token in (expired, tampered, foreign, "not-a-jwt"):
+            assert websocket_identity(self._websocket(query={"token": token})) is None
+
+    def test_token_without_tenant_is_refused(self):
+        from app.core.jwt_middleware import websocket_identity
+
+        assert websocket_identity(self._websocket(query={"token": self._token(tenant_id=None)})) is None
+
+    def test_voice_stream_closes_with_policy_violation(self):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from starlette.websockets import WebSocketDisconnect
+        from app.voice.routes import router
+
+        app = FastAPI()
+        app.include_router(router, prefix="/voice")
+
+        with pytest.raises(WebSocketDisconnect) as exc_info:
+            with TestClient(app).websocket_connect("/voice/stream/i1?token=not-a-jwt"):
+                pass
+        assert exc_info.value.code == 1008
+
+    @pytest.mark.asyncio
+    async def test_interaction_of_another_tenant_is_refused(self, mongo_db):
+        from app.voice.routes import authorize
+        await mongo_db["interactions"].insert_one({"_id": "mine", "tenant_id": "t1"})
+        await mongo_db["interactions"].insert_one({"_id": "theirs", "tenant_id": "t2"})
+        websocket = self._websocket(query={"token": self._token(role_name="DOCTOR")})
+
+        with patch("app.voice.routes.get_db", return_value=mongo_db):
+            assert (await authorize(websocket, "mine", "voice:stream"))["tenant_id"] == "t1"
+            assert await authorize(websocket, "theirs", "voice:stream") is None
+            assert await authorize(websocket, "unknown", "voice:stream") is None
+
+    @pytest.mark.asyncio
+    async def test_role_needs_the_voice_permission(self, mongo_db):
+        from app.voice.routes import authorize
+        await mongo_db["interactions"].insert_one({"_id": "mine", "tenant_id": "t1"})
+        nurse = self._websocket(query={"token": self._token(role_name="NURSE")})
+        receptionist = self._websocket(query={"token": self._token(role_name="RECEPTIONIST")})
+
+        with patch("app.voice.routes.get_db", return_value=mongo_db):
+            assert await authorize(nurse, "mine", "voice:subscribe") is not None
+            assert await authorize(nurse, "mine", "voice:stream") is None
+            assert await authorize(receptionist, "mine", "voice:subscribe") is None
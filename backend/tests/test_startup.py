@@ -0,0 +1,53 @@
+"""
+Startup-time regression: importing app.main must stay cheap. Whisper and
+torch are loaded lazily by the transcription engines, never at import time.
+"""
+import json
+import os
+import subprocess
+import sys
+
+# Generous enough for a cold CI runner; loading torch + a Whisper model
+# alone takes several times longer than this
+IMPORT_BUDGET_SECONDS = float(os.environ.get("STARTUP_IMPORT_BUDGET_SECONDS", "5.0"))
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app.main
+print(json.dumps({
+    "seconds": time.perf_counter() - start,
+    "torch": "torch" in sys.modules,
+    "whisper": "whisper" in sys.modules,
+}))
+"""
+
+
+def _import_app_main():
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        cwd=backend_dir,
+        env=os.environ.copy(),
+        capture_output=True,
+        text=True,
+        timeout=120
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+class TestStartupTime:
+    """app.main import budget"""
+
+    def test_import_does_not_load_whisper_or_torch(self):
+        probe = _import_app_main()
+
+        assert probe["whisper"] is False
+        assert probe["torch"] is False
+
+    def test_import_time_within_budget(self):
+        probe = _import_app_main()
+
+        print(f"\n   - import app.main: {probe['seconds']:.2f}s (budget {IMPORT_BUDGET_SECONDS:.1f}s)")
+        assert probe["seconds"] < IMPORT_BUDGET_SECONDS
@@ -0,0 +1,113 @@
+"""
+Raw-audio archive: append-only PCM + offset index per interaction, and
+batched replay through the transcription engine.
+"""
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.core.config import settings
+from app.voice.audio import SAMPLE_RATE
+
+
+def tone(seconds, amplitude=0.3):
+    t = np.arange(int(seconds * SAMPLE_RATE), dtype=np.float32) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 200 * t)).astype(np.float32)
+
+
+@pytest.fixture
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "VOICE_ARCHIVE_DIR", str(tmp_path))
+    return tmp_path
+
+
+class TestAudioArchive:
+    """Append-only segment files"""
+
+    def test_chunks_are_appended_with_offsets(self, archive_dir):
+        from app.voice.archive import ArchiveWriter, open_archive
+        writer = ArchiveWriter("t1", "i1")
+        writer.append(tone(1.0), seq=0)
+        writer.append(tone(0.5), seq=1)
+        writer.close()
+
+        samples, ranges = open_archive("t1", "i1")
+
+        assert len(samples) == int(1.5 * SAMPLE_RATE)
+        assert ranges == [(0, int(1.5 * SAMPLE_RATE))]
+        assert np.allclose(samples[:100] / 32767, tone(1.0)[:100], atol=1e-4)
+
+    def test_reconnect_appends_and_resent_frames_are_skipped(self, archive_dir):
+        from app.voice.archive import ArchiveWriter, open_archive
+        first = ArchiveWriter("t1", "i1")
+        first.append(tone(1.0), seq=0)
+        first.append(tone(1.0), seq=1)
+        first.close()
+
+        # Frame 1 was never acked, so the client sends it again
+        second = ArchiveWriter("t1", "i1")
+        second.append(tone(1.0), seq=1)
+        second.append(tone(1.0), seq=2)
+        second.close()
+
+        _, ranges = open_archive("t1", "i1")
+        assert ranges == [(0, 2 * SAMPLE_RATE), (3 * SAMPLE_RATE, 4 * SAMPLE_RATE)]
+
+    def test_torn_index_record_is_ignored(self, archive_dir):
+        from app.voice.archive import ArchiveWriter, open_archive
+        writer = ArchiveWriter("t1", "i1")
+        writer.append(tone(1.0), seq=0)
+        writer.close()
+        with open(writer.idx_path, "ab") as f:
+            f.write(b"\x01\x02\x03")
+
+        _, ranges = open_archive("t1", "i1")
+        assert ranges == [(0, SAMPLE_RATE)]
+
+    def test_unsafe_ids_are_rejected(self, archive_dir):
+        from app.voice.archive import ArchiveWriter
+        with pytest.raises(ValueError):
+            ArchiveWriter("t1", "../../etc/passwd")
+
+    @pytest.mark.asyncio
+    async def test_stream_archives_received_frames(self, archive_dir, mongo_db):
+        from app.voice.archive import list_archives, open_archive
+        from app.voice.stream import FRAME_HEADER, VoiceStream
+        from app.voice.audio import encode_wav
+        stream = VoiceStream(AsyncMock(), mongo_db, interaction_id="i1", tenant_id="t1", doctor_id="d1")
+        stream.protocol = 2
+
+        await stream.receive_frame(FRAME_HEADER.pack(0) + encode_wav(tone(0.5)))
+        await stream.receive_frame(FRAME_HEADER.pack(1) + encode_wav(tone(0.5)))
+        stream.connected = False
+        with patch("app.voice.stream.transcribe_chunk", AsyncMock(return_value={"text": "x", "language": "en"})):
+            await stream.close()
+
+        assert list_archives() == [("t1", "i1")]
+        samples, _ = open_archive("t1", "i1")
+        assert len(samples) == SAMPLE_RATE
+
+
+class TestReplay:
+    """Batched re-transcription"""
+
+    def test_replay_transcribes_windows_in_batches(self, archive_dir):
+        from app.voice.archive import ArchiveWriter
+        from app.voice.engines import decode_options
+        from app.voice.replay import replay_interaction
+        writer = ArchiveWriter("t1", "i1")
+        for seq in range(10):
+            writer.append(tone(10.0), seq=seq)
+        writer.close()
+
+        batches = []
+
+        def transcribe_batch(audios, options):
+            batches.append(len(audios))
+            return [{"text": " words ", "language": "en"} for _ in audios]
+
+        with patch("app.voice.replay.transcribe_batch", transcribe_batch):
+            segments = replay_interaction("t1", "i1", decode_options(engine="fake"), batch_size=2, window_seconds=30)
+
+        assert batches == [2, 2]
+        assert [(s["start"], s["end"]) for s in segments] == [(0, 30), (30, 60), (60, 90), (90, 100)]
+        assert segments[0]["text"] == "words"
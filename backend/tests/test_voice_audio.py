@@ -0,0 +1,195 @@
+"""
+Voice audio decoding: WebSocket chunks are decoded in memory into the
+16 kHz float32 arrays Whisper expects.
+"""
+import struct
+import numpy as np
+import pytest
+from app.voice.audio import (
+    SAMPLE_RATE,
+    decode_audio_chunk,
+    decode_wav,
+    encode_wav,
+    parse_wav_header,
+)
+
+
+def _wav(pcm: bytes, sample_rate=SAMPLE_RATE, channels=1, bits=16, audio_format=1, data_size=None):
+    block_align = channels * bits // 8
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + len(pcm), b"WAVE",
+        b"fmt ", 16, audio_format, channels, sample_rate, sample_rate * block_align, block_align, bits,
+        b"data", len(pcm) if data_size is None else data_size
+    ) + pcm
+
+
+class TestWavDecoding:
+    """In-memory WAV decoding"""
+
+    def test_pcm16_wav_round_trip(self):
+        audio = np.linspace(-0.5, 0.5, SAMPLE_RATE, dtype=np.float32)
+
+        decoded = decode_audio_chunk(encode_wav(audio))
+
+        assert decoded.dtype == np.float32
+        assert decoded.shape == audio.shape
+        assert np.allclose(decoded, audio, atol=1e-4)
+
+    def test_float32_wav_is_a_view_over_the_chunk(self):
+        audio = np.array([0.0, 0.25, -0.25, 1.0], dtype=np.float32)
+        chunk = _wav(audio.tobytes(), bits=32, audio_format=3)
+
+        decoded = decode_wav(chunk)
+
+        assert np.array_equal(decoded, audio)
+        # No copy: the array still points into the received bytes
+        assert not decoded.flags.owndata
+
+    def test_stereo_is_downmixed(self):
+        frames = np.array([[16384, -16384], [8192, 8192]], dtype="<i2")
+
+        decoded = decode_wav(_wav(frames.tobytes(), channels=2))
+
+        assert np.allclose(decoded, [0.0, 0.25])
+
+    def test_other_sample_rates_are_resampled(self):
+        audio = np.zeros(8000, dtype=np.float32)
+
+        decoded = decode_wav(encode_wav(audio, sample_rate=8000))
+
+        assert len(decoded) == SAMPLE_RATE
+
+    def test_content_above_16k_nyquist_does_not_fold_down(self):
+        t = np.arange(48000) / 48000
+        high = np.sin(2 * np.pi * 12000 * t).astype(np.float32)
+        low = np.sin(2 * np.pi * 1000 * t).astype(np.float32)
+
+        # Without a low-pass, 12 kHz at 48 kHz aliases to 4 kHz at 16 kHz
+        aliased = decode_wav(encode_wav(high, sample_rate=48000))[1000:-1000]
+        kept = decode_wav(encode_wav(low, sample_rate=48000))[1000:-1000]
+
+        assert np.sqrt(np.mean(aliased ** 2)) < 0.01
+        assert np.sqrt(np.mean(kept ** 2)) == pytest.approx(0.707, abs=0.01)
+
+    def test_zero_sample_rate_or_channels_is_a_value_error(self):
+        pcm = np.zeros(160, dtype="<i2").tobytes()
+
+        for chunk in (_wav(pcm, sample_rate=0), _wav(pcm, channels=0)):
+            with pytest.raises(ValueError):
+                decode_wav(chunk)
+
+    def test_truncated_fmt_chunk_is_a_value_error(self):
+        chunk = _wav(b"\x00" * 8)[:30]
+
+        with pytest.raises(ValueError):
+            decode_audio_chunk(chunk)
+
+    def test_streaming_data_size_uses_remaining_bytes(self):
+        pcm = np.full(100, 1000, dtype="<i2").tobytes()
+
+        header = parse_wav_header(_wav(pcm, data_size=0xFFFFFFFF))
+
+        assert header["data_size"] == len(pcm)
+
+    def test_raw_pcm16_without_header(self):
+        pcm = np.array([0, 16384, -32768], dtype="<i2").tobytes()
+
+        decoded = decode_audio_chunk(pcm)
+
+        assert np.allclose(decoded, [0.0, 0.5, -1.0])
+
+    def test_unsupported_encoding_raises(self):
+        with pytest.raises(ValueError):
+            decode_wav(_wav(b"\x00" * 8, bits=8))
+
+
+class TestVoiceActivityGate:
+    """Energy-based VAD before transcription"""
+
+    def _tone(self, seconds, amplitude=0.3):
+        t = np.arange(int(seconds * SAMPLE_RATE), dtype=np.float32) / SAMPLE_RATE
+        return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+    def _silence(self, seconds):
+        return np.random.default_rng(0).normal(0, 1e-4, int(seconds * SAMPLE_RATE)).astype(np.float32)
+
+    def test_silent_chunk_is_dropped(self):
+        from app.voice.vad import gate
+        from app.core.metrics import metrics
+        metrics.reset()
+
+        assert gate(self._silence(1.0)) is None
+        assert metrics.snapshot()["counters"]["voice.vad.chunks_skipped"] == 1
+
+    def test_leading_and_trailing_silence_is_trimmed(self):
+        from app.voice.vad import trim_to_speech
+        audio = np.concatenate([self._silence(1.0), self._tone(0.5), self._silence(1.0)])
+
+        speech, voiced, total = trim_to_speech(audio, threshold_db=-45, frame_ms=30, hangover_ms=90)
+
+        # Speech plus the hangover on each side, and a view rather than a copy
+        assert 0.5 * SAMPLE_RATE <= len(speech) <= 0.8 * SAMPLE_RATE
+        assert speech.base is audio
+        assert voiced < total
+
+    def test_long_internal_silence_is_compacted(self):
+        from app.voice.vad import trim_to_speech
+        audio = np.concatenate([self._tone(0.3), self._silence(2.0), self._tone(0.3)])
+
+        speech, _, _ = trim_to_speech(audio, threshold_db=-45, frame_ms=30, hangover_ms=90)
+
+        assert len(speech) < 1.0 * SAMPLE_RATE
+
+    def test_gate_is_a_no_op_when_disabled(self, monkeypatch):
+        from app.core.config import settings
+        from app.voice.vad import gate
+        monkeypatch.setattr(settings, "VAD_ENABLED", False)
+        audio = self._silence(0.5)
+
+        assert gate(audio) is audio
+
+
+class TestTransportCodecs:
+    """Compressed voice transport decoding"""
+
+    def _speech(self):
+        t = np.arange(SAMPLE_RATE, dtype=np.float32) / SAMPLE_RATE
+        return (0.5 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+    def test_mulaw_round_trip(self):
+        from app.voice.codecs import encode_mulaw, get_decoder
+        audio = self._speech()
+
+        encoded = encode_mulaw(audio)
+        decoded = get_decoder("mulaw")(encoded)
+
+        assert len(encoded) == len(audio)  # 8 bits per sample, half of PCM16
+        assert np.abs(decoded - audio).max() < 0.02
+
+    def test_alaw_round_trip(self):
+        from app.voice.codecs import encode_alaw, get_decoder
+        audio = self._speech()
+
+        decoded = get_decoder("alaw")(encode_alaw(audio))
+
+        assert np.abs(decoded - audio).max() < 0.02
+
+    def test_flac_round_trip_is_lossless_at_16_bit(self):
+        from app.voice import codecs
+        if codecs.soundfile is None:
+            pytest.skip("soundfile not installed")
+        audio = self._speech()
+
+        encoded = codecs.encode_flac(audio)
+        decoded = codecs.get_decoder("flac")(encoded)
+
+        assert len(encoded) < len(audio) * 2
+        assert np.abs(decoded - audio).max() < 1e-4
+
+    def test_negotiation_picks_first_supported_codec(self):
+        from app.voice.codecs import negotiate
+
+        assert negotiate(["opus", "alaw", "mulaw"]) == "alaw"
+        assert negotiate("speex") == "auto"
+        assert negotiate(None) == "auto"
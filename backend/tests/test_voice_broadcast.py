@@ -0,0 +1,133 @@
+"""
+Live transcript fan-out: every viewer of an interaction gets the text
+transcribed once by the stream, on this worker or another one.
+"""
+import asyncio
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.voice.broadcast import InMemoryRedis, TranscriptHub
+from tests.test_voice_stream import result, silence, tone
+
+
+async def next_message(subscription):
+    return await asyncio.wait_for(subscription.get(), 1.0)
+
+
+class TestTranscriptHub:
+    """In-process and cross-worker delivery"""
+
+    @pytest.mark.asyncio
+    async def test_stream_text_reaches_every_subscriber(self, mongo_db, monkeypatch):
+        from app.core.config import settings
+        from app.voice import broadcast
+        from app.voice.stream import VoiceStream
+        monkeypatch.setattr(settings, "VOICE_INTERIM_SECONDS", 0)
+        hub = TranscriptHub()
+        monkeypatch.setattr(broadcast, "_hub", hub)
+        nurse = await hub.subscribe("i1")
+        scribe = await hub.subscribe("i1")
+        other = await hub.subscribe("i2")
+
+        stream = VoiceStream(AsyncMock(), mongo_db, interaction_id="i1", tenant_id="t1", doctor_id="d1")
+        transcribe = AsyncMock(return_value=result("hello"))
+        with patch("app.voice.stream.transcribe_chunk", transcribe):
+            await stream.handle_audio(np.concatenate([tone(3), silence(0.6)]))
+
+        assert transcribe.call_count == 1
+        assert await next_message(nurse) == {"text": "hello", "final": True}
+        assert await next_message(scribe) == {"text": "hello", "final": True}
+        assert other.queue.empty()
+
+    @pytest.mark.asyncio
+    async def test_viewers_on_other_workers_receive_via_pubsub(self):
+        speaker_worker = TranscriptHub(InMemoryRedis())
+        viewer_worker = TranscriptHub(InMemoryRedis())
+        local = await speaker_worker.subscribe("i1")
+        remote = await viewer_worker.subscribe("i1")
+        try:
+            await speaker_worker.publish("i1", {"text": "hello", "final": True})
+
+            assert await next_message(remote) == {"text": "hello", "final": True}
+            assert await next_message(local) == {"text": "hello", "final": True}
+            # The publishing worker skips its own message coming back
+            await asyncio.sleep(0.05)
+            assert local.queue.empty()
+        finally:
+            await speaker_worker.close()
+            await viewer_worker.close()
+
+    @pytest.mark.asyncio
+    async def test_last_viewer_leaving_unsubscribes_channel(self):
+        hub = TranscriptHub(InMemoryRedis())
+        first = await hub.subscribe("i1")
+        second = await hub.subscribe("i1")
+
+        await first.close()
+        assert "voice:transcript:i1" in hub._pubsub.subscribed_channels
+        await second.close()
+        assert hub.subscriber_count("i1") == 0
+        assert not hub._pubsub.subscribed
+        await hub.close()
+
+    @pytest.mark.asyncio
+    async def test_slow_viewer_drops_oldest_messages(self):
+        from app.core.metrics import metrics
+        metrics.reset()
+        hub = TranscriptHub(max_messages=2)
+        viewer = await hub.subscribe("i1")
+
+        for n in range(3):
+            await hub.publish("i1", {"text": str(n), "final": True})
+
+        assert [(await viewer.get())["text"] for _ in range(2)] == ["1", "2"]
+        assert metrics.snapshot()["counters"]["voice.broadcast.dropped"] == 1
+
+    @pytest.mark.asyncio
+    async def test_relay_forwards_until_viewer_disconnects(self):
+        from app.voice.broadcast import relay
+        hub = TranscriptHub()
+        viewer = await hub.subscribe("i1")
+        disconnected = asyncio.Event()
+        websocket = AsyncMock()
+
+        async def receive():
+            await disconnected.wait()
+            return {"type": "websocket.disconnect"}
+
+        websocket.receive.side_effect = receive
+        relaying = asyncio.create_task(relay(websocket, viewer))
+        await hub.publish("i1", {"text": "hello", "final": True})
+        await asyncio.sleep(0.01)
+        disconnected.set()
+        await asyncio.wait_for(relaying, 1.0)
+
+        websocket.send_json.assert_called_once_with({"text": "hello", "final": True})
+        assert hub.subscriber_count("i1") == 0
+
+
+class TestSubscribeEndpoint:
+    """Viewers only see interactions of their own tenant"""
+
+    def _connect(self, mongo_db, token):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from app.voice.routes import router
+
+        app = FastAPI()
+        app.include_router(router, prefix="/voice")
+        with patch("app.voice.routes.get_db", return_value=mongo_db):
+            with TestClient(app).websocket_connect(f"/voice/subscribe/i1?token={token}"):
+                pass
+
+    @pytest.mark.parametrize("tenant_id", ["t2", None])
+    def test_other_tenant_or_unknown_interaction_is_rejected(self, mongo_db, tenant_id):
+        from starlette.websockets import WebSocketDisconnect
+        from app.core.security import create_access_token
+        if tenant_id:
+            asyncio.run(mongo_db["interactions"].insert_one({"_id": "i1", "tenant_id": tenant_id}))
+        token = create_access_token({"user_id": "n1", "tenant_id": "t1"})
+
+        with pytest.raises(WebSocketDisconnect) as exc_info:
+            self._connect(mongo_db, token)
+        assert exc_info.value.code == 1008
@@ -0,0 +1,255 @@
+"""
+Transcription engines and tiers: backend selection, per-tier decode options
+and the model registry that keeps several tiers loaded under a memory budget.
+"""
+import threading
+from collections import OrderedDict
+import numpy as np
+import pytest
+from unittest.mock import patch
+from app.core.config import settings
+import app.voice.whisper_engine as engine
+from app.voice.engines import decode_options, get_engine, transcribe_batch, transcribe_segment
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def slow_loads():
+    # model name -> event its load waits for
+    return {}
+
+
+@pytest.fixture
+def registry(monkeypatch, slow_loads):
+    loaded = []
+    sizes = {"tiny": 100 * MB, "base": 200 * MB, "small": 500 * MB}
+
+    def load(name, device, quantize):
+        loaded.append((name, quantize))
+        if name in slow_loads:
+            slow_loads[name].wait(5)
+        return {"name": name, "quantize": quantize}
+
+    monkeypatch.setattr(engine, "_models", OrderedDict())
+    monkeypatch.setattr(engine, "_loading", {})
+    monkeypatch.setattr(engine, "_load", load)
+    monkeypatch.setattr(engine, "_model_bytes", lambda model: sizes[model["name"]])
+    return loaded
+
+
+class TestTranscriptionTiers:
+    """Latency/quality tiers"""
+
+    def test_tiers_set_model_and_decoding(self):
+        fast = decode_options("fast")
+        quality = decode_options("quality")
+
+        assert (fast["model"], fast["quantize"], fast["beam_size"]) == ("tiny", True, None)
+        assert fast["temperature"] == (0.0,)
+        assert (quality["model"], quality["beam_size"]) == ("small", 5)
+        assert decode_options()["tier"] == settings.VOICE_DEFAULT_TIER
+
+    def test_unknown_tier_is_rejected(self):
+        with pytest.raises(ValueError):
+            decode_options("ultra")
+
+    def test_models_stay_loaded_side_by_side(self, registry, monkeypatch):
+        monkeypatch.setattr(settings, "VOICE_MODEL_MEMORY_MB", 1024)
+
+        engine.get_model("tiny", quantize=True)
+        engine.get_model("small")
+        engine.get_model("tiny", quantize=True)
+
+        assert registry == [("tiny", True), ("small", False)]
+
+    def test_loading_one_model_does_not_block_the_others(self, registry, slow_loads, monkeypatch):
+        monkeypatch.setattr(settings, "VOICE_MODEL_MEMORY_MB", 1024)
+        engine.get_model("tiny")
+        slow_loads["small"] = threading.Event()
+        results = []
+        loaders = [threading.Thread(target=lambda: results.append(engine.get_model("small"))) for _ in range(2)]
+        for loader in loaders:
+            loader.start()
+
+        # Answered while "small" is still loading
+        tiny = threading.Thread(target=lambda: results.append(engine.get_model("tiny")))
+        tiny.start()
+        tiny.join(1)
+        answered = not tiny.is_alive()
+        slow_loads["small"].set()
+        for loader in loaders:
+            loader.join(5)
+
+        assert answered
+        assert [model["name"] for model in results] == ["tiny", "small", "small"]
+        assert registry == [("tiny", False), ("small", False)]
+
+    def test_least_recently_used_model_is_evicted_over_budget(self, registry, monkeypatch):
+        monkeypatch.setattr(settings, "VOICE_MODEL_MEMORY_MB", 700)
+
+        engine.get_model("tiny")
+        engine.get_model("base")
+        engine.get_model("tiny")
+        engine.get_model("small")
+
+        assert [key[0] for key in engine._models] == ["tiny", "small"]
+
+    def test_quantization_converts_whisper_linear_layers(self):
+        torch = pytest.importorskip("torch")
+        whisper = pytest.importorskip("whisper")
+        dims = whisper.model.ModelDimensions(
+            n_mels=80, n_audio_ctx=16, n_audio_state=64, n_audio_head=2, n_audio_layer=1,
+            n_vocab=128, n_text_ctx=16, n_text_state=64, n_text_head=2, n_text_layer=1
+        )
+        model = whisper.model.Whisper(dims)
+        size = engine._model_bytes(model)
+
+        quantized = engine.quantize_model(model)
+
+        assert not any(type(m) is whisper.model.Linear for m in quantized.modules())
+        assert any(isinstance(m, torch.ao.nn.quantized.dynamic.Linear) for m in quantized.modules())
+        assert engine._model_bytes(quantized) < size
+
+
+class TestTranscriptionEngines:
+    """Pluggable backends"""
+
+    def test_fake_engine_is_deterministic(self):
+        audio = np.linspace(-0.5, 0.5, 16000, dtype=np.float32)
+        options = decode_options(engine="fake")
+
+        first = transcribe_segment(audio, options)
+        again = transcribe_segment(audio.copy(), options)
+        other = transcribe_segment(audio[::-1].copy(), options)
+
+        assert first == again
+        assert first["text"] != other["text"]
+        assert first["language"] == "en"
+        assert len(transcribe_batch([audio, audio], options)) == 2
+
+    def test_backend_is_chosen_by_options(self, monkeypatch):
+        monkeypatch.setitem(settings.VOICE_TIERS, "loadtest", {"engine": "fake"})
+
+        assert decode_options("loadtest")["engine"] == "fake"
+        assert decode_options()["engine"] == settings.VOICE_ENGINE
+        with pytest.raises(ValueError):
+            get_engine("nonexistent")
+
+    def test_int8_backend_quantizes_whisper(self):
+        options = decode_options(engine="whisper-int8", quantize=False)
+
+        with patch.object(engine, "transcribe_segment", return_value={"text": "", "language": "en"}) as segment:
+            transcribe_segment(np.zeros(16000, dtype=np.float32), options)
+
+        assert segment.call_args[0][1]["quantize"] is True
+
+
+class DictRedis:
+    # The two calls RedisCache makes, on a plain dict shared like a server
+    def __init__(self, store):
+        self.store = store
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def set(self, key, value, ex=None):
+        self.store[key] = value
+
+
+class TestTranscriptionCache:
+    """Results cached by audio content and decode options"""
+
+    def _counting(self):
+        calls = []
+
+        def transcribe(audio, options):
+            calls.append(len(audio))
+            return {"text": f"text {len(audio)}", "language": "en"}
+
+        def transcribe_batch(audios, options):
+            return [transcribe(audio, options) for audio in audios]
+
+        return calls, transcribe, transcribe_batch
+
+    def test_identical_audio_is_transcribed_once(self):
+        from app.voice.cache import MemoryCache, TranscriptionCache
+        from app.core.metrics import metrics
+        metrics.reset()
+        cache = TranscriptionCache(MemoryCache(max_entries=10, ttl=60))
+        calls, transcribe, _ = self._counting()
+        audio = np.linspace(-0.5, 0.5, 16000, dtype=np.float32)
+        options = decode_options(engine="fake")
+
+        first = cache.transcribe(transcribe, audio, options)
+        resent = cache.transcribe(transcribe, audio.copy(), options)
+        cache.transcribe(transcribe, audio, {**options, "model": "small"})
+        cache.transcribe(transcribe, audio, {**options, "initial_prompt": "earlier text"})
+
+        assert resent == first
+        assert len(calls) == 3
+        snapshot = metrics.snapshot()
+        assert snapshot["counters"]["voice.cache.hits"] == 1
+        assert snapshot["counters"]["voice.cache.misses"] == 3
+        assert snapshot["gauges"]["voice.cache.hit_ratio"] == 0.25
+
+    def test_batch_only_decodes_unseen_chunks(self):
+        from app.voice.cache import MemoryCache, TranscriptionCache
+        cache = TranscriptionCache(MemoryCache(max_entries=10, ttl=60))
+        calls, transcribe, transcribe_batch = self._counting()
+        options = decode_options(engine="fake")
+        seen, new = np.ones(800, dtype=np.float32), np.ones(1600, dtype=np.float32)
+        cache.transcribe(transcribe, seen, options)
+
+        results = cache.transcribe_batch(transcribe_batch, [seen, new, seen], options)
+
+        assert [r["text"] for r in results] == ["text 800", "text 1600", "text 800"]
+        assert calls == [800, 1600]
+
+    def test_entries_expire_and_least_recently_used_are_evicted(self, monkeypatch):
+        from app.voice import cache as cache_module
+        from app.voice.cache import MemoryCache
+        now = [1000.0]
+        monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+        memory = MemoryCache(max_entries=2, ttl=60)
+
+        memory.set("a", {"text": "a"})
+        memory.set("b", {"text": "b"})
+        memory.get("a")
+        memory.set("c", {"text": "c"})
+        assert memory.get("b") is None
+        assert memory.get("a") == {"text": "a"}
+
+        now[0] += 61
+        assert memory.get("a") is None
+
+    def test_shared_backend_serves_other_processes(self):
+        from app.voice.cache import RedisCache, TranscriptionCache
+        store = {}
+        api_worker = TranscriptionCache(RedisCache(DictRedis(store), ttl=60))
+        replay_job = TranscriptionCache(RedisCache(DictRedis(store), ttl=60))
+        calls, transcribe, _ = self._counting()
+        audio = np.ones(1600, dtype=np.float32)
+        options = decode_options(engine="fake")
+
+        api_worker.transcribe(transcribe, audio, options)
+        result = replay_job.transcribe(transcribe, audio, options)
+
+        assert result == {"text": "text 1600", "language": "en"}
+        assert len(calls) == 1
+
+    def test_backend_failure_falls_back_to_decoding(self):
+        from app.voice.cache import TranscriptionCache
+
+        class Down:
+            def get(self, key):
+                raise ConnectionError("redis down")
+
+            def set(self, key, value):
+                raise ConnectionError("redis down")
+
+        calls, transcribe, _ = self._counting()
+        cache = TranscriptionCache(Down())
+
+        assert cache.transcribe(transcribe, np.ones(10, dtype=np.float32), decode_options())["text"] == "text 10"
+        assert len(calls) == 1
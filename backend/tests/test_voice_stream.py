@@ -0,0 +1,547 @@
+"""
+Voice stream windowing: client chunks of any size are assembled into
+inference windows cut at speech pauses, with interim text in between.
+"""
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.voice.audio import SAMPLE_RATE, encode_wav
+from app.voice.buffer import AudioStreamBuffer
+
+
+def tone(seconds, amplitude=0.3):
+    t = np.arange(int(seconds * SAMPLE_RATE), dtype=np.float32) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 200 * t)).astype(np.float32)
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+
+def result(text, language="en"):
+    return {"text": text, "language": language}
+
+
+def feed(buffer, audio, chunk_seconds=0.2):
+    step = int(chunk_seconds * SAMPLE_RATE)
+    windows = []
+    for i in range(0, len(audio), step):
+        windows += buffer.push(audio[i:i + step])
+    return windows
+
+
+class TestAudioStreamBuffer:
+    """Adaptive inference windows"""
+
+    def test_window_closes_at_speech_pause(self):
+        buffer = AudioStreamBuffer(target_seconds=10, min_seconds=2, pause_ms=400)
+
+        windows = feed(buffer, np.concatenate([tone(3), silence(0.6)]))
+
+        assert len(windows) == 1
+        assert 3.0 <= len(windows[0]) / SAMPLE_RATE <= 3.6
+
+    def test_continuous_speech_is_cut_at_target_with_overlap(self):
+        buffer = AudioStreamBuffer(target_seconds=5, min_seconds=2, overlap_ms=300)
+
+        windows = feed(buffer, tone(8))
+
+        assert [len(w) for w in windows] == [5 * SAMPLE_RATE]
+        # Overlap from the forced cut is carried into the next window
+        assert len(buffer) == int(3.3 * SAMPLE_RATE)
+        assert buffer.new_samples == 3 * SAMPLE_RATE
+
+    def test_short_chunks_do_not_emit_tiny_windows(self):
+        buffer = AudioStreamBuffer(target_seconds=10, min_seconds=2)
+
+        windows = feed(buffer, tone(1.5), chunk_seconds=0.05)
+
+        assert windows == []
+        assert len(buffer) == int(1.5 * SAMPLE_RATE)
+
+    def test_oversized_chunk_is_split_into_windows(self):
+        buffer = AudioStreamBuffer(target_seconds=10, min_seconds=2, capacity=12 * SAMPLE_RATE)
+
+        windows = buffer.push(tone(25))
+
+        assert len(windows) == 2
+        assert all(len(w) == 10 * SAMPLE_RATE for w in windows)
+
+    def test_silence_only_is_discarded(self):
+        buffer = AudioStreamBuffer(target_seconds=10, min_seconds=2)
+
+        assert feed(buffer, silence(3)) == []
+        assert buffer.flush() is None
+
+
+class TestVoiceStream:
+    """Final and interim results on the socket"""
+
+    def _stream(self, db=None):
+        from app.voice.stream import VoiceStream
+        websocket = AsyncMock()
+        return VoiceStream(websocket, db=db or {}, interaction_id="i1", tenant_id="t1", doctor_id="d1"), websocket
+
+    async def _texts(self, db):
+        from app.voice.repository import TranscriptRepository
+        return [s["text"] async for s in TranscriptRepository(db).iter_segments("i1")]
+
+    @pytest.mark.asyncio
+    async def test_final_window_is_sent_at_once_and_stored_on_flush(self, mongo_db, monkeypatch):
+        from app.core.config import settings
+        monkeypatch.setattr(settings, "VOICE_INTERIM_SECONDS", 0)
+        stream, websocket = self._stream(mongo_db)
+
+        with patch("app.voice.stream.transcribe_chunk", AsyncMock(return_value=result("hello"))):
+            await stream.handle_audio(np.concatenate([tone(3), silence(0.6)]))
+
+        websocket.send_json.assert_called_once_with({"text": "hello", "final": True})
+        assert await self._texts(mongo_db) == []
+
+        await stream.writer.flush()
+        assert await self._texts(mongo_db) == ["hello"]
+
+    @pytest.mark.asyncio
+    async def test_interim_text_is_sent_but_not_stored(self, monkeypatch):
+        from app.core.config import settings
+        monkeypatch.setattr(settings, "VOICE_INTERIM_SECONDS", 1.0)
+        stream, websocket = self._stream()
+
+        with patch("app.voice.stream.transcribe_chunk", AsyncMock(return_value=result("partial"))) as transcribe:
+            await stream.handle_audio(tone(1.2))
+
+        assert stream.writer.pending == []
+        websocket.send_json.assert_called_once_with({"text": "partial", "final": False})
+        # Decoded on the cheap tier; the stream's own tier is kept for finals
+        assert transcribe.call_args.args[1]["tier"] == "fast"
+        assert stream.options["tier"] == "standard"
+
+    @pytest.mark.asyncio
+    async def test_buffered_audio_is_stored_on_close(self, mongo_db, monkeypatch):
+        from app.core.config import settings
+        monkeypatch.setattr(settings, "VOICE_INTERIM_SECONDS", 0)
+        stream, websocket = self._stream(mongo_db)
+
+        with patch("app.voice.stream.transcribe_chunk", AsyncMock(return_value=result("tail"))):
+            await stream.handle_audio(tone(1.0))
+            stream.connected = False
+            await stream.close()
+
+        assert await self._texts(mongo_db) == ["tail"]
+        websocket.send_json.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_stage_latencies_are_recorded(self, mongo_db, monkeypatch):
+        from app.core.config import settings
+        from app.core.metrics import metrics
+        monkeypatch.setattr(settings, "VOICE_INTERIM_SECONDS", 0)
+        monkeypatch.setattr(settings, "VOICE_WRITE_FLUSH_SECONDS", 0)
+        metrics.reset()
+        stream, _ = self._stream(mongo_db)
+
+        with patch("app.voice.stream.transcribe_chunk", AsyncMock(return_value=result("hello"))):
+            await stream.handle_audio(np.concatenate([tone(3), silence(0.6)]))
+
+        histograms = metrics.snapshot()["histograms"]
+        for stage in ("transcribe", "persist", "send"):
+            assert histograms[f"voice.stage.{stage}_seconds"]["count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_detected_language_is_pinned_and_text_carried_as_prompt(self, monkeypatch):
+        from app.core.config import settings
+        monkeypatch.setattr(settings, "VOICE_INTERIM_SECONDS", 0)
+        monkeypatch.setattr(settings, "VOICE_DEFAULT_LANGUAGE", None)
+        stream, _ = self._stream()
+        transcribe = AsyncMock(side_effect=[result("first", "de"), result("second", "de")])
+
+        with patch("app.voice.stream.transcribe_chunk", transcribe):
+            await stream.handle_audio(np.concatenate([tone(3), silence(0.6)]))
+            await stream.handle_audio(np.concatenate([tone(3), silence(0.6)]))
+
+        first, second = (c[0][1] for c in transcribe.call_args_list)
+        assert first["language"] is None and first["initial_prompt"] is None
+        assert second["language"] == "de"
+        assert second["initial_prompt"] == "first"
+
+    @pytest.mark.asyncio
+    async def test_tenant_default_language_is_used(self, mongo_db, monkeypatch):
+        from app.core.config import settings
+        from app.voice.stream import VoiceStream
+        monkeypatch.setattr(settings, "VOICE_DEFAULT_LANGUAGE", None)
+        await mongo_db["tenants"].insert_one({"_id": "t1", "voice_language": "fr"})
+
+        websocket = AsyncMock()
+        websocket.receive.side_effect = socket_messages()
+        stream = VoiceStream(websocket, mongo_db, interaction_id="i1", tenant_id="t1", doctor_id="d1")
+        await stream.run()
+
+        assert stream.options["language"] == "fr"
+
+    @pytest.mark.asyncio
+    async def test_tier_comes_from_tenant_and_hello(self, mongo_db):
+        from app.voice.stream import VoiceStream
+        await mongo_db["tenants"].insert_one({"_id": "t1", "voice_tier": "quality"})
+
+        websocket = AsyncMock()
+        websocket.receive.side_effect = socket_messages()
+        tenant_stream = VoiceStream(websocket, mongo_db, interaction_id="i1", tenant_id="t1", doctor_id="d1")
+        await tenant_stream.run()
+
+        websocket = AsyncMock()
+        websocket.receive.side_effect = socket_messages(
+            {"type": "websocket.receive", "text": '{"type": "hello", "tier": "fast"}'}
+        )
+        hello_stream = VoiceStream(websocket, mongo_db, interaction_id="i2", tenant_id="t1", doctor_id="d1")
+        await hello_stream.run()
+
+        assert tenant_stream.options["model"] == "small"
+        assert hello_stream.options["model"] == "tiny"
+        ready = [c[0][0] for c in websocket.send_json.call_args_list if c[0][0].get("type") == "ready"]
+        assert ready[0]["tier"] == "fast"
+
+
+class TestBackpressure:
+    """Per-connection queue and flow control"""
+
+    @pytest.mark.asyncio
+    async def test_queued_chunks_are_coalesced(self):
+        from app.voice.stream import PcmQueue
+        queue = PcmQueue(max_samples=SAMPLE_RATE, policy="coalesce")
+
+        await queue.put(tone(0.1))
+        await queue.put(tone(0.2))
+
+        audio, _ = await queue.get_all()
+        assert len(audio) == int(0.3 * SAMPLE_RATE)
+        assert queue.samples == 0
+
+    @pytest.mark.asyncio
+    async def test_coalesce_policy_blocks_reader_when_full(self):
+        import asyncio
+        from app.voice.stream import PcmQueue
+        queue = PcmQueue(max_samples=SAMPLE_RATE, policy="coalesce")
+        await queue.put(tone(0.8))
+
+        blocked = asyncio.create_task(queue.put(tone(0.5)))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+
+        await queue.get_all()
+        await asyncio.wait_for(blocked, timeout=1)
+        assert queue.samples == int(0.5 * SAMPLE_RATE)
+
+    @pytest.mark.asyncio
+    async def test_drop_policy_discards_oldest_audio(self):
+        from app.voice.stream import PcmQueue
+        queue = PcmQueue(max_samples=SAMPLE_RATE, policy="drop")
+
+        await queue.put(silence(0.8))
+        await queue.put(tone(0.5))
+
+        audio, _ = await queue.get_all()
+        assert len(audio) == int(0.5 * SAMPLE_RATE)
+
+    def test_flow_control_asks_for_larger_chunks_when_behind(self):
+        from app.core.config import settings
+        from app.voice.stream import VoiceStream
+        stream = VoiceStream(AsyncMock(), db={}, interaction_id="i1", tenant_id="t1", doctor_id="d1")
+
+        stream.realtime_factor = 0.2
+        keeping_up = stream.flow_control()
+        stream.realtime_factor = 2.0
+        behind = stream.flow_control()
+
+        assert keeping_up["chunk_ms"] == settings.VOICE_CLIENT_CHUNK_MS
+        assert behind["chunk_ms"] > keeping_up["chunk_ms"]
+        # Half real time: the client is told it can only send half as much audio
+        assert behind["max_chunks_per_second"] == round(0.5 * 1000 / behind["chunk_ms"], 2)
+
+    @pytest.mark.asyncio
+    async def test_run_drains_queue_after_disconnect(self, mongo_db, monkeypatch):
+        from fastapi import WebSocketDisconnect
+        from app.core.config import settings
+        from app.voice.stream import VoiceStream
+        monkeypatch.setattr(settings, "VOICE_INTERIM_SECONDS", 0)
+
+        websocket = AsyncMock()
+        websocket.receive.side_effect = [
+            {"type": "websocket.receive", "bytes": encode_wav(tone(1.5))},
+            {"type": "websocket.receive", "bytes": encode_wav(np.concatenate([tone(1.0), silence(0.6)]))},
+            WebSocketDisconnect()
+        ]
+        stream = VoiceStream(websocket, mongo_db, interaction_id="i1", tenant_id="t1", doctor_id="d1")
+
+        with patch("app.voice.stream.transcribe_chunk", AsyncMock(return_value=result("hello"))):
+            await stream.run()
+
+        from app.voice.repository import TranscriptRepository
+        assert [s["text"] async for s in TranscriptRepository(mongo_db).iter_segments("i1")] == ["hello"]
+        assert websocket.send_json.call_args_list[0][0][0]["type"] == "flow"
+
+
+def frame(seq, audio):
+    from app.voice.stream import FRAME_HEADER
+    return {"type": "websocket.receive", "bytes": FRAME_HEADER.pack(seq) + encode_wav(audio)}
+
+
+def socket_messages(*messages, linger=0.1):
+    # receive() side effect: the client stays connected for `linger` seconds
+    # after its last frame so acks can still be delivered
+    import asyncio
+    pending = list(messages)
+
+    async def receive():
+        if pending:
+            return pending.pop(0)
+        await asyncio.sleep(linger)
+        return {"type": "websocket.disconnect"}
+
+    return receive
+
+
+def hello():
+    return {"type": "websocket.receive", "text": '{"type": "hello", "protocol": 2}'}
+
+
+class TestResumableStream:
+    """Sequence-numbered frames, acks and resume"""
+
+    def _messages(self, websocket, kind):
+        return [c[0][0] for c in websocket.send_json.call_args_list if c[0][0].get("type") == kind]
+
+    @pytest.mark.asyncio
+    async def test_frames_are_acked_and_stored_under_their_seq(self, mongo_db, monkeypatch):
+        from app.core.config import settings
+        from app.voice.repository import TranscriptRepository
+        from app.voice.stream import VoiceStream
+        monkeypatch.setattr(settings, "VOICE_INTERIM_SECONDS", 0)
+        monkeypatch.setattr(settings, "VOICE_WRITE_FLUSH_SECONDS", 0)
+
+        websocket = AsyncMock()
+        websocket.receive.side_effect = socket_messages(
+            hello(),
+            frame(0, tone(1.5)),
+            frame(1, np.concatenate([tone(1.0), silence(0.6)]))
+        )
+        stream = VoiceStream(websocket, mongo_db, interaction_id="i1", tenant_id="t1", doctor_id="d1")
+
+        with patch("app.voice.stream.transcribe_chunk", AsyncMock(return_value=result("hello"))):
+            await stream.run()
+
+        ready = self._messages(websocket, "ready")
+        assert len(ready) == 1
+        assert ready[0]["protocol"] == 2
+        assert ready[0]["last_acked_seq"] == -1
+        assert self._messages(websocket, "ack")[-1] == {"type": "ack", "seq": 1}
+
+        repo = TranscriptRepository(mongo_db)
+        segments = [s async for s in repo.iter_segments("i1")]
+        assert [(s["seq"], s["text"]) for s in segments] == [(1, "hello")]
+        assert await repo.last_acked_seq("i1") == 1
+
+    @pytest.mark.asyncio
+    async def test_ack_waits_for_buffered_write(self, mongo_db, monkeypatch):
+        from app.core.config import settings
+        from app.voice.stream import VoiceStream
+        monkeypatch.setattr(settings, "VOICE_INTERIM_SECONDS", 0)
+        monkeypatch.setattr(settings, "VOICE_WRITE_FLUSH_SECONDS", 60)
+        websocket = AsyncMock()
+        stream = VoiceStream(websocket, mongo_db, interaction_id="i1", tenant_id="t1", doctor_id="d1")
+        stream.protocol = 2
+
+        with patch("app.voice.stream.transcribe_chunk", AsyncMock(return_value=result("hello"))):
+            await stream.handle_audio(np.concatenate([tone(3), silence(0.6)]), seq=0)
+
+        assert self._messages(websocket, "ack") == []
+        await stream.writer.flush()
+        assert self._messages(websocket, "ack") == [{"type": "ack", "seq": 0}]
+
+    @pytest.mark.asyncio
+    async def test_ack_covers_only_the_batch_that_was_written(self, mongo_db, monkeypatch):
+        import asyncio
+        from app.core.config import settings
+        from app.voice.repository import TranscriptRepository
+        from app.voice.stream import VoiceStream
+        monkeypatch.setattr(settings, "VOICE_INTERIM_SECONDS", 0)
+        monkeypatch.setattr(settings, "VOICE_WRITE_FLUSH_SECONDS", 60)
+        websocket = AsyncMock()
+        stream = VoiceStream(websocket, mongo_db, interaction_id="i1", tenant_id="t1", doctor_id="d1")
+        stream.protocol = 2
+        push = TranscriptRepository.push_segments
+
+        async def slow_push(*args):
+            await asyncio.sleep(0.05)
+            return await push(*args)
+
+        with patch("app.voice.stream.transcribe_chunk", AsyncMock(return_value=result("hello"))), \
+                patch.object(TranscriptRepository, "push_segments", slow_push):
+            await stream.handle_audio(np.concatenate([tone(3), silence(0.6)]), seq=5)
+            # A timer flush of seq 5 is under way when seq 9's text arrives
+            flushing = asyncio.create_task(stream.writer.flush())
+            await asyncio.sleep(0)
+            await stream.handle_audio(np.concatenate([tone(3), silence(0.6)]), seq=9)
+            await flushing
+
+            assert self._messages(websocket, "ack") == [{"type": "ack", "seq": 5}]
+            await stream.writer.flush()
+        assert self._messages(websocket, "ack")[-1] == {"type": "ack", "seq": 9}
+
+    @pytest.mark.asyncio
+    async def test_rejected_window_is_not_acked(self, mongo_db, monkeypatch):
+        from app.core.config import settings
+        from app.voice.executor import TranscriptionQueueFull
+        from app.voice.repository import TranscriptRepository
+        from app.voice.stream import VoiceStream
+        monkeypatch.setattr(settings, "VOICE_INTERIM_SECONDS", 0)
+        monkeypatch.setattr(settings, "VOICE_WRITE_FLUSH_SECONDS", 0)
+        websocket = AsyncMock()
+        stream = VoiceStream(websocket, mongo_db, interaction_id="i1", tenant_id="t1", doctor_id="d1")
+        stream.protocol = 2
+        transcribe = AsyncMock(side_effect=[result("stored"), TranscriptionQueueFull("full"), result("tail")])
+
+        with patch("app.voice.stream.transcribe_chunk", transcribe):
+            await stream.handle_audio(np.concatenate([tone(3), silence(0.6)]), seq=4)
+            await stream.handle_audio(np.concatenate([tone(3), silence(0.6)]), seq=5)
+            await stream.handle_audio(tone(1.0), seq=6)
+            await stream.close()
+
+        assert self._messages(websocket, "ack") == [{"type": "ack", "seq": 4}]
+        repo = TranscriptRepository(mongo_db)
+        assert [s["seq"] async for s in repo.iter_segments("i1")] == [4]
+        assert await repo.last_acked_seq("i1") == 4
+
+    @pytest.mark.asyncio
+    async def test_rejected_window_closes_the_stream_for_a_resend(self, mongo_db, monkeypatch):
+        from app.core.config import settings
+        from app.voice.executor import TranscriptionQueueFull
+        from app.voice.stream import VoiceStream
+        monkeypatch.setattr(settings, "VOICE_INTERIM_SECONDS", 0)
+        websocket = AsyncMock()
+        websocket.receive.side_effect = socket_messages(
+            hello(), frame(0, np.concatenate([tone(3), silence(0.6)])), linger=1.0
+        )
+        stream = VoiceStream(websocket, mongo_db, interaction_id="i1", tenant_id="t1", doctor_id="d1")
+
+        with patch("app.voice.stream.transcribe_chunk", AsyncMock(side_effect=TranscriptionQueueFull("full"))):
+            await stream.run()
+
+        # 1013: try again later, resending after last_acked_seq
+        websocket.close.assert_awaited_once_with(code=1013)
+        assert self._messages(websocket, "ack") == []
+
+    @pytest.mark.asyncio
+    async def test_resume_skips_already_processed_frames(self, mongo_db, monkeypatch):
+        from app.core.config import settings
+        from app.voice.repository import TranscriptRepository
+        from app.voice.stream import VoiceStream
+        monkeypatch.setattr(settings, "VOICE_INTERIM_SECONDS", 0)
+        repo = TranscriptRepository(mongo_db)
+        await repo.push_segment("i1", "t1", "d1", {"seq": 4, "text": "before drop"})
+
+        websocket = AsyncMock()
+        websocket.receive.side_effect = socket_messages(
+            hello(),
+            frame(3, tone(3)),  # resent, already stored
+            frame(4, tone(3)),  # resent, already stored
+            frame(5, np.concatenate([tone(2.5), silence(0.6)]))
+        )
+        stream = VoiceStream(websocket, mongo_db, interaction_id="i1", tenant_id="t1", doctor_id="d1")
+        transcribe = AsyncMock(return_value=result("after resume"))
+
+        with patch("app.voice.stream.transcribe_chunk", transcribe):
+            await stream.run()
+
+        assert self._messages(websocket, "ready")[0]["last_acked_seq"] == 4
+        transcribe.assert_called_once()
+        texts = [s["text"] async for s in repo.iter_segments("i1")]
+        assert texts == ["before drop", "after resume"]
+
+    @pytest.mark.asyncio
+    async def test_live_stream_transcript_is_visible_before_close(self, mongo_db, monkeypatch):
+        from app.core.config import settings
+        from app.voice.repository import TranscriptRepository
+        from app.voice.stream import VoiceStream
+        monkeypatch.setattr(settings, "VOICE_INTERIM_SECONDS", 0)
+        stream = VoiceStream(AsyncMock(), mongo_db, interaction_id="i1", tenant_id="t1", doctor_id="d1")
+        stream.protocol = 2
+
+        with patch("app.voice.stream.transcribe_chunk", AsyncMock(return_value=result("hello"))):
+            await stream.handle_audio(np.concatenate([tone(3), silence(0.6)]), seq=5)
+        await stream.writer.flush()
+
+        # Summaries and live viewers find the interaction through its header
+        header = await TranscriptRepository(mongo_db).find_by_interaction("i1")
+        assert (header["tenant_id"], header["last_seq"]) == ("t1", 5)
+
+    @pytest.mark.asyncio
+    async def test_numbering_cannot_restart_once_segments_are_stored(self, mongo_db):
+        from app.voice.repository import TranscriptRepository
+        from app.voice.stream import VoiceStream
+        await TranscriptRepository(mongo_db).push_segment("i1", "t1", "d1", {"seq": 1, "text": "stored"})
+        websocket = AsyncMock()
+        websocket.receive.side_effect = socket_messages(
+            {"type": "websocket.receive", "text": '{"type": "hello", "protocol": 2, "resume": false}'},
+            frame(0, tone(1.0))
+        )
+        stream = VoiceStream(websocket, mongo_db, interaction_id="i1", tenant_id="t1", doctor_id="d1")
+
+        await stream.run()
+
+        assert self._messages(websocket, "ready") == []
+        websocket.close.assert_awaited_once_with(code=1008)
+        assert stream.queue.samples == 0
+
+    @pytest.mark.asyncio
+    async def test_protocol_2_never_drops_audio(self, mongo_db, monkeypatch):
+        from app.core.config import settings
+        from app.voice.stream import VoiceStream
+        monkeypatch.setattr(settings, "VOICE_STREAM_OVERLOAD_POLICY", "drop")
+        stream = VoiceStream(AsyncMock(), mongo_db, interaction_id="i1", tenant_id="t1", doctor_id="d1")
+        assert stream.queue.policy == "drop"
+
+        await stream.handle_control('{"type": "hello", "protocol": 2}')
+
+        assert stream.queue.policy == "coalesce"
+
+    @pytest.mark.asyncio
+    async def test_segment_writes_are_idempotent(self, mongo_db):
+        from app.voice.repository import TranscriptRepository
+        from app.voice.service import append_transcript_segment
+        await TranscriptRepository(mongo_db).ensure_indexes()
+
+        first = await append_transcript_segment(mongo_db, "i1", "t1", "d1", "text", seq=7)
+        again = await append_transcript_segment(mongo_db, "i1", "t1", "d1", "text", seq=7)
+
+        assert first is not None
+        assert again is None
+        bucket = await mongo_db["voice_transcript_buckets"].find_one({"interaction_id": "i1"})
+        assert len(bucket["segments"]) == 1
+
+    @pytest.mark.asyncio
+    async def test_hello_negotiates_compressed_codec(self, mongo_db):
+        from app.voice.codecs import encode_mulaw
+        from app.voice.stream import VoiceStream, FRAME_HEADER
+        websocket = AsyncMock()
+        stream = VoiceStream(websocket, mongo_db, interaction_id="i1", tenant_id="t1", doctor_id="d1")
+
+        await stream.handle_control('{"type": "hello", "protocol": 2, "codecs": ["opus", "mulaw"], "sample_rate": 8000}')
+        await stream.receive_frame(FRAME_HEADER.pack(0) + encode_mulaw(tone(1.0)[::2]))
+
+        assert self._messages(websocket, "ready")[0]["codec"] == "mulaw"
+        audio, seq = await stream.queue.get_all()
+        # 8 kHz mu-law arrives as 16 kHz float32
+        assert seq == 0
+        assert len(audio) == SAMPLE_RATE
+
+    @pytest.mark.asyncio
+    async def test_hello_with_unusable_sample_rate_is_refused(self, mongo_db):
+        from app.voice.stream import VoiceStream
+        websocket = AsyncMock()
+        stream = VoiceStream(websocket, mongo_db, interaction_id="i1", tenant_id="t1", doctor_id="d1")
+
+        for rate in (0, -8000, 10 ** 9):
+            await stream.handle_control(f'{{"type": "hello", "codecs": ["mulaw"], "sample_rate": {rate}}}')
+
+        errors = [c[0][0] for c in websocket.send_json.call_args_list if "error" in c[0][0]]
+        assert errors == [{"error": "Invalid sample_rate"}] * 3
+        assert {ready["codec"] for ready in self._messages(websocket, "ready")} == {"auto"}
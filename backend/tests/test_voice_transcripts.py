@@ -0,0 +1,254 @@
+"""
+Transcript persistence: segments are appended atomically into fixed-size
+bucket documents, written in coalesced batches, and streamed back in order.
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from app.core.config import settings
+from app.voice.repository import TranscriptRepository
+from app.voice.service import append_transcript_segment
+
+
+class TestAtomicSegmentAppend:
+    """$push-based segment append"""
+
+    @pytest.mark.asyncio
+    async def test_append_with_seq_upserts_without_read(self):
+        mock_db = {"voice_transcripts": MagicMock(), "voice_transcript_buckets": MagicMock()}
+        buckets = mock_db["voice_transcript_buckets"]
+        buckets.update_one = AsyncMock()
+        mock_db["voice_transcripts"].find_one = AsyncMock()
+        mock_db["voice_transcripts"].update_one = AsyncMock()
+
+        await append_transcript_segment(
+            db=mock_db,
+            interaction_id="interaction1",
+            tenant_id="tenant1",
+            doctor_id="doctor1",
+            text="patient reports headache",
+            seq=5
+        )
+
+        mock_db["voice_transcripts"].find_one.assert_not_called()
+        buckets.update_one.assert_called_once()
+
+        query, update = buckets.update_one.call_args[0]
+        assert query == {"interaction_id": "interaction1", "bucket": 0, "segments.seq": {"$ne": 5}}
+        assert update["$push"]["segments"]["$each"][0]["text"] == "patient reports headache"
+        assert update["$setOnInsert"]["tenant_id"] == "tenant1"
+        assert buckets.update_one.call_args[1]["upsert"] is True
+        # The header follows the client's seq
+        query, update = mock_db["voice_transcripts"].update_one.call_args[0]
+        assert update["$max"] == {"last_seq": 5}
+
+
+class TestBucketedTranscripts:
+    """Bucketed transcript storage"""
+
+    @pytest.mark.asyncio
+    async def test_segments_are_split_into_buckets(self, mongo_db, monkeypatch):
+        monkeypatch.setattr(settings, "TRANSCRIPT_BUCKET_SIZE", 3)
+
+        for i in range(7):
+            await append_transcript_segment(mongo_db, "interaction1", "tenant1", "doctor1", f"segment {i}")
+
+        buckets = await mongo_db["voice_transcript_buckets"].find({"interaction_id": "interaction1"}).to_list(None)
+        assert sorted(b["bucket"] for b in buckets) == [0, 1, 2]
+        assert all(b["count"] <= 3 for b in buckets)
+
+        header = await TranscriptRepository(mongo_db).find_by_interaction("interaction1")
+        assert header["last_seq"] == 7
+        assert header["tenant_id"] == "tenant1"
+
+    @pytest.mark.asyncio
+    async def test_iter_segments_streams_in_seq_order(self, mongo_db, monkeypatch):
+        monkeypatch.setattr(settings, "TRANSCRIPT_BUCKET_SIZE", 2)
+        repo = TranscriptRepository(mongo_db)
+
+        # Out-of-order arrival within and across buckets
+        for seq in [3, 1, 2, 5, 4]:
+            await repo.push_segment("interaction1", "tenant1", "doctor1", {"seq": seq, "text": f"s{seq}"})
+
+        texts = [s["text"] async for s in repo.iter_segments("interaction1")]
+        assert texts == ["s1", "s2", "s3", "s4", "s5"]
+
+        later = [s["seq"] async for s in repo.iter_segments("interaction1", after_seq=3)]
+        assert later == [4, 5]
+
+    @pytest.mark.asyncio
+    async def test_legacy_single_document_segments_are_read_first(self, mongo_db):
+        await mongo_db["voice_transcripts"].insert_one({
+            "_id": "legacy",
+            "interaction_id": "interaction1",
+            "segments": [{"text": "old segment"}]
+        })
+        repo = TranscriptRepository(mongo_db)
+        await repo.push_segment("interaction1", "tenant1", "doctor1", {"seq": 1, "text": "new segment"})
+
+        texts = [s["text"] async for s in repo.iter_segments("interaction1")]
+        assert texts == ["old segment", "new segment"]
+
+    @pytest.mark.asyncio
+    async def test_duplicate_legacy_headers_are_merged_before_indexing(self, mongo_db):
+        # Left by racing first appends before the unique index existed
+        await mongo_db["voice_transcripts"].insert_many([
+            {"_id": "b", "interaction_id": "interaction1", "created_at": "2024-01-01T00:00:01",
+             "segments": [{"timestamp": "2024-01-01T00:00:01", "text": "second"}]},
+            {"_id": "a", "interaction_id": "interaction1", "created_at": "2024-01-01T00:00:00",
+             "segments": [{"timestamp": "2024-01-01T00:00:00", "text": "first"},
+                          {"timestamp": "2024-01-01T00:00:02", "text": "third"}]},
+            {"_id": "c", "interaction_id": "interaction2", "created_at": "2024-01-01T00:00:00", "segments": []}
+        ])
+        repo = TranscriptRepository(mongo_db)
+
+        await repo.ensure_indexes()
+
+        assert await mongo_db["voice_transcripts"].count_documents({}) == 2
+        assert (await repo.find_by_interaction("interaction1"))["_id"] == "a"
+        texts = [s["text"] async for s in repo.iter_segments("interaction1")]
+        assert texts == ["first", "second", "third"]
+
+    @pytest.mark.asyncio
+    async def test_headers_are_not_scanned_once_indexed(self, mongo_db):
+        from unittest.mock import patch
+        repo = TranscriptRepository(mongo_db)
+        await repo.ensure_indexes()
+
+        with patch.object(TranscriptRepository, "merge_duplicate_headers", AsyncMock()) as merge:
+            await repo.ensure_indexes()
+
+        merge.assert_not_called()
+
+
+class TestSeqSpace:
+    """Client frame seqs and server-reserved seqs never collide"""
+
+    @pytest.mark.asyncio
+    async def test_reservation_after_client_seqs_does_not_reuse_them(self, mongo_db):
+        from app.voice.service import append_transcript_segment
+        from app.voice.writer import SegmentWriter
+        writer = SegmentWriter(mongo_db, "i1", "t1", "d1", flush_seconds=60)
+        await writer.add("frame zero", seq=0)
+        await writer.add("frame one", seq=1)
+        await writer.flush()
+
+        # e.g. a protocol 1 reconnect
+        later = await append_transcript_segment(mongo_db, "i1", "t1", "d1", "later")
+
+        assert later["seq"] == 2
+        texts = [s["text"] async for s in TranscriptRepository(mongo_db).iter_segments("i1")]
+        assert texts == ["frame zero", "frame one", "later"]
+
+
+class TestSegmentWriter:
+    """Write-coalescing per stream"""
+
+    async def _texts(self, db, interaction_id="i1"):
+        return [s["text"] async for s in TranscriptRepository(db).iter_segments(interaction_id)]
+
+    @pytest.mark.asyncio
+    async def test_batch_is_written_when_count_is_reached(self, mongo_db):
+        from app.core.metrics import metrics
+        from app.voice.writer import SegmentWriter
+        metrics.reset()
+        writer = SegmentWriter(mongo_db, "i1", "t1", "d1", flush_seconds=60, max_segments=3)
+
+        await writer.add("one")
+        await writer.add("two")
+        assert await self._texts(mongo_db) == []
+
+        await writer.add("three")
+        segments = [s async for s in TranscriptRepository(mongo_db).iter_segments("i1")]
+        assert [(s["seq"], s["text"]) for s in segments] == [(1, "one"), (2, "two"), (3, "three")]
+
+        # One seq reservation and one push instead of three of each
+        counters = metrics.snapshot()["counters"]
+        assert counters["voice.writer.writes"] == 2
+        assert counters["voice.writer.writes_saved"] == 4
+
+    @pytest.mark.asyncio
+    async def test_round_trips_are_counted_as_issued(self, mongo_db, monkeypatch):
+        from app.core.metrics import metrics
+        from app.voice.writer import SegmentWriter
+        monkeypatch.setattr(settings, "TRANSCRIPT_BUCKET_SIZE", 2)
+        await TranscriptRepository(mongo_db).ensure_indexes()
+        await TranscriptRepository(mongo_db).push_segment("i1", "t1", "d1", {"seq": 1, "text": "resent"})
+        metrics.reset()
+        writer = SegmentWriter(mongo_db, "i1", "t1", "d1", flush_seconds=60)
+        for seq in range(3):
+            await writer.add(f"s{seq}", seq=seq)
+
+        await writer.flush()
+
+        # Two buckets, the first colliding and retried per segment (1 + 2),
+        # the second (1), and the header update (1)
+        counters = metrics.snapshot()["counters"]
+        assert counters["voice.writer.writes"] == 5
+        assert counters["voice.writer.writes_saved"] == 1
+
+    @pytest.mark.asyncio
+    async def test_batch_is_written_after_flush_interval(self, mongo_db):
+        from app.voice.writer import SegmentWriter
+        flushed = AsyncMock()
+        writer = SegmentWriter(mongo_db, "i1", "t1", "d1", flush_seconds=0.05, on_flush=flushed)
+
+        await writer.add("hello", seq=4)
+        await asyncio.sleep(0.15)
+
+        assert await self._texts(mongo_db) == ["hello"]
+        flushed.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_closing_the_interaction_flushes_open_writers(self, mongo_db):
+        from app.interactions.service import close_interaction
+        from app.voice.writer import SegmentWriter
+        writer = SegmentWriter(mongo_db, "i1", "t1", "d1", flush_seconds=60)
+        await writer.add("still buffered", seq=1)
+
+        await close_interaction(mongo_db, "i1")
+
+        assert await self._texts(mongo_db) == ["still buffered"]
+        await writer.close()
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_segments(self, mongo_db):
+        from app.voice.writer import SegmentWriter
+        writer = SegmentWriter(mongo_db, "i1", "t1", "d1", flush_seconds=60)
+        await writer.add("kept", seq=1)
+
+        with pytest.raises(RuntimeError):
+            with patch_push(side_effect=RuntimeError("mongo down")):
+                await writer.flush()
+
+        assert [s["text"] for s in writer.pending] == ["kept"]
+        await writer.close()
+        assert await self._texts(mongo_db) == ["kept"]
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_on_add_is_not_raised(self, mongo_db):
+        from app.voice.writer import SegmentWriter
+        writer = SegmentWriter(mongo_db, "i1", "t1", "d1", flush_seconds=60, max_segments=1)
+
+        with patch_push(side_effect=RuntimeError("mongo down")):
+            await writer.add("kept", seq=1)
+
+        assert [s["text"] for s in writer.pending] == ["kept"]
+        await writer.close()
+        assert await self._texts(mongo_db) == ["kept"]
+
+    @pytest.mark.asyncio
+    async def test_resent_segments_in_a_batch_are_skipped(self, mongo_db):
+        repo = TranscriptRepository(mongo_db)
+        await repo.ensure_indexes()
+        await repo.push_segments("i1", "t1", "d1", [{"seq": 1, "text": "a"}, {"seq": 2, "text": "b"}])
+
+        stored = await repo.push_segments("i1", "t1", "d1", [{"seq": 2, "text": "b"}, {"seq": 3, "text": "c"}])
+
+        assert stored == 1
+        assert await self._texts(mongo_db) == ["a", "b", "c"]
+
+
+def patch_push(**kwargs):
+    from unittest.mock import patch
+    return patch.object(TranscriptRepository, "push_segments", AsyncMock(**kwargs))
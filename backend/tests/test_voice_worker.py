@@ -0,0 +1,120 @@
+"""
+Out-of-process transcription workers: audio goes through shared memory,
+only small descriptors and results through the socket.
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+import pytest
+from app.voice.executor import TranscriptionExecutor
+from app.core.metrics import metrics
+from app.voice.worker import TranscriptionWorkerUnavailable, WorkerClient
+
+
+def _describe(audio, options=None):
+    return {"samples": len(audio), "sum": float(audio.sum()), "pid": os.getpid(), "options": options}
+
+
+def _describe_batch(audios, options=None):
+    return [_describe(audio, options) for audio in audios]
+
+
+def _fail(audio):
+    raise ValueError("cannot decode")
+
+
+@pytest.fixture(scope="module")
+def worker_address(tmp_path_factory):
+    # Started as a separate program, as next to the API
+    address = str(tmp_path_factory.mktemp("worker") / "voice.sock")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.voice.worker", "--address", address, "--workers", "1"],
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    )
+    deadline = time.monotonic() + 30
+    while not os.path.exists(address) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    yield address
+    server.terminate()
+    server.wait(timeout=30)
+
+
+class TestWorkerPool:
+    """Shared-memory handoff to the remote pool"""
+
+    @pytest.mark.asyncio
+    async def test_audio_is_transcribed_in_worker_process(self, worker_address):
+        metrics.reset()
+        executor = TranscriptionExecutor(kind="remote", workers=1)
+        executor.pool = WorkerClient(worker_address)
+        audio = np.linspace(-1, 1, 16000 * 10, dtype=np.float32)
+
+        try:
+            result = await executor.run(_describe, audio, {"language": "en"})
+        finally:
+            executor.shutdown()
+
+        assert result["samples"] == len(audio)
+        assert result["sum"] == pytest.approx(float(audio.sum()), abs=1e-3)
+        assert result["options"] == {"language": "en"}
+        assert result["pid"] != os.getpid()
+
+        snapshot = metrics.snapshot()
+        assert snapshot["counters"]["voice.worker.shared_bytes"] == audio.nbytes
+        # 640 KB of audio, a few hundred bytes over the socket
+        assert snapshot["histograms"]["voice.worker.message_bytes"]["max"] < 1024
+
+    @pytest.mark.asyncio
+    async def test_concurrent_batches_get_their_own_results(self, worker_address):
+        client = WorkerClient(worker_address)
+        loop = asyncio.get_running_loop()
+        batches = [[np.full(1600 * (i + 1), i, dtype=np.float32), np.ones(800, dtype=np.float32)] for i in range(4)]
+
+        try:
+            results = await asyncio.gather(*(
+                loop.run_in_executor(client, _describe_batch, batch) for batch in batches
+            ))
+        finally:
+            client.shutdown()
+
+        for i, result in enumerate(results):
+            assert [r["samples"] for r in result] == [1600 * (i + 1), 800]
+            assert result[0]["sum"] == 1600 * (i + 1) * i
+
+    @pytest.mark.asyncio
+    async def test_worker_errors_reach_the_caller(self, worker_address):
+        client = WorkerClient(worker_address)
+        try:
+            with pytest.raises(ValueError, match="cannot decode"):
+                await asyncio.wrap_future(client.submit(_fail, np.zeros(10, dtype=np.float32)))
+            # The connection stays usable
+            result = await asyncio.wrap_future(client.submit(_describe, np.zeros(10, dtype=np.float32)))
+        finally:
+            client.shutdown()
+
+        assert result["samples"] == 10
+
+    def test_missing_pool_is_reported_as_unavailable(self, tmp_path):
+        client = WorkerClient(str(tmp_path / "nobody.sock"))
+
+        with pytest.raises(TranscriptionWorkerUnavailable):
+            client.submit(_describe, np.zeros(10, dtype=np.float32))
+
+    def test_client_with_another_key_is_refused(self, worker_address, monkeypatch):
+        from app.core.config import settings
+        monkeypatch.setattr(settings, "VOICE_WORKER_AUTHKEY", "not-the-pool-key")
+        client = WorkerClient(worker_address)
+
+        with pytest.raises(TranscriptionWorkerUnavailable):
+            client.submit(_describe, np.zeros(10, dtype=np.float32))
+
+    def test_pool_needs_its_own_key(self, worker_address, monkeypatch):
+        from app.core.config import settings
+        monkeypatch.setattr(settings, "VOICE_WORKER_AUTHKEY", None)
+        client = WorkerClient(worker_address)
+
+        with pytest.raises(ValueError, match="VOICE_WORKER_AUTHKEY"):
+            client.submit(_describe, np.zeros(10, dtype=np.float32))